@@ -0,0 +1,169 @@
+"""Async mode: serve the existing routers on an AsyncSession.
+
+Enabled with LIFERPG_ASYNC_DB=1. Every endpoint of a sync router is
+re-registered as an `async def` that runs the original handler through
+`AsyncSession.run_sync`. The handler code stays the same, but its queries
+go through the async driver on the event loop, so a request no longer
+holds a threadpool slot for its whole DB round trip. The response is
+validated inside run_sync, because lazy loads during serialization also
+need the async connection. Handlers on get_read_db get the sync side of
+a second AsyncSession on the async read engine, when there is one.
+
+run_sync runs the handler on the event loop, so nothing in it may block
+on a thread. The password endpoints get async versions that await the
+bcrypt pool between their run_sync steps, and the completion journal's
+pause (see pauses_journal) waits for the drain on a worker thread
+before the handler starts.
+"""
+
+import inspect
+
+from fastapi import APIRouter, Depends, Response
+from fastapi.params import Depends as DependsParam
+from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .auth import (
+    get_current_user,
+    get_current_user_async,
+    get_password_hash,
+    password_slot,
+    verify_password,
+)
+from .database import get_db, get_async_db, get_read_db, get_async_read_db
+from .journal import completion_journal
+from .routers import auth as auth_routes
+from .schemas import UserCreate, UserLogin
+
+ASYNC_DEPENDENCIES = {
+    get_current_user: get_current_user_async,
+}
+
+ASYNC_DB_PARAM = "async_db"
+ASYNC_READ_DB_PARAM = "async_read_db"
+
+
+def mirror_router(router: APIRouter) -> APIRouter:
+    """Build an async copy of a sync router"""
+    mirrored = APIRouter()
+    for route in router.routes:
+        endpoint = ASYNC_ENDPOINTS.get(route.endpoint)
+        mirrored.add_api_route(
+            route.path,
+            endpoint or _mirror_endpoint(route.endpoint, route.response_model),
+            methods=list(route.methods),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            tags=route.tags,
+            summary=route.summary,
+            description=route.description,
+            name=route.name,
+        )
+    return mirrored
+
+
+def _mirror_endpoint(endpoint, response_model):
+    signature = inspect.signature(endpoint)
+    pauses_journal = getattr(endpoint, "pauses_journal", False)
+    if pauses_journal:
+        endpoint = endpoint.__wrapped__
+
+    db_params = []
+    read_db_params = []
+    parameters = []
+    for param in signature.parameters.values():
+        dependency = param.default.dependency if isinstance(param.default, DependsParam) else None
+        if dependency is get_db:
+            # Filled with the sync side of the AsyncSession at call time
+            db_params.append(param.name)
+            continue
+        if dependency is get_read_db:
+            read_db_params.append(param.name)
+            continue
+        if dependency in ASYNC_DEPENDENCIES:
+            param = param.replace(default=Depends(ASYNC_DEPENDENCIES[dependency]))
+        parameters.append(param)
+
+    # FastAPI caches dependencies per request, so this is the same session
+    # get_current_user_async loaded the user into
+    parameters.append(inspect.Parameter(
+        ASYNC_DB_PARAM,
+        inspect.Parameter.KEYWORD_ONLY,
+        default=Depends(get_async_db),
+        annotation=AsyncSession,
+    ))
+    if read_db_params:
+        parameters.append(inspect.Parameter(
+            ASYNC_READ_DB_PARAM,
+            inspect.Parameter.KEYWORD_ONLY,
+            default=Depends(get_async_read_db),
+            annotation=AsyncSession,
+        ))
+
+    adapter = TypeAdapter(response_model) if response_model is not None else None
+
+    async def async_endpoint(**kwargs):
+        async_db = kwargs.pop(ASYNC_DB_PARAM)
+        # Only there for handlers on get_read_db (it is get_db without a read engine)
+        read_db = kwargs.pop(ASYNC_READ_DB_PARAM, None)
+
+        def call(session):
+            sessions = {name: session for name in db_params}
+            # Its IO runs in async_db's run_sync greenlet, like the main session's
+            sessions.update({name: read_db.sync_session for name in read_db_params})
+            result = endpoint(**kwargs, **sessions)
+            if adapter is not None and not isinstance(result, Response):
+                result = adapter.validate_python(result, from_attributes=True)
+            return result
+
+        if pauses_journal:
+            async with completion_journal.paused_async(kwargs["current_user"].id):
+                return await async_db.run_sync(call)
+        return await async_db.run_sync(call)
+
+    async_endpoint.__name__ = endpoint.__name__
+    async_endpoint.__doc__ = endpoint.__doc__
+    async_endpoint.__signature__ = signature.replace(parameters=_ordered(parameters))
+    return async_endpoint
+
+
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    with password_slot():
+        await db.run_sync(auth_routes.check_available, user)
+        hashed_password = await get_password_hash(user.password)
+    return await db.run_sync(auth_routes.create_user, user, hashed_password)
+
+
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    with password_slot():
+        await _authenticate(db, user_credentials.email, user_credentials.password)
+    return auth_routes.token_response(user_credentials.email)
+
+
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    with password_slot():
+        await _authenticate(db, form_data.username, form_data.password)
+    return auth_routes.token_response(form_data.username)
+
+
+async def _authenticate(db: AsyncSession, email: str, password: str):
+    hashed_password = await db.run_sync(auth_routes.stored_hash, email)
+    if not hashed_password or not await verify_password(password, hashed_password):
+        auth_routes.raise_bad_credentials()
+
+
+# Sync endpoints replaced by a hand-written async version
+ASYNC_ENDPOINTS = {
+    auth_routes.register: register,
+    auth_routes.login: login,
+    auth_routes.login_for_access_token: login_for_access_token,
+}
+
+
+def _ordered(parameters):
+    # Keyword-only parameters must follow positional-or-keyword ones
+    return sorted(parameters, key=lambda param: param.kind)
@@ -1,12 +1,19 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 
-from .database import get_db
+from .cache import TTLCache
+from .database import get_db, get_async_db
 from .models import User
 from .schemas import TokenData
 
@@ -14,22 +21,73 @@ from .schemas import TokenData
 SECRET_KEY = "your-secret-key-change-in-production-liferpg-2024"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+AUTH_CACHE_SIZE = int(os.getenv("LIFERPG_AUTH_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("LIFERPG_USER_CACHE_TTL", "60"))
+BCRYPT_ROUNDS = int(os.getenv("LIFERPG_BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("LIFERPG_PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE = int(os.getenv("LIFERPG_PASSWORD_HASH_QUEUE", str(PASSWORD_HASH_WORKERS * 2)))
+PASSWORD_HASH_RETRY_AFTER = 1  # seconds
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+# Verified token -> user id (entries expire with the token)
+token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE)
+# User id -> column values of the user row
+user_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(
+# bcrypt releases the GIL, so a thread pool spreads hashing across cores.
+# The password endpoints are async and await the hash, so a request waiting
+# for bcrypt holds neither a server threadpool thread nor a pooled
+# connection. Requests beyond the running and queued slots are turned away
+# with a 503; handlers take a slot with password_slot() before touching
+# the database.
+password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+password_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(
+        bcrypt.checkpw,
         plain_password.encode('utf-8'),
         hashed_password.encode('utf-8')
     )
 
 
-def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(
+async def get_password_hash(password: str) -> str:
+    hashed = await _run_password_job(
+        bcrypt.hashpw,
         password.encode('utf-8'),
-        bcrypt.gensalt()
-    ).decode('utf-8')
+        bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    )
+    return hashed.decode('utf-8')
+
+
+@contextmanager
+def password_slot():
+    """Admit one password hash or check, or answer 503 right away.
+
+    Take it before the request's first query, and end the session's
+    transaction before hashing so the connection goes back to the pool
+    while bcrypt runs.
+    """
+    if not password_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again shortly",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+        )
+    try:
+        yield
+    finally:
+        password_slots.release()
+
+
+async def _run_password_job(func, *args):
+    # Callers hold a password_slot(); the event loop keeps serving meanwhile
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, func, *args)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -51,6 +109,14 @@ def get_current_user(
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        user = get_cached_user(db, user_id)
+        if user is None:
+            raise credentials_exception
+        return user
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -63,4 +129,42 @@ def get_current_user(
     user = db.query(User).filter(User.email == token_data.email).first()
     if user is None:
         raise credentials_exception
+
+    token_ttl = payload["exp"] - time.time() if "exp" in payload else None
+    token_cache.set(token, user.id, ttl=token_ttl)
+    user_cache.set(user.id, _user_values(user))
     return user
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme), db=Depends(get_async_db)
+) -> User:
+    """Async-mode counterpart of get_current_user, sharing its caches"""
+    return await db.run_sync(lambda session: get_current_user(token=token, db=session))
+
+
+def get_cached_user(db: Session, user_id: int) -> Optional[User]:
+    """Attach a user to the session from the cache, loading it on a miss"""
+    values = user_cache.get(user_id)
+    if values is None:
+        user = db.get(User, user_id)
+        if user is not None:
+            user_cache.set(user_id, _user_values(user))
+        return user
+
+    # Rebuild the row as an unmodified persistent object without a SELECT
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def invalidate_user(user_id: int):
+    """Drop a cached user row after its XP, level or profile changed"""
+    user_cache.pop(user_id)
+
+
+def _user_values(user: User) -> dict:
+    return {
+        column.key: getattr(user, column.key)
+        for column in User.__table__.columns
+    }
@@ -0,0 +1,109 @@
+"""In-process cache of the categories table"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .models import Category
+from .schemas import CategoryResponse
+
+CATEGORY_CACHE_TTL_SECONDS = float(os.getenv("LIFERPG_CATEGORY_CACHE_TTL", "300"))
+# Unknown ids reload the table at most this often (GET /categories/{id} is public)
+CATEGORY_MISS_REFRESH_SECONDS = float(os.getenv("LIFERPG_CATEGORY_MISS_REFRESH", "1"))
+
+
+def _etag(data) -> str:
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return '"' + hashlib.sha1(payload).hexdigest() + '"'
+
+
+class CategorySnapshot:
+    """Immutable view of all categories at one version"""
+
+    def __init__(self, version: int, categories: List[CategoryResponse]):
+        self.version = version
+        self.categories = categories
+        self.by_id: Dict[int, CategoryResponse] = {
+            category.id: category for category in categories
+        }
+
+        # ETags depend only on content, so every worker agrees on them
+        dumped = [category.model_dump() for category in categories]
+        self.etag = _etag(dumped)
+        self.etags = {item["id"]: _etag(item) for item in dumped}
+        # Serialized form, embedded in task list responses
+        self.dumped: Dict[int, dict] = {item["id"]: item for item in dumped}
+
+
+class CategoryCache:
+    """Versioned snapshot of the categories table.
+
+    Categories almost never change, so reads are served from memory.
+    `invalidate` drops the snapshot after a local write. The TTL bounds how
+    long writes made by other workers stay invisible; a lookup of an id the
+    snapshot lacks reloads it sooner, but at most once per
+    `miss_refresh_interval`, so requests for made-up ids can't turn every
+    call into a full-table read.
+    """
+
+    def __init__(self, ttl: float, miss_refresh_interval: float = CATEGORY_MISS_REFRESH_SECONDS):
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self.version = 0
+        self._snapshot: Optional[CategorySnapshot] = None
+        self._loaded_at = 0.0
+        self._miss_refreshed_at = 0.0
+        # Bumped by invalidate(), so loads that straddle one can tell
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, refresh: bool = False) -> CategorySnapshot:
+        snapshot = self._snapshot
+        if refresh or snapshot is None or time.monotonic() - self._loaded_at > self.ttl:
+            snapshot = self._load(db)
+        return snapshot
+
+    def get_category(self, db: Session, category_id: int) -> Optional[CategoryResponse]:
+        category = self.get(db).by_id.get(category_id)
+        if category is None and self._claim_miss_refresh():
+            # Could have been created by another worker since the last load
+            category = self.get(db, refresh=True).by_id.get(category_id)
+        return category
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def _claim_miss_refresh(self) -> bool:
+        """True for the one caller allowed to reload after a miss this interval"""
+        now = time.monotonic()
+        with self._lock:
+            if now - max(self._loaded_at, self._miss_refreshed_at) < self.miss_refresh_interval:
+                return False
+            self._miss_refreshed_at = now
+            return True
+
+    def _load(self, db: Session) -> CategorySnapshot:
+        with self._lock:
+            generation = self._generation
+        rows = db.query(Category).order_by(Category.id).all()
+        categories = [CategoryResponse.model_validate(row) for row in rows]
+        with self._lock:
+            if generation != self._generation:
+                # invalidate() ran meanwhile, so the rows may predate that
+                # write. They are what this request's transaction sees, but
+                # they are not cached: the next request loads again.
+                return CategorySnapshot(self.version, categories)
+            self.version += 1
+            self._snapshot = CategorySnapshot(self.version, categories)
+            self._loaded_at = time.monotonic()
+            return self._snapshot
+
+
+category_cache = CategoryCache(ttl=CATEGORY_CACHE_TTL_SECONDS)
@@ -0,0 +1,161 @@
+"""Completion rules shared by the task endpoints and the importer"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Optional, Tuple
+
+from sqlalchemy import and_, not_, or_, update
+from sqlalchemy.orm import Session
+
+from .models import FrequencyType, Task, TaskCompletion, TaskStatus
+from .periods import RECURRING_FREQUENCIES, period_start, previous_period_start
+
+# Task columns a completion writes
+STREAK_FIELDS = ("status", "current_streak", "best_streak", "last_completed")
+
+# How far back a synced offline completion may be dated
+OFFLINE_WINDOW_DAYS = float(os.getenv("LIFERPG_OFFLINE_WINDOW_DAYS", "7"))
+
+# Detail of the 409 for a completion that lost a race
+CONCURRENT_COMPLETION = "Task was completed by a concurrent request"
+
+
+def apply_completion(task: Task, completed_at: datetime) -> TaskCompletion:
+    """Update a task's status and streak for one completion.
+
+    Returns the (unsaved) completion record; the caller adds its XP to the user.
+    """
+    xp_earned, streak_xp = record_streak(task, completed_at)
+
+    return TaskCompletion(
+        task_id=task.id,
+        user_id=task.user_id,
+        completed_at=completed_at,
+        xp_earned=xp_earned,
+        streak_bonus=streak_xp
+    )
+
+
+def record_streak(task, completed_at: datetime) -> Tuple[int, int]:
+    """Advance the task's streak for one completion.
+
+    Returns (xp_earned, streak_bonus_xp). Only reads and writes plain
+    attributes, so the importer can replay history on lightweight objects.
+    """
+    # A streak the rollover job has not broken yet earns no bonus
+    break_lapsed_streak(task, completed_at)
+
+    # Calculate XP with difficulty and streak bonus
+    base_xp = int(task.xp_reward * task.difficulty)
+
+    # Streak bonus (5% per streak day, max 50%)
+    streak_bonus = min(task.current_streak * 5, 50)
+    streak_xp = int(base_xp * streak_bonus / 100)
+
+    # Update task
+    task.status = TaskStatus.COMPLETED
+    task.last_completed = completed_at
+    task.current_streak += 1
+    if task.current_streak > task.best_streak:
+        task.best_streak = task.current_streak
+
+    return base_xp + streak_xp, streak_xp
+
+
+def break_lapsed_streak(task, now: datetime) -> bool:
+    """Reset the streak of a recurring task that missed a whole period.
+
+    Same rule as app.rollover applies in bulk: the streak survives while
+    the last completion is in the current or the previous period.
+    """
+    if not task.current_streak or not task.last_completed:
+        return False
+    previous_start = previous_period_start(task.frequency, now)
+    if previous_start is None or task.last_completed >= previous_start:
+        return False
+    task.current_streak = 0
+    return True
+
+
+def completion_state(task: Task) -> SimpleNamespace:
+    """Plain copy of the task columns a completion reads and writes.
+
+    The endpoints replay completions on it and write the result back with
+    claim_completion, leaving the ORM instance as it was read.
+    """
+    return SimpleNamespace(
+        id=task.id,
+        user_id=task.user_id,
+        frequency=task.frequency,
+        xp_reward=task.xp_reward,
+        difficulty=task.difficulty,
+        is_active=task.is_active,
+        created_at=task.created_at,
+        **{field: getattr(task, field) for field in STREAK_FIELDS}
+    )
+
+
+def claim_completion(
+    db: Session, state, read_last_completed: Optional[datetime], now: datetime
+) -> bool:
+    """Write a completion's task changes unless another request got there first.
+
+    One conditional UPDATE instead of a row lock: it only matches while the
+    task still has the last_completed it was read with and is not completed
+    for the period of `now`, so of concurrent completions exactly one wins.
+    Returns False for the others, whose caller must not award anything.
+    """
+    return db.execute(
+        update(Task).where(
+            Task.id == state.id,
+            Task.last_completed.is_not_distinct_from(read_last_completed),
+            not_(completed_in_period(now))
+        ).values({field: getattr(state, field) for field in STREAK_FIELDS})
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+
+
+def completed_in_period(now: datetime):
+    """SQL counterpart of is_completed_for_period"""
+    return and_(
+        Task.status == TaskStatus.COMPLETED,
+        Task.last_completed.is_not(None),
+        or_(*[
+            and_(Task.frequency == frequency, Task.last_completed >= period_start(frequency, now))
+            for frequency in RECURRING_FREQUENCIES
+        ])
+    )
+
+
+def is_completed_for_period(task: Task, now: datetime) -> bool:
+    """Check if a recurring task was already completed in the period of `now`"""
+    if task.status != TaskStatus.COMPLETED or task.frequency == FrequencyType.ONCE:
+        return False
+    return not should_reset_task(task, now)
+
+
+def offline_window_start(now: datetime) -> datetime:
+    """Earliest completion time a batch may report"""
+    return now - timedelta(days=OFFLINE_WINDOW_DAYS)
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Completion times are stored as naive UTC
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def should_reset_task(task: Task, now: Optional[datetime] = None) -> bool:
+    """Check if a task should be reset based on its frequency"""
+    if task.status != TaskStatus.COMPLETED:
+        return False
+
+    if task.frequency == FrequencyType.ONCE:
+        return False
+
+    if not task.last_completed:
+        return True
+
+    return task.last_completed < period_start(task.frequency, now or datetime.utcnow())
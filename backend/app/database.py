@@ -1,14 +1,127 @@
-from sqlalchemy import create_engine
+import os
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./liferpg.db"
+# Configuration
+SQLALCHEMY_DATABASE_URL = os.getenv("LIFERPG_DATABASE_URL", "sqlite:///./liferpg.db")
+DB_POOL_SIZE = int(os.getenv("LIFERPG_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("LIFERPG_DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("LIFERPG_DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("LIFERPG_DB_POOL_RECYCLE", "1800"))  # seconds
+
+# Applied to every new SQLite connection; an empty value skips the pragma
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("LIFERPG_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("LIFERPG_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": os.getenv("LIFERPG_SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "cache_size": os.getenv("LIFERPG_SQLITE_CACHE_SIZE", "-65536"),  # negative = KiB
+    "mmap_size": os.getenv("LIFERPG_SQLITE_MMAP_SIZE", "268435456"),
+}
+
+# Opt-in async mode: routers run on an AsyncSession (see async_routes.py)
+ASYNC_MODE = os.getenv("LIFERPG_ASYNC_DB", "0") == "1"
+
+# Read-only endpoints (get_read_db) can use an engine of their own: a
+# replica, or on SQLite a separate pool of query_only connections to the
+# same file, so reads never queue behind writers for a pooled connection.
+# Without either they share the request's session.
+READ_DATABASE_URL = os.getenv("LIFERPG_READ_DATABASE_URL", "")
+SQLITE_READ_POOL = os.getenv("LIFERPG_SQLITE_READ_POOL", "0") == "1"
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma, value in SQLITE_PRAGMAS.items():
+        if value:
+            cursor.execute(f"PRAGMA {pragma}={value}")
+    cursor.close()
+
+
+def is_sqlite_memory(url: str) -> bool:
+    return is_sqlite(url) and make_url(url).database in (None, "", ":memory:")
+
+
+def set_sqlite_query_only(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def engine_options(url: str) -> dict:
+    """Keyword arguments for create_engine/create_async_engine"""
+    if is_sqlite_memory(url):
+        # In-memory databases live in a single connection, nothing to pool
+        return {"connect_args": {"check_same_thread": False}}
+
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+    if is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["pool_pre_ping"] = True
+        options["pool_recycle"] = DB_POOL_RECYCLE
+    return options
+
+
+def create_db_engine(url: str, read_only: bool = False, **overrides):
+    db_engine = create_engine(url, **{**engine_options(url), **overrides})
+    if is_sqlite(url):
+        event.listen(db_engine, "connect", set_sqlite_pragmas)
+        if read_only:
+            event.listen(db_engine, "connect", set_sqlite_query_only)
+    return db_engine
+
+
+def read_database_url(url: str) -> Optional[str]:
+    """URL of the read engine, or None when reads share the main one"""
+    if READ_DATABASE_URL:
+        return READ_DATABASE_URL
+    if SQLITE_READ_POOL and is_sqlite(url) and not is_sqlite_memory(url):
+        return url
+    return None
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+
+def async_database_url(url: str) -> str:
+    """Swap the sync driver of a database URL for its async counterpart"""
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS[parsed.get_backend_name()]).render_as_string(
+        hide_password=False
+    )
+
+
+ASYNC_DATABASE_URL = os.getenv("LIFERPG_ASYNC_DATABASE_URL") or (
+    async_database_url(SQLALCHEMY_DATABASE_URL) if ASYNC_MODE else None
 )
+READ_URL = read_database_url(SQLALCHEMY_DATABASE_URL)
+ASYNC_READ_DATABASE_URL = os.getenv("LIFERPG_ASYNC_READ_DATABASE_URL") or (
+    async_database_url(READ_URL) if ASYNC_MODE and READ_URL else None
+)
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+read_engine = None
+ReadSessionLocal = SessionLocal
+if READ_URL:
+    read_engine = create_db_engine(READ_URL, read_only=True)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
 
@@ -18,3 +131,65 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+if read_engine is None:
+    # The same dependency, so FastAPI hands out the request's one session
+    get_read_db = get_db
+else:
+    def get_read_db():
+        """Session for handlers that only read; may lag writes on a replica"""
+        db = ReadSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+
+def create_async_db_engine(url: str, read_only: bool = False):
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    async_options = engine_options(url)
+    if is_sqlite(url) and "pool_size" in async_options:
+        # aiosqlite defaults to NullPool, which reconnects on every checkout
+        async_options["poolclass"] = AsyncAdaptedQueuePool
+
+    db_engine = create_async_engine(url, **async_options)
+    if is_sqlite(url):
+        event.listen(db_engine.sync_engine, "connect", set_sqlite_pragmas)
+        if read_only:
+            event.listen(db_engine.sync_engine, "connect", set_sqlite_query_only)
+    return db_engine
+
+
+async_engine = None
+AsyncSessionLocal = None
+async_read_engine = None
+AsyncReadSessionLocal = None
+if ASYNC_MODE:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = create_async_db_engine(ASYNC_DATABASE_URL)
+    AsyncSessionLocal = async_sessionmaker(
+        autocommit=False, autoflush=False, bind=async_engine
+    )
+    AsyncReadSessionLocal = AsyncSessionLocal
+    if ASYNC_READ_DATABASE_URL:
+        async_read_engine = create_async_db_engine(ASYNC_READ_DATABASE_URL, read_only=True)
+        AsyncReadSessionLocal = async_sessionmaker(
+            autocommit=False, autoflush=False, bind=async_read_engine
+        )
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+if async_read_engine is None:
+    get_async_read_db = get_async_db
+else:
+    async def get_async_read_db():
+        async with AsyncReadSessionLocal() as db:
+            yield db
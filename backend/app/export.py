@@ -0,0 +1,97 @@
+"""Streaming export of a user's completion history"""
+
+import csv
+import enum
+import io
+import json
+from typing import Iterator
+
+from sqlalchemy import select
+
+from .database import ReadSessionLocal
+from .models import Category, Task, TaskCompletion
+
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "id", "completed_at", "task_id", "task_title", "category", "xp_earned", "streak_bonus"
+]
+
+
+class ExportFormat(str, enum.Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def completion_rows(user_id: int) -> Iterator[list]:
+    """Yield the user's completions, oldest first, EXPORT_CHUNK_SIZE rows at a time.
+
+    Runs after the request's session is gone, so it opens its own (on the
+    read engine, if there is one). Rows are
+    fetched through a streaming cursor and never held all at once.
+    Completions of deleted tasks are kept, with no task title or category.
+    """
+    query = select(
+        TaskCompletion.id,
+        TaskCompletion.completed_at,
+        TaskCompletion.task_id,
+        Task.title,
+        Category.name,
+        TaskCompletion.xp_earned,
+        TaskCompletion.streak_bonus,
+    ).outerjoin(
+        Task, Task.id == TaskCompletion.task_id
+    ).outerjoin(
+        Category, Category.id == Task.category_id
+    ).where(
+        TaskCompletion.user_id == user_id
+    ).order_by(
+        TaskCompletion.completed_at, TaskCompletion.id
+    ).execution_options(yield_per=EXPORT_CHUNK_SIZE)
+
+    db = ReadSessionLocal()
+    try:
+        for partition in db.execute(query).partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _ndjson_chunk(rows) -> str:
+    lines = []
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        record["completed_at"] = record["completed_at"].isoformat()
+        lines.append(json.dumps(record, ensure_ascii=False))
+    return "\n".join(lines) + "\n"
+
+
+def _csv_chunk(rows, header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([row[0], row[1].isoformat(), *row[2:]])
+    return buffer.getvalue()
+
+
+def export_completions(user_id: int, export_format: ExportFormat) -> Iterator[str]:
+    """Serialize completion_rows() one chunk at a time"""
+    if export_format == ExportFormat.CSV:
+        header = True
+        for rows in completion_rows(user_id):
+            yield _csv_chunk(rows, header)
+            header = False
+        if header:
+            # Empty history still gets its header line
+            yield _csv_chunk([], header)
+    else:
+        for rows in completion_rows(user_id):
+            yield _ndjson_chunk(rows)
@@ -0,0 +1,291 @@
+"""Synthetic data generator for load and performance testing.
+
+Creates users with tasks of mixed frequency and difficulty and a
+multi-year completion history, on top of the categories from seed.py.
+Habits follow a two-state pattern per task: a completed period is
+followed by another with the user's `consistency` odds, a missed one
+with their `comeback` odds, which gives runs of streaks and lapses
+instead of independent coin flips.
+
+Users are generated in fixed shards of SHARD_USERS, each from its own
+seeded random stream, so the output depends only on the seed and the
+sizes, not on the number of worker processes. Workers only compute rows;
+the parent inserts shards in order, so ids are deterministic too. XP,
+levels, titles, task streaks and the daily XP rollup are derived with
+the same rules the API applies.
+"""
+
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+from types import SimpleNamespace
+from typing import Callable, List, Optional, Tuple
+
+import bcrypt
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from .completions import break_lapsed_streak, is_completed_for_period, record_streak
+from .database import create_db_engine
+from .models import Category, FrequencyType, Task, TaskCompletion, TaskStatus, User
+from .periods import period_start
+from .progression import level_for_xp, title_for_level
+from .rollups import backfill_daily_xp
+from .schema import ensure_schema
+from .seed import seed_categories
+
+GENERATED_PASSWORD = "liferpg-demo"
+SHARD_USERS = 100
+INSERT_BATCH_SIZE = 20000
+
+FREQUENCY_WEIGHTS = {
+    FrequencyType.DAILY: 60,
+    FrequencyType.WEEKLY: 25,
+    FrequencyType.MONTHLY: 10,
+    FrequencyType.ONCE: 5,
+}
+DIFFICULTIES = (1.0, 1.0, 1.0, 1.5, 1.5, 2.0)
+
+# Where in its period a check-in lands, as (earliest, latest) offsets
+CHECKIN_WINDOW = {
+    FrequencyType.DAILY: (timedelta(hours=6), timedelta(hours=23)),
+    FrequencyType.WEEKLY: (timedelta(hours=6), timedelta(days=6, hours=23)),
+    FrequencyType.MONTHLY: (timedelta(hours=6), timedelta(days=27, hours=23)),
+}
+PERIOD_STEP = {
+    FrequencyType.DAILY: timedelta(days=1),
+    FrequencyType.WEEKLY: timedelta(days=7),
+    FrequencyType.MONTHLY: timedelta(days=32),  # period_start snaps back to the 1st
+}
+
+TASK_TITLES = {
+    "Salud": ("Caminar 30 minutos", "Beber 2 litros de agua", "Ir al gimnasio", "Dormir 8 horas"),
+    "Productividad": ("Revisar bandeja de entrada", "Planificar el día", "Bloque de trabajo profundo"),
+    "Aprendizaje": ("Leer 20 páginas", "Practicar inglés", "Curso online"),
+    "Finanzas": ("Registrar gastos", "Revisar presupuesto", "Ahorrar 10%"),
+    "Social": ("Llamar a la familia", "Escribir a un amigo", "Cena con amigos"),
+    "Hogar": ("Lavar los platos", "Ordenar el escritorio", "Limpieza general"),
+    "Creatividad": ("Tocar guitarra", "Dibujar", "Escribir en el diario"),
+    "Mindfulness": ("Meditar 10 minutos", "Gratitud", "Desconexión digital"),
+    "Aventura": ("Ruta de senderismo", "Visitar un lugar nuevo", "Probar una receta nueva"),
+    "Hábitos": ("Tender la cama", "Sin azúcar", "Estiramientos"),
+}
+
+
+def generated_email(index: int) -> str:
+    return f"user{index}@example.com"
+
+
+def generate(
+    url: str,
+    users: int,
+    tasks_per_user: int = 10,
+    years: float = 1.0,
+    seed: int = 1,
+    workers: int = 1,
+    now: Optional[datetime] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> dict:
+    """Fill the database at `url` with `users` generated users.
+
+    Every user logs in with generated_email(i) / GENERATED_PASSWORD. History
+    ends at `now` (default: today at midnight UTC). `progress(done, total)`
+    is called after each shard of users is written. Returns row counts.
+    """
+    if now is None:
+        today = datetime.utcnow()
+        now = datetime(today.year, today.month, today.day)
+
+    engine = create_db_engine(url)
+    ensure_schema(engine)
+    db = Session(engine)
+    try:
+        seed_categories(db)
+        if users and db.query(User.id).filter(User.email == generated_email(0)).first():
+            raise ValueError("The database already has generated users")
+        categories = [
+            (category.id, category.name, category.base_xp)
+            for category in db.query(Category).order_by(Category.id)
+        ]
+        # One cheap hash shared by every user: login cost is not what this data is for
+        password_hash = bcrypt.hashpw(
+            GENERATED_PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds=4)
+        ).decode()
+
+        shards = [
+            (seed, shard, range(start, min(start + SHARD_USERS, users)),
+             tasks_per_user, years, now, categories, password_hash)
+            for shard, start in enumerate(range(0, users, SHARD_USERS))
+        ]
+        counts = {"users": 0, "tasks": 0, "completions": 0}
+
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            results = _in_order(pool, shards, workers) if pool else map(generate_shard, shards)
+            for user_rows, task_rows, completion_rows in results:
+                _insert_shard(db, user_rows, task_rows, completion_rows, counts)
+                db.commit()
+                if progress:
+                    progress(counts["users"], users)
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+        # Commits
+        backfill_daily_xp(db)
+        return counts
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def _in_order(pool: ProcessPoolExecutor, shards, workers: int):
+    """Shard results in submission order, with at most two shards per worker
+    in flight so memory stays bounded while the parent is inserting"""
+    pending = deque()
+    shards = iter(shards)
+    for shard in islice(shards, workers * 2):
+        pending.append(pool.submit(generate_shard, shard))
+    while pending:
+        result = pending.popleft().result()
+        for shard in islice(shards, 1):
+            pending.append(pool.submit(generate_shard, shard))
+        yield result
+
+
+def _insert_shard(db: Session, user_rows, task_rows, completion_rows, counts):
+    user_ids = db.scalars(
+        insert(User).returning(User.id, sort_by_parameter_order=True), user_rows
+    ).all()
+    for row in task_rows:
+        row["user_id"] = user_ids[row.pop("user_index")]
+    task_ids = db.scalars(
+        insert(Task).returning(Task.id, sort_by_parameter_order=True), task_rows
+    ).all()
+
+    # Core insert on the table: the ORM bulk path adds ~10 us per row
+    connection = db.connection()
+    statement = insert(TaskCompletion.__table__)
+    batch = []
+    for task_index, completed_at, xp_earned, streak_bonus in completion_rows:
+        batch.append({
+            "task_id": task_ids[task_index],
+            "user_id": task_rows[task_index]["user_id"],
+            "completed_at": completed_at,
+            "xp_earned": xp_earned,
+            "streak_bonus": streak_bonus,
+        })
+        if len(batch) == INSERT_BATCH_SIZE:
+            connection.execute(statement, batch)
+            batch = []
+    if batch:
+        connection.execute(statement, batch)
+
+    counts["users"] += len(user_ids)
+    counts["tasks"] += len(task_ids)
+    counts["completions"] += len(completion_rows)
+
+
+def generate_shard(args) -> Tuple[List[dict], List[dict], List[tuple]]:
+    """Rows for one shard of users; runs in worker processes.
+
+    Completions come back as (task position in the shard, completed_at,
+    xp_earned, streak_bonus) since task ids are only known once inserted.
+    """
+    seed, shard, user_indexes, tasks_per_user, years, now, categories, password_hash = args
+    rng = random.Random(f"{seed}:{shard}")
+    span = timedelta(days=int(365 * years))
+    start = now - span
+
+    user_rows, task_rows, completion_rows = [], [], []
+    for position, user_index in enumerate(user_indexes):
+        # Users join during the first half of the window and keep their habits
+        joined = start + span * rng.random() * 0.5
+        consistency = rng.uniform(0.5, 0.97)
+        comeback = rng.uniform(0.05, 0.5)
+        total_xp = 0
+        completed = best_streak = current_streak = 0
+
+        for task_number in range(tasks_per_user):
+            category_id, category_name, base_xp = rng.choice(categories)
+            frequency = rng.choices(
+                list(FREQUENCY_WEIGHTS), weights=list(FREQUENCY_WEIGHTS.values())
+            )[0]
+            created_at = joined + (now - joined) * rng.random() * 0.25
+            task = SimpleNamespace(
+                frequency=frequency,
+                xp_reward=base_xp,
+                difficulty=rng.choice(DIFFICULTIES),
+                status=TaskStatus.PENDING,
+                current_streak=0,
+                best_streak=0,
+                last_completed=None
+            )
+
+            task_position = len(task_rows)
+            for completed_at in _checkins(rng, frequency, created_at, now, consistency, comeback):
+                if is_completed_for_period(task, completed_at):
+                    continue
+                xp_earned, streak_xp = record_streak(task, completed_at)
+                total_xp += xp_earned
+                completed += 1
+                completion_rows.append((task_position, completed_at, xp_earned, streak_xp))
+            break_lapsed_streak(task, now)
+
+            titles = TASK_TITLES.get(category_name) or (category_name,)
+            task_rows.append({
+                "user_index": position,
+                "category_id": category_id,
+                "title": titles[task_number % len(titles)],
+                "frequency": frequency,
+                "status": task.status,
+                "xp_reward": task.xp_reward,
+                "difficulty": task.difficulty,
+                "current_streak": task.current_streak,
+                "best_streak": task.best_streak,
+                "created_at": created_at,
+                "last_completed": task.last_completed,
+                "is_active": True,
+            })
+            best_streak = max(best_streak, task.best_streak)
+            current_streak = max(current_streak, task.current_streak)
+
+        level = level_for_xp(total_xp)
+        user_rows.append({
+            "email": generated_email(user_index),
+            "username": f"user{user_index}",
+            "hashed_password": password_hash,
+            "level": level,
+            "current_xp": total_xp,
+            "total_xp": total_xp,
+            "title": title_for_level(level),
+            "tasks_completed": completed,
+            "best_streak": best_streak,
+            "current_streak": current_streak,
+            "created_at": joined,
+        })
+
+    return user_rows, task_rows, completion_rows
+
+
+def _checkins(rng, frequency, created_at, now, consistency, comeback):
+    """Completion times from the task's creation until `now`"""
+    if frequency == FrequencyType.ONCE:
+        if rng.random() < consistency:
+            yield created_at + (now - created_at) * rng.random()
+        return
+
+    earliest, latest = CHECKIN_WINDOW[frequency]
+    window = (latest - earliest).total_seconds()
+    step = PERIOD_STEP[frequency]
+    done = True  # New habits start motivated
+    current = period_start(frequency, created_at)
+    while current < now:
+        done = rng.random() < (consistency if done else comeback)
+        if done:
+            completed_at = current + earliest + timedelta(seconds=int(window * rng.random()))
+            if created_at <= completed_at < now:
+                yield completed_at
+        current = period_start(frequency, current + step)
@@ -0,0 +1,139 @@
+"""Idempotency-Key support for the completion endpoints.
+
+A client retrying a completion (a timeout, a double tap, an offline sync
+that resends) sends the same Idempotency-Key header and gets the first
+response back instead of a second award. Keys are per user and live for
+LIFERPG_IDEMPOTENCY_TTL_HOURS.
+
+The key row is inserted before the request reads the rows it validates,
+in the transaction that then records the completion, so the database
+decides between concurrent requests with one key: the second blocks on
+the primary key until the first commits, then replays its response (or
+goes ahead if the first rolled back).
+Stored responses are cached in-process once read, so repeated retries
+cost no query.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .cache import TTLCache
+from .models import IdempotencyKey
+
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("LIFERPG_IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("LIFERPG_IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Set on replayed responses
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# (user id, key) -> (fingerprint, JSON body)
+response_cache = TTLCache(maxsize=IDEMPOTENCY_CACHE_SIZE)
+
+
+def request_fingerprint(route: str, payload: Optional[BaseModel] = None) -> str:
+    """Identifies what a key was used for, so it cannot replay another request"""
+    digest = hashlib.sha256(route.encode("utf-8"))
+    if payload is not None:
+        digest.update(payload.model_dump_json().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def claim_key(
+    db: Session, user_id: int, key: Optional[str], fingerprint: str
+) -> Optional[Response]:
+    """Replay the response of an earlier request with this key, or reserve
+    the key for this one; call before the request reads what it validates.
+
+    Waits for a concurrent request holding the key to finish. Replaying
+    after that rolls the session back, which is harmless before any write.
+    """
+    replayed = stored_response(db, user_id, key, fingerprint)
+    if key is None or replayed is not None:
+        return replayed
+
+    row = {"user_id": user_id, "key": key, "fingerprint": fingerprint, "created_at": datetime.utcnow()}
+    try:
+        db.execute(insert(IdempotencyKey).values(row))
+        return None
+    except IntegrityError:
+        db.rollback()
+
+    replayed = stored_response(db, user_id, key, fingerprint)
+    if replayed is not None:
+        return replayed
+    # The row that was in the way had expired: the key is free again
+    db.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+    ))
+    db.execute(insert(IdempotencyKey).values(row))
+    return None
+
+
+def stored_response(
+    db: Session, user_id: int, key: Optional[str], fingerprint: str
+) -> Optional[Response]:
+    """The response to replay for a key whose request has committed, if any"""
+    if key is None:
+        return None
+    stored = response_cache.get((user_id, key))
+    if stored is None:
+        row = db.get(IdempotencyKey, (user_id, key))
+        if row is None or row.response is None or row.created_at + _ttl() <= datetime.utcnow():
+            return None
+        stored = remember_response(user_id, key, row.fingerprint, row.response, row.created_at)
+    return replay(stored, fingerprint)
+
+
+def remember_response(
+    user_id: int, key: str, fingerprint: str, body: str, created_at: datetime
+) -> Tuple[str, str]:
+    """Cache a committed response until its key expires"""
+    stored = (fingerprint, body)
+    ttl = (created_at + _ttl() - datetime.utcnow()).total_seconds()
+    response_cache.set((user_id, key), stored, ttl=max(ttl, 0))
+    return stored
+
+
+def replay(stored: Tuple[str, str], fingerprint: str) -> Response:
+    """Response for a (fingerprint, body) stored under the key a request sent"""
+    stored_fingerprint, body = stored
+    if stored_fingerprint != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different request"
+        )
+    return Response(body, media_type="application/json", headers={REPLAYED_HEADER: "true"})
+
+
+def save_response(db: Session, user_id: int, key: Optional[str], body: BaseModel):
+    """Store the response of a claimed key (caller commits)"""
+    if key is None:
+        return
+    db.execute(
+        update(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+        ).values(response=body.model_dump_json())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def prune_idempotency_keys(db: Session) -> int:
+    """Delete expired keys; returns how many"""
+    deleted = db.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.created_at < datetime.utcnow() - _ttl())
+    ).rowcount
+    db.commit()
+    return deleted
+
+
+def _ttl() -> timedelta:
+    return timedelta(hours=IDEMPOTENCY_TTL_HOURS)
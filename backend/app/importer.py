@@ -0,0 +1,199 @@
+"""Bulk import of tasks and completion history from other habit trackers.
+
+Accepted files:
+
+- JSON shaped like TaskImportRequest: {"tasks": [...], "completions": [...]}
+- CSV with one completion per row. Required columns are `task` and
+  `completed_at` (ISO 8601). The optional `category`, `frequency`, `description`,
+  `xp_reward` and `difficulty` columns describe the task; the first row
+  of each task wins.
+
+Every imported task is created new. Its completions are replayed in time
+order with the same rules as complete_task, so streaks, XP and duplicate
+check-ins come out as if the user had logged them here. A task without a
+`created_at` dates from its first imported completion.
+"""
+
+import csv
+import io
+from types import SimpleNamespace
+from datetime import datetime
+from typing import Callable, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from .auth import invalidate_user
+from .category_cache import category_cache
+from .completions import (
+    STREAK_FIELDS, as_utc, break_lapsed_streak, is_completed_for_period, record_streak
+)
+from .leaderboard import rank_index
+from .models import Task, TaskCompletion, TaskStatus, User
+from .progression import award_xp
+from .rollups import backfill_daily_xp
+from .schemas import TaskImportRequest, TaskImportResponse
+from .user_stats import completion_counters
+
+IMPORT_BATCH_SIZE = 5000
+
+CSV_TASK_FIELDS = ("category", "frequency", "description", "xp_reward", "difficulty")
+
+
+class ImportFileError(ValueError):
+    """The import file is malformed or refers to unknown tasks or categories"""
+
+
+def import_format(filename: Optional[str]) -> str:
+    return "csv" if filename and filename.lower().endswith(".csv") else "json"
+
+
+def parse_import(raw: bytes, file_format: str) -> TaskImportRequest:
+    try:
+        if file_format == "csv":
+            return _parse_csv(raw.decode("utf-8-sig"))
+        return TaskImportRequest.model_validate_json(raw)
+    except (ValidationError, UnicodeDecodeError) as e:
+        raise ImportFileError(str(e))
+
+
+def _parse_csv(text: str) -> TaskImportRequest:
+    reader = csv.DictReader(io.StringIO(text))
+    if not {"task", "completed_at"} <= set(reader.fieldnames or ()):
+        raise ImportFileError("CSV needs 'task' and 'completed_at' columns")
+
+    tasks = {}
+    completions = []
+    for row in reader:
+        title = row["task"]
+        if title not in tasks:
+            tasks[title] = {"title": title}
+            tasks[title].update(
+                (field, row[field]) for field in CSV_TASK_FIELDS if row.get(field)
+            )
+        completions.append({"task": title, "completed_at": row["completed_at"]})
+
+    return TaskImportRequest.model_validate({
+        "tasks": list(tasks.values()),
+        "completions": completions
+    })
+
+
+def import_history(
+    db: Session,
+    user: User,
+    data: TaskImportRequest,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> TaskImportResponse:
+    """Create the file's tasks and completions for `user` in one transaction.
+
+    `progress(done, total)` is called after each batch of completions.
+    """
+    now = datetime.utcnow()
+    snapshot = category_cache.get(db)
+    categories_by_name = {category.name: category for category in snapshot.categories}
+
+    tasks = {}
+    for item in data.tasks:
+        if item.title in tasks:
+            raise ImportFileError(f"Duplicate task '{item.title}'")
+        if item.category_id is not None:
+            category = snapshot.by_id.get(item.category_id)
+        else:
+            category = categories_by_name.get(item.category)
+        if category is None:
+            raise ImportFileError(f"Unknown category for task '{item.title}'")
+
+        tasks[item.title] = {
+            "user_id": user.id,
+            "category_id": category.id,
+            "title": item.title,
+            "description": item.description,
+            "frequency": item.frequency,
+            "xp_reward": item.xp_reward if item.xp_reward else category.base_xp,
+            "difficulty": item.difficulty,
+            # Without one, set from the task's first imported completion below
+            "created_at": as_utc(item.created_at),
+            "is_active": item.is_active,
+        }
+
+    completed_at_by_task = {}
+    for item in data.completions:
+        if item.task not in tasks:
+            raise ImportFileError(f"Completion refers to unknown task '{item.task}'")
+        completed_at_by_task.setdefault(item.task, []).append(as_utc(item.completed_at))
+
+    # Replay each task's history on a plain object, not an ORM instance:
+    # attribute instrumentation would dominate the cost of large imports
+    completions_by_task = {}
+    skipped = 0
+    for title, task in tasks.items():
+        state = SimpleNamespace(
+            frequency=task["frequency"],
+            xp_reward=task["xp_reward"],
+            difficulty=task["difficulty"],
+            status=TaskStatus.PENDING,
+            current_streak=0,
+            best_streak=0,
+            last_completed=None
+        )
+        completions = []
+        for completed_at in sorted(completed_at_by_task.get(title, ())):
+            if completed_at > now or is_completed_for_period(state, completed_at):
+                skipped += 1
+                continue
+            xp_earned, streak_xp = record_streak(state, completed_at)
+            completions.append({
+                "user_id": user.id,
+                "completed_at": completed_at,
+                "xp_earned": xp_earned,
+                "streak_bonus": streak_xp,
+            })
+        completions_by_task[title] = completions
+        if task["created_at"] is None:
+            task["created_at"] = completions[0]["completed_at"] if completions else now
+        break_lapsed_streak(state, now)
+        task.update((field, getattr(state, field)) for field in STREAK_FIELDS)
+
+    # Tasks carry their final streak state; RETURNING gives the ids in order
+    titles = list(tasks)
+    task_ids = []
+    if titles:
+        task_ids = db.scalars(
+            insert(Task).returning(Task.id, sort_by_parameter_order=True),
+            [tasks[title] for title in titles]
+        ).all()
+
+    rows = []
+    for title, task_id in zip(titles, task_ids):
+        for completion in completions_by_task.get(title, ()):
+            completion["task_id"] = task_id
+            rows.append(completion)
+
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        db.execute(insert(TaskCompletion), rows[start:start + IMPORT_BATCH_SIZE])
+        if progress:
+            progress(min(start + IMPORT_BATCH_SIZE, len(rows)), len(rows))
+
+    total_xp = sum(row["xp_earned"] for row in rows)
+    old_xp, old_level, new_level = award_xp(db, user.id, total_xp, completion_counters(
+        len(rows),
+        max((task["best_streak"] for task in tasks.values()), default=0),
+        max((task["current_streak"] for task in tasks.values() if task["is_active"]), default=0)
+    ))
+
+    # Rebuilds the user's daily rollup and commits the whole import
+    backfill_daily_xp(db, user.id)
+    invalidate_user(user.id)
+    rank_index.update(old_xp, old_xp + total_xp)
+
+    return TaskImportResponse(
+        tasks_created=len(titles),
+        completions_imported=len(rows),
+        completions_skipped=skipped,
+        total_xp_earned=total_xp,
+        old_level=old_level,
+        new_level=new_level,
+        level_up=new_level > old_level
+    )
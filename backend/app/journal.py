@@ -0,0 +1,555 @@
+"""Write-behind journal for single task completions.
+
+Enabled with LIFERPG_COMPLETION_JOURNAL (a file path, or "memory").
+POST /tasks/{id}/complete then decides and answers in-process: the
+completion is checked and scored against the task's latest state (the
+journal's own unapplied writes included), appended to the journal file
+and acknowledged. A single writer thread applies everything pending
+every LIFERPG_JOURNAL_FLUSH_MS in one transaction: the completion rows,
+one UPDATE per task and per user, the daily rollups and the idempotency
+keys. Under load that is one SQLite commit for hundreds of completions,
+and request threads never wait on the database write lock.
+
+Trade-offs:
+
+- Reads lag completions by up to one flush interval (plus the commit).
+- The process is the only one deciding completions, so it allocates
+  their ids and holds an exclusive lock on the journal: run one worker,
+  on SQLite (start() refuses other databases, whose deployments run
+  several workers or share the database with other writers).
+  Endpoints writing the user's tasks or completions directly (batch,
+  import, update, delete, start) wait for the journal to drain and hold
+  it off while they write (single completions get a 503 meanwhile); run
+  `manage import` with the server stopped.
+- Acknowledged completions survive a process crash: they are in the
+  journal file, which is replayed at the next start (rows already
+  committed are skipped by id). The file is not fsynced, so like SQLite
+  with synchronous=NORMAL an OS crash can lose the last moments. With
+  "memory" a crash loses up to one flush interval.
+
+Each flush renames the file to <path>.applying and starts a new one, so
+the file only ever holds unapplied completions.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from functools import wraps
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import bindparam, delete, func, insert, select, tuple_, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from .auth import invalidate_user
+from .completions import (
+    CONCURRENT_COMPLETION, completion_state, is_completed_for_period, record_streak
+)
+from .database import create_db_engine, is_sqlite
+from .idempotency import remember_response, replay, response_cache
+from .leaderboard import rank_index
+from .models import IdempotencyKey, Task, TaskCompletion, TaskStatus, User
+from .progression import award_xp, level_for_xp
+from .rollups import record_daily_xp
+from .schemas import TaskCompletionResponse
+from .user_stats import completion_counters
+
+COMPLETION_JOURNAL = os.getenv("LIFERPG_COMPLETION_JOURNAL", "")
+JOURNAL_FLUSH_MS = float(os.getenv("LIFERPG_JOURNAL_FLUSH_MS", "5"))
+# Unapplied completions before requests are turned away with a 503
+JOURNAL_MAX_PENDING = int(os.getenv("LIFERPG_JOURNAL_MAX_PENDING", "50000"))
+JOURNAL_RETRY_SECONDS = 1
+
+# Task and user states the journal wrote, kept after they are applied so a
+# request that read the row just before a flush still sees them
+TASK_STATES_SIZE = 100000
+
+logger = logging.getLogger(__name__)
+
+tasks_table = Task.__table__
+
+
+class CompletionJournal:
+    def __init__(self, path: Optional[str], flush_ms: float = JOURNAL_FLUSH_MS,
+                 max_pending: int = JOURNAL_MAX_PENDING):
+        self.path = path
+        self.flush_seconds = flush_ms / 1000
+        self.max_pending = max_pending
+        self.groups = 0
+        self.applied = 0
+
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._drained = threading.Condition(self._lock)
+        # Direct completion writers at work, see paused()
+        self._direct_writers = 0
+        # user id -> pauses that wrote their completions, see complete()
+        self._direct_writes: Dict[int, int] = {}
+
+        self._pending: List[dict] = []
+        self._applying: List[dict] = []
+        # task id -> state after its latest journaled completion
+        self._tasks: Dict[int, SimpleNamespace] = {}
+        # user id -> (total XP, level) as the journal last wrote them, or as
+        # the request read them before its first journaled completion
+        self._users: Dict[int, tuple] = {}
+        self._pending_xp: Dict[int, int] = {}
+        self._pending_keys: Dict[tuple, tuple] = {}
+        self._next_id = None
+        self._file = None
+        self._lock_file = None
+        self._engine = None
+        self._session_factory = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    # Lifecycle
+
+    def start(self, url: str):
+        """Lock the journal, replay what a previous run left, start the writer"""
+        if not is_sqlite(url):
+            raise RuntimeError(
+                "The completion journal needs SQLite: it assumes a single "
+                "worker is the only one writing completions"
+            )
+        # A connection of its own: draining must never wait for the request
+        # pool, which requests waiting for the drain may hold
+        self._engine = create_db_engine(url, pool_size=1, max_overflow=0)
+        self._session_factory = sessionmaker(autoflush=False, bind=self._engine)
+        if self.path:
+            self._lock_file = open(self.path + ".lock", "w")
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                raise RuntimeError(
+                    f"Completion journal {self.path} is in use by another process; "
+                    "the journal needs a single worker"
+                )
+            recovered = self._recover()
+            if recovered:
+                logger.info("Replayed %d journaled completions", recovered)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+        self._next_id = self._max_completion_id() + 1
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="completion-journal", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Apply everything pending, then stop the writer"""
+        with self._lock:
+            self._stopping = True
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        if self._engine is not None:
+            self._engine.dispose()
+            self._engine = None
+
+    @contextmanager
+    def paused(self, user_id: Optional[int] = None):
+        """Hold off journal completions until everything pending is applied.
+
+        For code that writes `user_id`'s completions straight to the
+        database: it sees every acknowledged completion, and the journal
+        resumes with ids past the ones it inserted and with the database as
+        the latest state of every task. Direct writers don't wait for each
+        other, only for the drain; journal completions get a 503 meanwhile.
+        """
+        with self._lock:
+            self._direct_writers += 1
+            while self._pending or self._applying:
+                self._wake.notify()
+                self._drained.wait()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._direct_writers -= 1
+                if user_id is not None:
+                    self._direct_writes[user_id] = self._direct_writes.get(user_id, 0) + 1
+                if not self._direct_writers:
+                    self._next_id = self._max_completion_id() + 1
+                    self._tasks.clear()
+                    self._users.clear()
+
+    @asynccontextmanager
+    async def paused_async(self, user_id: Optional[int] = None):
+        """paused() for the event loop: the drain is awaited on a worker thread"""
+        pause = self.paused(user_id)
+        await run_in_threadpool(pause.__enter__)
+        try:
+            yield
+        finally:
+            await run_in_threadpool(pause.__exit__, None, None, None)
+
+    def direct_writes(self, user_id: int) -> int:
+        """Take before reading the task to complete, see complete()"""
+        with self._lock:
+            return self._direct_writes.get(user_id, 0)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending) + len(self._applying),
+                "groups": self.groups,
+                "applied": self.applied,
+            }
+
+    # Request path
+
+    def complete(
+        self, task: Task, user: User, now: datetime, direct_writes: int,
+        key: Optional[str] = None, fingerprint: Optional[str] = None
+    ):
+        """Complete `task` as of `now`; returns the response to send.
+
+        `task` and `user` are the rows as the request read them; the
+        journal's unapplied writes take precedence over them. A direct
+        write since `direct_writes` was taken may have changed the task
+        after the read, which is refused like a lost race.
+        """
+        with self._lock:
+            if key is not None:
+                stored = self._pending_keys.get((user.id, key)) or response_cache.get((user.id, key))
+                if stored is not None:
+                    return replay(stored, fingerprint)
+            if self._direct_writers:
+                _unavailable("Completions are paused while a batch is saved, try again shortly")
+            if len(self._pending) + len(self._applying) >= self.max_pending:
+                _unavailable("Too many completions waiting to be saved, try again shortly")
+            if self._direct_writes.get(user.id, 0) != direct_writes:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=CONCURRENT_COMPLETION)
+
+            state = completion_state(task)
+            journaled = self._tasks.get(task.id)
+            # Newer than the row read: not applied yet, or applied after the read
+            if journaled is not None and (
+                task.last_completed is None or journaled.last_completed > task.last_completed
+            ):
+                state.status = TaskStatus.COMPLETED
+                state.last_completed = journaled.last_completed
+                state.current_streak = journaled.current_streak
+                state.best_streak = journaled.best_streak
+
+            if is_completed_for_period(state, now):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Task already completed for this period"
+                )
+            previous_streak = state.current_streak
+            xp_earned, streak_bonus = record_streak(state, now)
+
+            # The row read may predate the last flush; award_xp raises the
+            # stored level the same way, levels only ever go up
+            written_xp, written_level = self._users.setdefault(user.id, (user.total_xp, user.level))
+            total_xp = written_xp + self._pending_xp.get(user.id, 0)
+            old_level = max(written_level, level_for_xp(total_xp))
+            new_level = max(old_level, level_for_xp(total_xp + xp_earned))
+            level_up = new_level > old_level
+
+            event = {
+                "id": self._next_id,
+                "task_id": task.id,
+                "user_id": user.id,
+                "completed_at": now,
+                "xp_earned": xp_earned,
+                "streak_bonus": streak_bonus,
+                "current_streak": state.current_streak,
+                "best_streak": state.best_streak,
+                "is_active": state.is_active,
+                # A lapsed streak restarted, see completion_counters
+                "streak_lowered": state.current_streak < previous_streak,
+            }
+            response = TaskCompletionResponse(
+                id=event["id"],
+                task_id=task.id,
+                completed_at=now,
+                xp_earned=xp_earned,
+                streak_bonus=streak_bonus,
+                new_level=new_level if level_up else None,
+                level_up=level_up
+            )
+            if key is not None:
+                event.update(key=key, fingerprint=fingerprint, response=response.model_dump_json())
+                self._pending_keys[(user.id, key)] = (fingerprint, event["response"])
+
+            if self._file is not None:
+                self._file.write(_dump(event) + "\n")
+                self._file.flush()
+            self._next_id += 1
+            self._pending.append(event)
+            # Re-inserted, so the oldest entries are the ones trimmed
+            self._tasks.pop(task.id, None)
+            self._tasks[task.id] = SimpleNamespace(
+                last_completed=now, current_streak=state.current_streak, best_streak=state.best_streak
+            )
+            self._pending_xp[user.id] = self._pending_xp.get(user.id, 0) + xp_earned
+            if len(self._pending) == 1:
+                self._wake.notify()
+            return response
+
+    # Writer
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._pending and not self._stopping:
+                    self._wake.wait()
+                if not self._pending:
+                    return
+                # Let the group fill up before committing it, unless a
+                # pause or stop is waiting for the drain
+                deadline = time.monotonic() + self.flush_seconds
+                while not self._stopping and not self._direct_writers:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wake.wait(remaining)
+
+                self._applying, self._pending = self._pending, []
+                if self._file is not None:
+                    self._file.close()
+                    os.replace(self.path, self.path + ".applying")
+                    self._file = open(self.path, "a", encoding="utf-8")
+
+            while True:
+                try:
+                    awarded = self._apply_group(self._applying)
+                    break
+                except Exception:
+                    logger.exception("Applying %d journaled completions failed; retrying",
+                                     len(self._applying))
+                    time.sleep(JOURNAL_RETRY_SECONDS)
+            if self.path:
+                os.remove(self.path + ".applying")
+            self._applied(awarded)
+
+    def _apply_group(self, events: List[dict]) -> Dict[int, tuple]:
+        db = self._session_factory()
+        try:
+            awarded = apply_events(db, events)
+            db.commit()
+            return awarded
+        finally:
+            db.close()
+
+    def _applied(self, awarded: Dict[int, tuple]):
+        for user_id, (old_xp, xp, _) in awarded.items():
+            invalidate_user(user_id)
+            rank_index.update(old_xp, old_xp + xp)
+
+        with self._lock:
+            for event in self._applying:
+                if "key" in event:
+                    remember_response(event["user_id"], event["key"], event["fingerprint"],
+                                      event["response"], event["completed_at"])
+                    self._pending_keys.pop((event["user_id"], event["key"]), None)
+            for user_id, (old_xp, xp, level) in awarded.items():
+                # Re-inserted, so the oldest entries are the ones trimmed
+                self._users.pop(user_id, None)
+                self._users[user_id] = (old_xp + xp, level)
+                left = self._pending_xp.get(user_id, 0) - xp
+                if left:
+                    self._pending_xp[user_id] = left
+                else:
+                    self._pending_xp.pop(user_id, None)
+            while len(self._tasks) > TASK_STATES_SIZE:
+                del self._tasks[next(iter(self._tasks))]
+            while len(self._users) > TASK_STATES_SIZE:
+                del self._users[next(iter(self._users))]
+
+            self.groups += 1
+            self.applied += len(self._applying)
+            self._applying = []
+            self._drained.notify_all()
+
+    # Recovery
+
+    def _recover(self) -> int:
+        events = {}
+        for path in (self.path + ".applying", self.path):
+            if os.path.exists(path):
+                for event in _read_events(path):
+                    events[event["id"]] = event
+        if events:
+            db = self._session_factory()
+            try:
+                existing = set()
+                ids = list(events)
+                for start in range(0, len(ids), 500):
+                    existing.update(db.scalars(
+                        select(TaskCompletion.id).where(TaskCompletion.id.in_(ids[start:start + 500]))
+                    ))
+                missing = [event for event_id, event in sorted(events.items()) if event_id not in existing]
+                if missing:
+                    apply_events(db, missing)
+                    db.commit()
+            finally:
+                db.close()
+        else:
+            missing = []
+        for path in (self.path + ".applying", self.path):
+            if os.path.exists(path):
+                os.remove(path)
+        return len(missing)
+
+    def _max_completion_id(self) -> int:
+        db = self._session_factory()
+        try:
+            return db.scalar(select(func.coalesce(func.max(TaskCompletion.id), 0)))
+        finally:
+            db.close()
+
+
+def _unavailable(detail: str):
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={"Retry-After": str(JOURNAL_RETRY_SECONDS)},
+    )
+
+
+def apply_events(db: Session, events: List[dict]) -> Dict[int, tuple]:
+    """Write journaled completions in the session's transaction (caller commits).
+
+    Returns {user id: (total XP before, XP added, level after)}.
+    """
+    db.execute(insert(TaskCompletion), [
+        {
+            "id": event["id"],
+            "task_id": event["task_id"],
+            "user_id": event["user_id"],
+            "completed_at": event["completed_at"],
+            "xp_earned": event["xp_earned"],
+            "streak_bonus": event["streak_bonus"],
+        }
+        for event in events
+    ])
+
+    # Events are in id order, so the last one per task is its final state
+    tasks = {event["task_id"]: event for event in events}
+    db.execute(
+        update(tasks_table).where(tasks_table.c.id == bindparam("task_id")).values(
+            status=TaskStatus.COMPLETED,
+            last_completed=bindparam("completed_at"),
+            current_streak=bindparam("streak"),
+            best_streak=bindparam("best")
+        ),
+        [
+            {
+                "task_id": task_id,
+                "completed_at": event["completed_at"],
+                "streak": event["current_streak"],
+                "best": event["best_streak"],
+            }
+            for task_id, event in tasks.items()
+        ]
+    )
+
+    users = {}
+    days = {}
+    for event in events:
+        user = users.setdefault(event["user_id"], [0, 0, 0, 0, False])
+        user[0] += event["xp_earned"]
+        user[1] += 1
+        user[2] = max(user[2], event["best_streak"])
+        if event["is_active"]:
+            user[3] = max(user[3], event["current_streak"])
+        # Journals written before the flag existed lack it
+        user[4] = user[4] or event.get("streak_lowered", False)
+
+        day = days.setdefault(
+            (event["user_id"], event["completed_at"].date()), [event["completed_at"], 0, 0, 0]
+        )
+        day[1] += event["xp_earned"]
+        day[2] += event["streak_bonus"]
+        day[3] += 1
+
+    awarded = {}
+    for user_id, (xp, count, best_streak, current_streak, streak_lowered) in users.items():
+        old_xp, _, new_level = award_xp(db, user_id, xp, completion_counters(
+            count, best_streak, current_streak, streak_lowered
+        ))
+        awarded[user_id] = (old_xp, xp, new_level)
+    for (user_id, _), (completed_at, xp_earned, streak_bonus, count) in days.items():
+        record_daily_xp(db, user_id, completed_at, xp_earned, streak_bonus, count)
+
+    keyed = [event for event in events if "key" in event]
+    if keyed:
+        # Only expired rows can be in the way: live keys were replayed
+        db.execute(delete(IdempotencyKey).where(
+            tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(
+                [(event["user_id"], event["key"]) for event in keyed]
+            )
+        ))
+        db.execute(insert(IdempotencyKey), [
+            {
+                "user_id": event["user_id"],
+                "key": event["key"],
+                "fingerprint": event["fingerprint"],
+                "response": event["response"],
+                "created_at": event["completed_at"],
+            }
+            for event in keyed
+        ])
+    return awarded
+
+
+def _dump(event: dict) -> str:
+    return json.dumps({**event, "completed_at": event["completed_at"].isoformat()})
+
+
+def _read_events(path: str) -> List[dict]:
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                # A write the crash cut short; it was never acknowledged
+                break
+            event["completed_at"] = datetime.fromisoformat(event["completed_at"])
+            events.append(event)
+    return events
+
+
+completion_journal = (
+    CompletionJournal(None if COMPLETION_JOURNAL == "memory" else COMPLETION_JOURNAL)
+    if COMPLETION_JOURNAL else None
+)
+
+
+def pauses_journal(endpoint):
+    """Decorator for endpoints writing completions to the database directly.
+
+    The pause is taken inside the endpoint call, on the thread that runs
+    it: held by a yield dependency, its release would need a threadpool
+    slot that requests waiting for the drain may all be holding. Expects
+    a `current_user` parameter.
+    """
+    if completion_journal is None:
+        return endpoint
+
+    @wraps(endpoint)
+    def paused_endpoint(*args, **kwargs):
+        with completion_journal.paused(kwargs["current_user"].id):
+            return endpoint(*args, **kwargs)
+
+    # Async mode takes the pause with paused_async() around __wrapped__
+    paused_endpoint.pauses_journal = True
+    return paused_endpoint
@@ -0,0 +1,137 @@
+"""Leaderboards: global rank by total XP and weekly XP per category"""
+
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from .cache import TTLCache
+from .models import FrequencyType, Task, TaskCompletion, User
+from .periods import period_start
+
+LEADERBOARD_TTL_SECONDS = float(os.getenv("LIFERPG_LEADERBOARD_TTL", "300"))
+CATEGORY_BOARD_TTL_SECONDS = 60
+
+
+class RankIndex:
+    """Sorted array of every user's total XP.
+
+    A user's rank is 1 + the number of users with more XP, found by
+    bisection in O(log n) instead of a COUNT over the users table. Writes
+    in this process update the array in place. A full reload after `ttl`
+    seconds picks up other workers' writes and corrects any drift from
+    races with a concurrent reload.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._xps = array("q")
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def rank(self, db: Session, xp: int) -> int:
+        self._ensure_loaded(db)
+        with self._lock:
+            return len(self._xps) - bisect_right(self._xps, xp) + 1
+
+    def size(self, db: Session) -> int:
+        self._ensure_loaded(db)
+        return len(self._xps)
+
+    def add(self, xp: int):
+        with self._lock:
+            if self._loaded_at is not None:
+                insort(self._xps, xp)
+
+    def update(self, old_xp: int, new_xp: int):
+        """Move one user from old_xp to new_xp (call after the commit)"""
+        with self._lock:
+            if self._loaded_at is None or old_xp == new_xp:
+                return
+            index = bisect_left(self._xps, old_xp)
+            if index < len(self._xps) and self._xps[index] == old_xp:
+                del self._xps[index]
+            insort(self._xps, new_xp)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self, db: Session):
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at <= self.ttl:
+            return
+        # One row per distinct XP value, read off the total_xp index in order
+        xps = array("q")
+        for xp, count in db.query(User.total_xp, func.count(User.id)).group_by(
+            User.total_xp
+        ).order_by(User.total_xp):
+            xps.extend(repeat(xp or 0, count))
+        with self._lock:
+            self._xps = xps
+            self._loaded_at = time.monotonic()
+
+
+rank_index = RankIndex(ttl=LEADERBOARD_TTL_SECONDS)
+
+# (category_id, week start) -> ([(user_id, xp, rank), ...], {user_id: position})
+category_boards = TTLCache(maxsize=64, ttl=CATEGORY_BOARD_TTL_SECONDS)
+
+
+def top_users(db: Session, limit: int) -> List[User]:
+    return db.query(User).order_by(User.total_xp.desc(), User.id.desc()).limit(limit).all()
+
+
+def users_around(db: Session, user: User, count: int) -> List[User]:
+    """Up to `count` users on each side of `user` in leaderboard order.
+
+    Both sides are short range scans of ix_users_xp_rank starting at the
+    user's own (total_xp, id) key.
+    """
+    key = tuple_(User.total_xp, User.id)
+    me = tuple_(user.total_xp, user.id)
+
+    above = db.query(User).filter(key > me).order_by(
+        User.total_xp, User.id
+    ).limit(count).all()
+
+    below = db.query(User).filter(key < me).order_by(
+        User.total_xp.desc(), User.id.desc()
+    ).limit(count).all()
+
+    return above[::-1] + [user] + below
+
+
+def category_board(
+    db: Session, category_id: int, now: datetime
+) -> Tuple[List[Tuple[int, int, int]], Dict[int, int]]:
+    """Every user with XP in the category since Monday as (user_id, xp, rank),
+    highest first, plus each user's position in that list"""
+    week_start = period_start(FrequencyType.WEEKLY, now)
+    key = (category_id, week_start)
+    board = category_boards.get(key)
+    if board is None:
+        xp = func.sum(TaskCompletion.xp_earned)
+        board = db.query(TaskCompletion.user_id, xp).join(
+            Task, Task.id == TaskCompletion.task_id
+        ).filter(
+            Task.category_id == category_id,
+            TaskCompletion.completed_at >= week_start
+        ).group_by(TaskCompletion.user_id).order_by(
+            xp.desc(), TaskCompletion.user_id
+        ).all()
+        ranked = []
+        for position, (user_id, total) in enumerate(board):
+            tied = ranked and ranked[-1][1] == total
+            ranked.append((user_id, total, ranked[-1][2] if tied else position + 1))
+        positions = {user_id: position for position, (user_id, _, _) in enumerate(ranked)}
+        board = (ranked, positions)
+        category_boards.set(key, board)
+    return board
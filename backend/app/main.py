@@ -1,22 +1,52 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import engine, SessionLocal, Base
+from .auth import token_cache, user_cache
+from .compression import COMPRESSION_ENABLED, CompressionMiddleware
+from .database import engine, async_engine, SessionLocal, ASYNC_MODE, SQLALCHEMY_DATABASE_URL
+from .database import async_read_engine, read_engine
+from .journal import completion_journal
+from .metrics import METRICS_ENABLED, PROMETHEUS_CONTENT_TYPE, MetricsMiddleware
+from .metrics import instrument_engine, registry
+from .rollover import ROLLOVER_SCHEDULER_ENABLED, RolloverScheduler
 from .routers import auth, categories, tasks, stats
+from .schema import ensure_schema
 from .seed import seed_categories
+from .serialization import FastJSONResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs once per worker at startup, not at import time
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        seed_categories(db)
+    finally:
+        db.close()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+    if completion_journal is not None:
+        completion_journal.start(SQLALCHEMY_DATABASE_URL)
+    scheduler = None
+    if ROLLOVER_SCHEDULER_ENABLED:
+        scheduler = RolloverScheduler(SessionLocal)
+        scheduler.start()
+    yield
+    if scheduler is not None:
+        scheduler.stop()
+    if completion_journal is not None:
+        completion_journal.stop()
 
-# Seed initial data
-db = SessionLocal()
-seed_categories(db)
-db.close()
 
 app = FastAPI(
     title="LifeRPG API",
     description="Gamifica tu vida con hábitos y rutinas estilo RPG",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # CORS configuration
@@ -36,11 +66,30 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
+
+if METRICS_ENABLED:
+    # Added last so it wraps everything, CORS included
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine)
+    if read_engine is not None:
+        instrument_engine(read_engine)
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine)
+    if async_read_engine is not None:
+        instrument_engine(async_read_engine.sync_engine)
+
 # Include routers
-app.include_router(auth.router)
-app.include_router(categories.router)
-app.include_router(tasks.router)
-app.include_router(stats.router)
+routers = [auth.router, categories.router, tasks.router, stats.router]
+
+if ASYNC_MODE:
+    from .async_routes import mirror_router
+
+    routers = [mirror_router(router) for router in routers]
+
+for router in routers:
+    app.include_router(router)
 
 
 @app.get("/")
@@ -53,5 +102,21 @@ def root():
 
 
 @app.get("/health")
-def health_check():
-    return {"status": "healthy"}
+async def health_check():
+    # Async: a probe never waits for a threadpool thread
+    health = {
+        "status": "healthy",
+        "auth_cache": {
+            "tokens": token_cache.stats(),
+            "users": user_cache.stats(),
+        },
+    }
+    if completion_journal is not None:
+        health["completion_journal"] = completion_journal.stats()
+    return health
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Per-route latency, status and SQL counters in Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,161 @@
+"""Maintenance commands.
+
+Usage: python -m app.manage <command> [options]
+"""
+
+import argparse
+import sys
+import time
+
+from .database import engine, SessionLocal, SQLALCHEMY_DATABASE_URL
+from .generate import GENERATED_PASSWORD, generate, generated_email
+from .idempotency import prune_idempotency_keys
+from .importer import ImportFileError, import_format, import_history, parse_import
+from .models import User
+from .progression import relevel_users
+from .rollups import backfill_daily_xp
+from .rollover import ROLLOVER_CHUNK_SIZE, roll_over
+from .schema import ensure_schema
+from .user_stats import recount_user_stats
+
+
+def backfill_xp(db, args):
+    rows = backfill_daily_xp(db, user_id=args.user_id)
+    print(f"Rebuilt {rows} daily XP rows")
+
+
+def relevel(db, args):
+    rows = relevel_users(db)
+    print(f"Updated level or title of {rows} users")
+
+
+def recount_stats(db, args):
+    rows = recount_user_stats(db, user_id=args.user_id)
+    db.commit()
+    print(f"Recounted completions and streaks of {rows} users")
+
+
+def rollover(db, args):
+    def report(result):
+        print(f"  {result.tasks} tasks", flush=True)
+
+    result = roll_over(db, chunk_size=args.chunk_size, progress=report)
+    rate = result.tasks / result.seconds if result.seconds else 0
+    print(
+        f"Rolled over {result.tasks} tasks ({result.streaks_broken} streaks broken, "
+        f"{result.users} users) in {result.seconds:.1f}s, {rate:.0f} tasks/s"
+    )
+
+
+def prune_keys(db, args):
+    rows = prune_idempotency_keys(db)
+    print(f"Deleted {rows} expired idempotency keys")
+
+
+def import_file(db, args):
+    user = db.query(User).filter(User.id == args.user_id).first()
+    if not user:
+        sys.exit(f"User {args.user_id} not found")
+
+    with open(args.file, "rb") as f:
+        raw = f.read()
+
+    def report(done, total):
+        print(f"  {done}/{total} completions", flush=True)
+
+    try:
+        data = parse_import(raw, args.format or import_format(args.file))
+        result = import_history(db, user, data, progress=report)
+    except ImportFileError as e:
+        sys.exit(f"Import failed: {e}")
+
+    print(
+        f"Imported {result.tasks_created} tasks and {result.completions_imported} completions "
+        f"({result.completions_skipped} skipped), +{result.total_xp_earned} XP, "
+        f"level {result.old_level} -> {result.new_level}"
+    )
+
+
+def generate_data(db, args):
+    def report(done, total):
+        print(f"  {done}/{total} users", flush=True)
+
+    started = time.perf_counter()
+    try:
+        counts = generate(
+            SQLALCHEMY_DATABASE_URL, args.users, args.tasks_per_user, args.years,
+            seed=args.seed, workers=args.workers, progress=report
+        )
+    except ValueError as e:
+        sys.exit(f"Generation failed: {e}")
+
+    print(
+        f"Generated {counts['users']} users, {counts['tasks']} tasks and "
+        f"{counts['completions']} completions in {time.perf_counter() - started:.1f}s"
+    )
+    print(f"Log in as {generated_email(0)} / {GENERATED_PASSWORD}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser(
+        "backfill-xp", help="Rebuild the daily XP rollup from task completions"
+    )
+    backfill.add_argument("--user-id", type=int, default=None)
+    backfill.set_defaults(func=backfill_xp)
+
+    commands.add_parser(
+        "relevel", help="Recompute every user's level and title from total XP"
+    ).set_defaults(func=relevel)
+
+    recount = commands.add_parser(
+        "recount-stats",
+        help="Rebuild users' completion count and streak counters from their history"
+    )
+    recount.add_argument("--user-id", type=int, default=None)
+    recount.set_defaults(func=recount_stats)
+
+    roller = commands.add_parser(
+        "rollover",
+        help="Reset lapsed recurring tasks and break missed streaks (run after each UTC midnight)"
+    )
+    roller.add_argument("--chunk-size", type=int, default=ROLLOVER_CHUNK_SIZE)
+    roller.set_defaults(func=rollover)
+
+    commands.add_parser(
+        "prune-idempotency-keys", help="Delete Idempotency-Key responses past their lifetime"
+    ).set_defaults(func=prune_keys)
+
+    importer = commands.add_parser(
+        "import", help="Import tasks and completion history from a CSV or JSON file"
+    )
+    importer.add_argument("file")
+    importer.add_argument("--user-id", type=int, required=True)
+    importer.add_argument("--format", choices=["csv", "json"], default=None)
+    importer.set_defaults(func=import_file)
+
+    generator = commands.add_parser(
+        "generate", help="Fill the database with synthetic users, tasks and completion history"
+    )
+    generator.add_argument("--users", type=int, required=True)
+    generator.add_argument("--tasks-per-user", type=int, default=10)
+    generator.add_argument("--years", type=float, default=1.0)
+    generator.add_argument("--seed", type=int, default=1)
+    generator.add_argument("--workers", type=int, default=1,
+                           help="Processes computing user shards in parallel")
+    generator.set_defaults(func=generate_data)
+
+    args = parser.parse_args(argv)
+
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        args.func(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Request and SQL instrumentation, exported in Prometheus text format.
+
+MetricsMiddleware times every HTTP request and labels it with the matched
+route template, so /tasks/1 and /tasks/2 share one series. The SQLAlchemy
+cursor hooks add each statement's count and time to the request that ran
+it, through a context variable that follows the request into the worker
+thread. Metrics are per process; scrape every worker.
+"""
+
+import os
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+METRICS_ENABLED = os.getenv("LIFERPG_METRICS", "1") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"  # Starlette appends the charset
+
+# [statements, seconds, current statement start] for the request being
+# served, None outside requests
+_request_sql: ContextVar[Optional[List]] = ContextVar("liferpg_request_sql", default=None)
+
+
+class RouteMetrics:
+    __slots__ = ("buckets", "count", "seconds", "statuses", "statements", "db_seconds")
+
+    def __init__(self, bucket_count: int):
+        self.buckets = [0] * bucket_count
+        self.count = 0
+        self.seconds = 0.0
+        self.statuses: Dict[int, int] = {}
+        self.statements = 0
+        self.db_seconds = 0.0
+
+
+class MetricsRegistry:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self._lock = threading.Lock()
+
+    def observe(
+        self, method: str, route: str, status: int, seconds: float,
+        statements: int, db_seconds: float
+    ):
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = RouteMetrics(len(self.buckets))
+            # Buckets are stored non-cumulative; render() adds them up
+            index = bisect_left(self.buckets, seconds)
+            if index < len(self.buckets):
+                metrics.buckets[index] += 1
+            metrics.count += 1
+            metrics.seconds += seconds
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.statements += statements
+            metrics.db_seconds += db_seconds
+
+    def render(self) -> str:
+        with self._lock:
+            routes = sorted(self._routes.items())
+            snapshot = [
+                (key, list(m.buckets), m.count, m.seconds, dict(m.statuses), m.statements, m.db_seconds)
+                for key, m in routes
+            ]
+
+        requests = [
+            "# HELP liferpg_http_requests_total HTTP requests by route and status.",
+            "# TYPE liferpg_http_requests_total counter",
+        ]
+        latency = [
+            "# HELP liferpg_http_request_duration_seconds HTTP request latency by route.",
+            "# TYPE liferpg_http_request_duration_seconds histogram",
+        ]
+        statements = [
+            "# HELP liferpg_db_statements_total SQL statements executed by route.",
+            "# TYPE liferpg_db_statements_total counter",
+        ]
+        db_time = [
+            "# HELP liferpg_db_seconds_total Time spent executing SQL by route.",
+            "# TYPE liferpg_db_seconds_total counter",
+        ]
+
+        for (method, route), buckets, count, seconds, statuses, sql_count, sql_seconds in snapshot:
+            labels = f'method="{method}",route="{route}"'
+            for status in sorted(statuses):
+                requests.append(
+                    f'liferpg_http_requests_total{{{labels},status="{status}"}} {statuses[status]}'
+                )
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, buckets):
+                cumulative += bucket
+                latency.append(
+                    f'liferpg_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            latency.append(
+                f'liferpg_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}'
+            )
+            latency.append(f"liferpg_http_request_duration_seconds_sum{{{labels}}} {seconds}")
+            latency.append(f"liferpg_http_request_duration_seconds_count{{{labels}}} {count}")
+            statements.append(f"liferpg_db_statements_total{{{labels}}} {sql_count}")
+            db_time.append(f"liferpg_db_seconds_total{{{labels}}} {sql_seconds}")
+
+        return "\n".join(requests + latency + statements + db_time) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware task/queue overhead)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        sql = [0, 0.0, 0.0]
+        token = _request_sql.set(sql)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            _request_sql.reset(token)
+            # The router stores the matched route in the scope
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            registry.observe(scope["method"], route, status_code, elapsed, sql[0], sql[1])
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sql = _request_sql.get()
+    if sql is not None:
+        sql[2] = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    sql = _request_sql.get()
+    if sql is not None:
+        sql[0] += 1
+        sql[1] += perf_counter() - sql[2]
+
+
+def instrument_engine(engine):
+    """Attribute the engine's SQL statements to the current request"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey, Enum, Index
+from sqlalchemy import or_
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -32,6 +33,12 @@ class User(Base):
     current_xp = Column(Integer, default=0)
     total_xp = Column(Integer, default=0)
 
+    # Completion counters kept by app.user_stats; the server default fills
+    # rows that existed before the columns were added
+    tasks_completed = Column(Integer, default=0, server_default="0")
+    current_streak = Column(Integer, default=0, server_default="0")
+    best_streak = Column(Integer, default=0, server_default="0")
+
     # Avatar info
     avatar_url = Column(String, nullable=True)
     title = Column(String, default="Novato")
@@ -42,6 +49,11 @@ class User(Base):
     tasks = relationship("Task", back_populates="user")
     task_completions = relationship("TaskCompletion", back_populates="user")
 
+    __table_args__ = (
+        # Leaderboard order: total XP, ties broken by newest user
+        Index("ix_users_xp_rank", "total_xp", "id"),
+    )
+
 
 class Category(Base):
     __tablename__ = "categories"
@@ -93,15 +105,29 @@ class Task(Base):
     category = relationship("Category", back_populates="tasks")
     completions = relationship("TaskCompletion", back_populates="task")
 
+    __table_args__ = (
+        # Keyset pagination order of GET /tasks/
+        Index("ix_tasks_user_created", "user_id", "created_at", "id"),
+    )
+
+
+# Tasks the period rollover may still have to touch. Partial, so the index
+# only holds live streaks and completed tasks, not every lapsed habit ever
+ROLLOVER_CANDIDATE = or_(Task.current_streak > 0, Task.status == TaskStatus.COMPLETED)
+Index(
+    "ix_tasks_rollover", Task.frequency, Task.last_completed,
+    sqlite_where=ROLLOVER_CANDIDATE, postgresql_where=ROLLOVER_CANDIDATE
+)
+
 
 class TaskCompletion(Base):
     __tablename__ = "task_completions"
 
     id = Column(Integer, primary_key=True, index=True)
-    task_id = Column(Integer, ForeignKey("tasks.id"))
+    task_id = Column(Integer, ForeignKey("tasks.id"), index=True)  # Task deletes and history
     user_id = Column(Integer, ForeignKey("users.id"))
 
-    completed_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, default=datetime.utcnow, index=True)  # Weekly boards
     xp_earned = Column(Integer)
     streak_bonus = Column(Integer, default=0)
 
@@ -109,6 +135,35 @@ class TaskCompletion(Base):
     task = relationship("Task", back_populates="completions")
     user = relationship("User", back_populates="task_completions")
 
+    __table_args__ = (
+        # Keyset pagination order of GET /stats/history
+        Index("ix_task_completions_user_completed", "user_id", "completed_at", "id"),
+    )
+
+
+class DailyXP(Base):
+    """Per-user, per-day rollup of task completions"""
+    __tablename__ = "daily_xp"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    xp_earned = Column(Integer, default=0)
+    completions = Column(Integer, default=0)
+    streak_bonus = Column(Integer, default=0)
+
+
+class IdempotencyKey(Base):
+    """Stored response of a request sent with an Idempotency-Key header"""
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String, primary_key=True)
+
+    fingerprint = Column(String)  # Hash of the route and body the key was first used for
+    response = Column(String, nullable=True)  # JSON body of the 200, set before the row commits
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # Pruning
+
 
 # XP level thresholds
 LEVEL_THRESHOLDS = {
@@ -134,6 +189,10 @@ LEVEL_THRESHOLDS = {
     20: 22000,
 }
 
+# Past the last threshold every level costs a flat amount of XP
+MAX_THRESHOLD_LEVEL = max(LEVEL_THRESHOLDS)
+XP_PER_LEVEL_AFTER_MAX = 5000
+
 TITLES = {
     1: "Novato",
     5: "Aprendiz",
@@ -143,18 +202,21 @@ TITLES = {
     25: "Leyenda",
 }
 
+_SORTED_TITLES = sorted(TITLES.items())
+
 
 def get_xp_for_next_level(level: int) -> int:
     """Get XP needed for next level"""
-    if level >= 20:
-        return LEVEL_THRESHOLDS[20] + (level - 20) * 5000
-    return LEVEL_THRESHOLDS.get(level + 1, LEVEL_THRESHOLDS[20])
+    if level >= MAX_THRESHOLD_LEVEL:
+        max_xp = LEVEL_THRESHOLDS[MAX_THRESHOLD_LEVEL]
+        return max_xp + (level - MAX_THRESHOLD_LEVEL) * XP_PER_LEVEL_AFTER_MAX
+    return LEVEL_THRESHOLDS.get(level + 1, LEVEL_THRESHOLDS[MAX_THRESHOLD_LEVEL])
 
 
 def get_title_for_level(level: int) -> str:
     """Get title based on level"""
     title = "Novato"
-    for lvl, t in sorted(TITLES.items()):
+    for lvl, t in _SORTED_TITLES:
         if level >= lvl:
             title = t
     return title
@@ -0,0 +1,38 @@
+"""Period boundaries for recurring tasks"""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from .models import FrequencyType
+
+
+RECURRING_FREQUENCIES = (
+    FrequencyType.DAILY,
+    FrequencyType.WEEKLY,
+    FrequencyType.MONTHLY,
+)
+
+
+def period_start(frequency: FrequencyType, now: datetime) -> Optional[datetime]:
+    """Get the start of the period containing `now` (None for one-time tasks)"""
+    day = datetime(now.year, now.month, now.day)
+
+    if frequency == FrequencyType.DAILY:
+        return day
+
+    elif frequency == FrequencyType.WEEKLY:
+        # Weeks start on Monday
+        return day - timedelta(days=day.weekday())
+
+    elif frequency == FrequencyType.MONTHLY:
+        return day.replace(day=1)
+
+    return None
+
+
+def previous_period_start(frequency: FrequencyType, now: datetime) -> Optional[datetime]:
+    """Get the start of the period before the one containing `now`"""
+    start = period_start(frequency, now)
+    if start is None:
+        return None
+    return period_start(frequency, start - timedelta(microseconds=1))
@@ -0,0 +1,108 @@
+"""Precomputed level progression.
+
+Thresholds and titles are tabulated once from LEVEL_THRESHOLDS and TITLES,
+so resolving a level from total XP is a binary search (closed form past
+the last tabulated level) instead of a loop over get_xp_for_next_level.
+"""
+
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, or_, update
+from sqlalchemy.orm import Session
+
+from .models import (
+    User, TITLES, MAX_THRESHOLD_LEVEL, XP_PER_LEVEL_AFTER_MAX, get_xp_for_next_level
+)
+
+# NEXT_LEVEL_XP[i] is the total XP needed to leave level i + 1
+NEXT_LEVEL_XP = [get_xp_for_next_level(level) for level in range(1, MAX_THRESHOLD_LEVEL + 1)]
+MAX_TABLE_XP = NEXT_LEVEL_XP[-1]
+
+TITLE_LEVELS = sorted(TITLES)
+TITLE_NAMES = [TITLES[level] for level in TITLE_LEVELS]
+
+
+def level_for_xp(total_xp: int) -> int:
+    """Level reached with a given amount of total XP"""
+    climbed = bisect_right(NEXT_LEVEL_XP, total_xp)
+    if climbed < MAX_THRESHOLD_LEVEL:
+        return 1 + climbed
+    return MAX_THRESHOLD_LEVEL + 1 + (total_xp - MAX_TABLE_XP) // XP_PER_LEVEL_AFTER_MAX
+
+
+def levels_for_xp(total_xps: Iterable[int]) -> List[int]:
+    return [level_for_xp(total_xp) for total_xp in total_xps]
+
+
+def xp_for_level(level: int) -> int:
+    """Minimum total XP of a level"""
+    if level <= 1:
+        return 0
+    return get_xp_for_next_level(level - 1)
+
+
+def title_for_level(level: int) -> str:
+    index = bisect_right(TITLE_LEVELS, level) - 1
+    return TITLE_NAMES[index] if index >= 0 else "Novato"
+
+
+def award_xp(db: Session, user_id: int, xp: int, values: Optional[Dict] = None) -> Tuple[int, int, int]:
+    """Add XP to a user and raise their level to match, without reading the row.
+
+    total_xp = total_xp + :xp in one UPDATE ... RETURNING, so concurrent
+    awards add up instead of overwriting each other; `values` are further
+    columns to set in the same statement. The level only ever moves up,
+    guarded in the WHERE clause. Returns (old total XP, old level, new
+    level); the caller commits and invalidates the cached user.
+    """
+    total_xp, level = db.execute(
+        update(User).where(User.id == user_id).values({
+            User.current_xp: User.current_xp + xp,
+            User.total_xp: User.total_xp + xp,
+            **(values or {})
+        }).returning(User.total_xp, User.level)
+        .execution_options(synchronize_session=False)
+    ).one()
+
+    new_level = level_for_xp(total_xp)
+    if new_level > level:
+        db.execute(
+            update(User).where(User.id == user_id, User.level < new_level).values({
+                User.level: new_level,
+                User.title: title_for_level(new_level)
+            }).execution_options(synchronize_session=False)
+        )
+    return total_xp - xp, level, max(level, new_level)
+
+
+def relevel_users(db: Session) -> int:
+    """Recompute every user's level and title from total XP in one UPDATE.
+
+    Meant to run after LEVEL_THRESHOLDS or TITLES change; unlike
+    award_xp it can also lower levels.
+    """
+    level = case(
+        (
+            User.total_xp >= MAX_TABLE_XP,
+            MAX_THRESHOLD_LEVEL + 1 + (User.total_xp - MAX_TABLE_XP) // XP_PER_LEVEL_AFTER_MAX
+        ),
+        *[
+            (User.total_xp >= xp, index + 2)
+            for index, xp in reversed(list(enumerate(NEXT_LEVEL_XP[:-1])))
+        ],
+        else_=1
+    )
+    title = case(
+        *[
+            (User.total_xp >= xp_for_level(title_level), name)
+            for title_level, name in reversed(list(zip(TITLE_LEVELS, TITLE_NAMES)))
+        ],
+        else_="Novato"
+    )
+
+    updated = db.query(User).filter(
+        or_(User.level != level, User.title != title)
+    ).update({User.level: level, User.title: title}, synchronize_session=False)
+    db.commit()
+    return updated
@@ -0,0 +1,297 @@
+"""Period rollover for recurring tasks.
+
+When a period ends, completed daily/weekly/monthly tasks go back to
+pending, and tasks that missed a whole period lose their streak. The
+rules are applied:
+
+- in bulk by roll_over(), from the in-process RolloverScheduler or from
+  `python -m app.manage rollover` in cron, right after each UTC midnight
+  (every period boundary is one)
+- per user by reset_lapsed_tasks() on task reads, so a missed or delayed
+  run never shows stale state; after a run it finds nothing to do
+
+roll_over() works per frequency on the partial ix_tasks_rollover index,
+with two range scans on last_completed: tasks that missed the whole
+previous period, then tasks completed in it. Each chunk is one UPDATE
+... RETURNING in its own transaction, so requests are never blocked for
+longer than a chunk.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import and_, case, literal, or_, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from .auth import invalidate_user
+from .models import ROLLOVER_CANDIDATE, Task, TaskStatus
+from .periods import RECURRING_FREQUENCIES, period_start, previous_period_start
+from .user_stats import refresh_current_streaks, refresh_streaks
+
+ROLLOVER_SCHEDULER_ENABLED = os.getenv("LIFERPG_ROLLOVER_SCHEDULER", "0") == "1"
+ROLLOVER_CHUNK_SIZE = int(os.getenv("LIFERPG_ROLLOVER_CHUNK_SIZE", "20000"))
+
+# Wait a little past midnight so clock skew between hosts cannot make a
+# run land just before the boundary
+ROLLOVER_DELAY_SECONDS = 5
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RolloverResult:
+    tasks: int = 0
+    # Lapsed tasks whose nonzero streak was reset, users whose current_streak
+    # was recomputed for it
+    streaks_broken: int = 0
+    users: int = 0
+    seconds: float = 0.0
+
+
+def _status_lapsed(now: datetime, frequencies=RECURRING_FREQUENCIES):
+    """Completed tasks whose period has ended"""
+    return and_(
+        Task.status == TaskStatus.COMPLETED,
+        or_(*[
+            and_(
+                Task.frequency == frequency,
+                or_(
+                    Task.last_completed.is_(None),
+                    Task.last_completed < period_start(frequency, now)
+                )
+            )
+            for frequency in frequencies
+        ])
+    )
+
+
+def _streak_lapsed(now: datetime, frequencies=RECURRING_FREQUENCIES):
+    """Streaks whose task missed the whole previous period"""
+    return and_(
+        Task.current_streak > 0,
+        or_(*[
+            and_(
+                Task.frequency == frequency,
+                Task.last_completed < previous_period_start(frequency, now)
+            )
+            for frequency in frequencies
+        ])
+    )
+
+
+def _rollover(now: datetime, frequencies=RECURRING_FREQUENCIES):
+    """(condition, values) of the UPDATE applying both rules"""
+    status_lapsed = _status_lapsed(now, frequencies)
+    streak_lapsed = _streak_lapsed(now, frequencies)
+    values = {
+        # Typed literal: a bare enum member would be bound as its value, not its name
+        Task.status: case(
+            (status_lapsed, literal(TaskStatus.PENDING, Task.status.type)), else_=Task.status
+        ),
+        Task.current_streak: case((streak_lapsed, 0), else_=Task.current_streak),
+    }
+    return or_(status_lapsed, streak_lapsed), values
+
+
+def reset_lapsed_tasks(db: Session, user_id: int, now: Optional[datetime] = None) -> int:
+    """Roll over one user's tasks; returns how many changed.
+
+    A plain SELECT runs first so reads that find nothing to reset never
+    take the database write lock.
+    """
+    now = now or datetime.utcnow()
+    lapsed, values = _rollover(now)
+
+    query = db.query(Task).filter(Task.user_id == user_id, lapsed)
+    if not db.query(query.exists()).scalar():
+        return 0
+
+    streaks_broken = db.query(
+        query.filter(_streak_lapsed(now)).exists()
+    ).scalar()
+    reset_count = query.update(values, synchronize_session=False)
+    if streaks_broken:
+        refresh_streaks(db, user_id)
+    db.commit()
+    if streaks_broken:
+        invalidate_user(user_id)
+    return reset_count
+
+
+def roll_over(
+    db: Session,
+    now: Optional[datetime] = None,
+    chunk_size: int = ROLLOVER_CHUNK_SIZE,
+    progress: Optional[Callable[[RolloverResult], None]] = None,
+) -> RolloverResult:
+    """Apply the rollover to every user's tasks, committing per chunk.
+
+    `progress(result)` is called after each chunk.
+    """
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+    result = RolloverResult()
+    users = set()
+
+    reset_status = case(
+        (Task.status == TaskStatus.COMPLETED, literal(TaskStatus.PENDING, Task.status.type)),
+        else_=Task.status
+    )
+
+    for frequency in RECURRING_FREQUENCIES:
+        start = period_start(frequency, now)
+        previous_start = previous_period_start(frequency, now)
+        # ROLLOVER_CANDIDATE verbatim, so SQLite picks the partial index
+        indexed = (Task.frequency == frequency, ROLLOVER_CANDIDATE)
+
+        # Missed the whole previous period: break the streak and reset the
+        # status. Written rows leave the partial index, so every chunk just
+        # takes the next ones from the front of the range. Some only have a
+        # status to reset (a completed import can end with a lapsed streak),
+        # so the chunk is read first: RETURNING only sees the new streak,
+        # and SQLite's can't reference a joined subquery.
+        missed_rule = (*indexed, Task.last_completed < previous_start)
+        missed = select(Task.id, Task.user_id, Task.current_streak).where(*missed_rule).limit(chunk_size)
+        while True:
+            # Core rows: loading them through the ORM costs more than the UPDATE
+            chunk = db.connection().execute(missed).all()
+            if not chunk:
+                break
+            lapsed = {task_id: (user_id, streak) for task_id, user_id, streak in chunk}
+            rows = db.scalars(
+                # last_completed again, for rows completed since the SELECT
+                update(Task).where(
+                    Task.id.in_(list(lapsed)),
+                    Task.last_completed < previous_start
+                )
+                .values({Task.current_streak: 0, Task.status: reset_status})
+                .returning(Task.id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            result.tasks += len(rows)
+
+            broken = [lapsed[task_id][0] for task_id in rows if lapsed[task_id][1] > 0]
+            result.streaks_broken += len(broken)
+            broken = set(broken)
+            if broken:
+                refresh_current_streaks(db, broken)
+            db.commit()
+            for user_id in broken:
+                invalidate_user(user_id)
+            users |= broken
+
+            if progress:
+                progress(result)
+            if len(chunk) < chunk_size:
+                break
+
+        # Completed in the previous period: only the status resets. The live
+        # streak keeps these rows in the index, so walk it with a cursor.
+        completed_rule = (
+            *indexed,
+            Task.last_completed >= previous_start,
+            Task.last_completed < start,
+            Task.status == TaskStatus.COMPLETED
+        )
+        completed = select(Task.id).where(*completed_rule).order_by(
+            Task.last_completed, Task.id
+        ).limit(chunk_size)
+        cursor = None
+        while True:
+            ids = completed
+            if cursor is not None:
+                ids = ids.where(tuple_(Task.last_completed, Task.id) > cursor)
+            rows = db.execute(
+                update(Task).where(
+                    Task.id.in_(ids.scalar_subquery()),
+                    Task.last_completed < start
+                )
+                .values({Task.status: TaskStatus.PENDING})
+                .returning(Task.last_completed, Task.id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            db.commit()
+            if not rows:
+                break
+            result.tasks += len(rows)
+            cursor = tuple(max(rows))
+
+            if progress:
+                progress(result)
+            if len(rows) < chunk_size:
+                break
+
+    # Marked completed by hand without ever being completed: no streak to break
+    result.tasks += db.execute(
+        update(Task).where(
+            Task.frequency.in_(RECURRING_FREQUENCIES),
+            Task.last_completed.is_(None),
+            ROLLOVER_CANDIDATE,
+            Task.status == TaskStatus.COMPLETED
+        ).values({Task.status: TaskStatus.PENDING})
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+
+    result.users = len(users)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def next_run(now: datetime) -> datetime:
+    """The first rollover time after `now`"""
+    midnight = datetime(now.year, now.month, now.day) + timedelta(days=1)
+    return midnight + timedelta(seconds=ROLLOVER_DELAY_SECONDS)
+
+
+class RolloverScheduler:
+    """Daemon thread running roll_over at startup and after every UTC midnight.
+
+    Runs in every worker that enables it. Concurrent runs are safe (each
+    UPDATE re-checks the rules) but wasted work, so enable it on one
+    worker or use the manage command from cron instead.
+    """
+
+    def __init__(self, session_factory, chunk_size: int = ROLLOVER_CHUNK_SIZE):
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+        self.last_result: Optional[RolloverResult] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rollover", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run_once(self) -> RolloverResult:
+        db = self.session_factory()
+        try:
+            self.last_result = roll_over(db, chunk_size=self.chunk_size)
+        finally:
+            db.close()
+        return self.last_result
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                result = self.run_once()
+                logger.info(
+                    "Rolled over %d tasks (%d streaks broken) in %.1fs",
+                    result.tasks, result.streaks_broken, result.seconds
+                )
+            except Exception:
+                logger.exception("Period rollover failed; retrying at the next boundary")
+            now = datetime.utcnow()
+            self._stop.wait((next_run(now) - now).total_seconds())
@@ -0,0 +1,99 @@
+"""Daily XP rollup maintenance"""
+
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .models import DailyXP, TaskCompletion
+
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def record_daily_xp(
+    db: Session,
+    user_id: int,
+    completed_at: datetime,
+    xp_earned: int,
+    streak_bonus: int,
+    completions: int = 1,
+):
+    """Add completions to the user's rollup row for that day (caller commits)"""
+    day = completed_at.date()
+
+    upsert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if upsert is not None:
+        # One statement: two requests creating the same day's row cannot collide
+        statement = upsert(DailyXP).values(
+            user_id=user_id,
+            day=day,
+            xp_earned=xp_earned,
+            completions=completions,
+            streak_bonus=streak_bonus
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[DailyXP.user_id, DailyXP.day],
+            set_={
+                "xp_earned": DailyXP.xp_earned + statement.excluded.xp_earned,
+                "completions": DailyXP.completions + statement.excluded.completions,
+                "streak_bonus": DailyXP.streak_bonus + statement.excluded.streak_bonus,
+            }
+        ))
+        return
+
+    updated = db.query(DailyXP).filter(
+        DailyXP.user_id == user_id,
+        DailyXP.day == day
+    ).update({
+        DailyXP.xp_earned: DailyXP.xp_earned + xp_earned,
+        DailyXP.completions: DailyXP.completions + completions,
+        DailyXP.streak_bonus: DailyXP.streak_bonus + streak_bonus,
+    }, synchronize_session=False)
+
+    if not updated:
+        db.add(DailyXP(
+            user_id=user_id,
+            day=day,
+            xp_earned=xp_earned,
+            completions=completions,
+            streak_bonus=streak_bonus
+        ))
+
+
+def backfill_daily_xp(db: Session, user_id: Optional[int] = None) -> int:
+    """Rebuild rollup rows from task_completions, for one user or everyone"""
+    rows = rebuild_daily_xp(db, user_id)
+    db.commit()
+    return rows
+
+
+def rebuild_daily_xp(connection: Connection, user_id: Optional[int] = None) -> int:
+    """backfill_daily_xp without the commit; works on a Connection or a Session"""
+    statement = delete(DailyXP)
+    if user_id is not None:
+        statement = statement.where(DailyXP.user_id == user_id)
+    connection.execute(statement)
+
+    day = func.date(TaskCompletion.completed_at)
+    source = select(
+        TaskCompletion.user_id,
+        day,
+        func.sum(TaskCompletion.xp_earned),
+        func.count(TaskCompletion.id),
+        func.coalesce(func.sum(TaskCompletion.streak_bonus), 0),
+    ).group_by(TaskCompletion.user_id, day)
+    if user_id is not None:
+        source = source.where(TaskCompletion.user_id == user_id)
+
+    result = connection.execute(insert(DailyXP).from_select(
+        ["user_id", "day", "xp_earned", "completions", "streak_bonus"],
+        source
+    ))
+    return result.rowcount
@@ -1,15 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
+from typing import Optional
 
 from ..database import get_db
+from ..leaderboard import rank_index
 from ..models import User
 from ..schemas import UserCreate, UserResponse, Token, UserLogin
 from ..auth import (
     get_password_hash,
     verify_password,
     create_access_token,
+    password_slot,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     get_current_user,
 )
@@ -17,8 +21,43 @@ from ..auth import (
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
+# The password endpoints are async so that waiting for bcrypt holds no
+# threadpool thread: the queries run in the threadpool, the hash on the
+# password pool
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    with password_slot():
+        await run_in_threadpool(check_available, db, user)
+        hashed_password = await get_password_hash(user.password)
+    return await run_in_threadpool(create_user, db, user, hashed_password)
+
+
+@router.post("/login", response_model=Token)
+async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+    with password_slot():
+        await authenticate(db, user_credentials.email, user_credentials.password)
+    return token_response(user_credentials.email)
+
+
+@router.post("/token", response_model=Token)
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db)
+):
+    with password_slot():
+        await authenticate(db, form_data.username, form_data.password)
+    return token_response(form_data.username)
+
+
+@router.get("/me", response_model=UserResponse)
+def get_me(current_user: User = Depends(get_current_user)):
+    return current_user
+
+
+# The steps around the password hash, shared with async mode's endpoints
+
+def check_available(db: Session, user: UserCreate):
+    """Refuse a taken email or username, then release the connection"""
     # Check if email exists
     db_user = db.query(User).filter(User.email == user.email).first()
     if db_user:
@@ -34,9 +73,10 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
+    db.rollback()
 
-    # Create new user
-    hashed_password = get_password_hash(user.password)
+
+def create_user(db: Session, user: UserCreate, hashed_password: str) -> User:
     db_user = User(
         email=user.email,
         username=user.username,
@@ -45,48 +85,35 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    rank_index.add(db_user.total_xp)
     return db_user
 
 
-@router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+async def authenticate(db: Session, email: str, password: str):
+    """Raise a 401 unless the password matches the user's stored hash"""
+    hashed_password = await run_in_threadpool(stored_hash, db, email)
+    if not hashed_password or not await verify_password(password, hashed_password):
+        raise_bad_credentials()
 
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
 
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+def stored_hash(db: Session, email: str) -> Optional[str]:
+    """The user's password hash, with the connection released after reading it"""
+    hashed_password = db.query(User.hashed_password).filter(User.email == email).scalar()
+    db.rollback()
+    return hashed_password
 
 
-@router.post("/token", response_model=Token)
-def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
-):
-    user = db.query(User).filter(User.email == form_data.username).first()
+def raise_bad_credentials():
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Incorrect email or password",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
 
+def token_response(email: str) -> dict:
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": email}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
-
-
-@router.get("/me", response_model=UserResponse)
-def get_me(current_user: User = Depends(get_current_user)):
-    return current_user
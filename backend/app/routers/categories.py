@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 
+from ..category_cache import category_cache
 from ..database import get_db
 from ..models import Category, User
 from ..schemas import CategoryCreate, CategoryResponse
@@ -9,20 +10,35 @@ from ..auth import get_current_user
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
+CATEGORY_MAX_AGE_SECONDS = 300
+
 
 @router.get("/", response_model=List[CategoryResponse])
-def get_categories(db: Session = Depends(get_db)):
-    return db.query(Category).all()
+def get_categories(request: Request, response: Response, db: Session = Depends(get_db)):
+    snapshot = category_cache.get(db)
+    if etag_matches(request, snapshot.etag):
+        return not_modified(snapshot.etag)
+
+    response.headers.update(cache_headers(snapshot.etag))
+    return snapshot.categories
 
 
 @router.get("/{category_id}", response_model=CategoryResponse)
-def get_category(category_id: int, db: Session = Depends(get_db)):
-    category = db.query(Category).filter(Category.id == category_id).first()
+def get_category(
+    category_id: int, request: Request, response: Response, db: Session = Depends(get_db)
+):
+    category = category_cache.get_category(db, category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
+
+    etag = category_cache.get(db).etags[category_id]
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    response.headers.update(cache_headers(etag))
     return category
 
 
@@ -35,5 +51,28 @@ def create_category(
     db_category = Category(**category.model_dump())
     db.add(db_category)
     db.commit()
+    category_cache.invalidate()
     db.refresh(db_category)
     return db_category
+
+
+def cache_headers(etag: str) -> dict:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={CATEGORY_MAX_AGE_SECONDS}",
+    }
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Evaluate If-None-Match against an ETag (weak comparison, as RFC 9110 asks)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [value.strip() for value in header.split(",")]
+    return etag in [value[2:] if value.startswith("W/") else value for value in candidates]
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
@@ -1,65 +1,55 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timedelta
 
-from ..database import get_db
-from ..models import User, Task, TaskCompletion, TaskStatus
+from ..category_cache import category_cache
+from ..database import get_read_db
+from ..export import MEDIA_TYPES, ExportFormat, export_completions
+from ..models import User, Task, TaskCompletion, TaskStatus, DailyXP
 from ..models import get_xp_for_next_level
-from ..schemas import UserStats, UserResponse, TaskCompletionResponse, DashboardStats, TaskResponse
+from ..leaderboard import category_board, rank_index, top_users, users_around
+from ..pagination import MAX_PAGE_SIZE, paginate
+from ..schemas import UserStats, UserResponse, TaskCompletionResponse, DashboardStats
+from ..schemas import LeaderboardEntry, LeaderboardResponse
+from ..serialization import COMPLETION_COLUMNS, TASK_COLUMNS, completion_dicts, json_response
+from ..serialization import task_dicts
 from ..auth import get_current_user
 
 router = APIRouter(prefix="/stats", tags=["Stats"])
 
 
 @router.get("/me", response_model=UserStats)
-def get_my_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    # Get completed tasks count
-    tasks_completed = db.query(TaskCompletion).filter(
-        TaskCompletion.user_id == current_user.id
-    ).count()
-
-    # Get best streak from all tasks
-    best_streak = db.query(func.max(Task.best_streak)).filter(
-        Task.user_id == current_user.id
-    ).scalar() or 0
-
-    # Get current active streak (highest among active tasks)
-    current_streak = db.query(func.max(Task.current_streak)).filter(
-        Task.user_id == current_user.id,
-        Task.is_active == True
-    ).scalar() or 0
+def get_my_stats(current_user: User = Depends(get_current_user)):
+    # Counters are kept on the user row (app.user_stats), usually served
+    # from the user cache without touching the database
+    return build_user_stats(current_user)
+
 
+def build_user_stats(user: User) -> UserStats:
     # Calculate XP to next level
-    xp_to_next = get_xp_for_next_level(current_user.level) - current_user.total_xp
+    xp_to_next = get_xp_for_next_level(user.level) - user.total_xp
 
     return UserStats(
-        level=current_user.level,
-        current_xp=current_user.current_xp,
+        level=user.level,
+        current_xp=user.current_xp,
         xp_to_next_level=max(0, xp_to_next),
-        total_xp=current_user.total_xp,
-        title=current_user.title,
-        tasks_completed=tasks_completed,
-        current_streak=current_streak,
-        best_streak=best_streak
+        total_xp=user.total_xp,
+        title=user.title,
+        tasks_completed=user.tasks_completed,
+        current_streak=user.current_streak,
+        best_streak=user.best_streak
     )
 
 
 @router.get("/dashboard", response_model=DashboardStats)
 def get_dashboard(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Get user stats
-    stats = get_my_stats(db=db, current_user=current_user)
-
-    # Get today's tasks
-    today = datetime.utcnow().date()
-    tasks = db.query(Task).filter(
+    tasks = db.query(*TASK_COLUMNS).filter(
         Task.user_id == current_user.id,
         Task.is_active == True
     ).all()
@@ -71,59 +61,149 @@ def get_dashboard(
         elif task.frequency.value == 'once' and task.status != TaskStatus.COMPLETED:
             today_tasks.append(task)
 
-    # Get recent completions (last 7 days)
     week_ago = datetime.utcnow() - timedelta(days=7)
-    recent_completions = db.query(TaskCompletion).filter(
+    recent_completions = db.query(*COMPLETION_COLUMNS).filter(
         TaskCompletion.user_id == current_user.id,
         TaskCompletion.completed_at >= week_ago
     ).order_by(TaskCompletion.completed_at.desc()).limit(10).all()
 
-    return DashboardStats(
-        user=current_user,
-        stats=stats,
-        today_tasks=today_tasks,
-        recent_completions=recent_completions
-    )
+    return json_response({
+        "user": UserResponse.model_validate(current_user).model_dump(),
+        "stats": build_user_stats(current_user).model_dump(),
+        "today_tasks": task_dicts(db, today_tasks),
+        "recent_completions": completion_dicts(recent_completions),
+    }, response)
 
 
 @router.get("/history", response_model=List[TaskCompletionResponse])
 def get_completion_history(
+    response: Response,
     days: int = 30,
-    limit: int = 50,
-    db: Session = Depends(get_db),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
+    """Newest completions first; follow X-Next-Cursor for older pages"""
     since = datetime.utcnow() - timedelta(days=days)
 
-    completions = db.query(TaskCompletion).filter(
+    query = db.query(*COMPLETION_COLUMNS).filter(
         TaskCompletion.user_id == current_user.id,
         TaskCompletion.completed_at >= since
-    ).order_by(TaskCompletion.completed_at.desc()).limit(limit).all()
+    )
+
+    rows = paginate(
+        query, TaskCompletion.completed_at, TaskCompletion.id, response, limit, cursor,
+        descending=True
+    )
+    return json_response(completion_dicts(rows), response)
+
+
+@router.get("/export")
+def export_history(
+    format: ExportFormat = ExportFormat.NDJSON,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream the user's full completion history as NDJSON or CSV"""
+    filename = f"liferpg-history.{format.value}"
+    return StreamingResponse(
+        export_completions(current_user.id, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/leaderboard", response_model=LeaderboardResponse)
+def get_leaderboard(
+    limit: int = Query(10, ge=1, le=100),
+    around: int = Query(2, ge=0, le=25),
+    category_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Top players plus the ranks around mine, by total XP or by this week's XP in a category"""
+    if category_id is not None:
+        return category_leaderboard(db, current_user, category_id, limit, around)
+
+    def entry(user: User) -> LeaderboardEntry:
+        return LeaderboardEntry(
+            rank=rank_index.rank(db, user.total_xp),
+            user_id=user.id,
+            username=user.username,
+            level=user.level,
+            title=user.title,
+            xp=user.total_xp
+        )
+
+    return LeaderboardResponse(
+        players=rank_index.size(db),
+        top=[entry(user) for user in top_users(db, limit)],
+        around_me=[entry(user) for user in users_around(db, current_user, around)],
+        me=entry(current_user)
+    )
+
 
-    return completions
+def category_leaderboard(
+    db: Session, current_user: User, category_id: int, limit: int, around: int
+) -> LeaderboardResponse:
+    if not category_cache.get_category(db, category_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+
+    board, positions = category_board(db, category_id, datetime.utcnow())
+    position = positions.get(current_user.id)
+    if position is None:
+        # No XP in this category yet: tied with everyone else at zero
+        ranked = board + [(current_user.id, 0, len(board) + 1)]
+        position = len(board)
+    else:
+        ranked = board
+
+    top = board[:limit]
+    window = ranked[max(0, position - around):position + around + 1]
+
+    user_ids = {user_id for user_id, _, _ in top + window}
+    users = {user.id: user for user in db.query(User).filter(User.id.in_(user_ids))}
+    users[current_user.id] = current_user
+
+    def entry(user_id: int, xp: int, rank: int) -> LeaderboardEntry:
+        user = users[user_id]
+        return LeaderboardEntry(
+            rank=rank,
+            user_id=user_id,
+            username=user.username,
+            level=user.level,
+            title=user.title,
+            xp=xp
+        )
+
+    return LeaderboardResponse(
+        category_id=category_id,
+        players=len(board),
+        top=[entry(*row) for row in top],
+        around_me=[entry(*row) for row in window],
+        me=entry(*ranked[position])
+    )
 
 
 @router.get("/xp-history")
 def get_xp_history(
     days: int = 30,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get daily XP earned over time"""
     since = datetime.utcnow() - timedelta(days=days)
 
-    completions = db.query(TaskCompletion).filter(
-        TaskCompletion.user_id == current_user.id,
-        TaskCompletion.completed_at >= since
+    # Read the pre-aggregated daily rollup
+    rows = db.query(DailyXP.day, DailyXP.xp_earned).filter(
+        DailyXP.user_id == current_user.id,
+        DailyXP.day >= since.date()
     ).all()
 
-    # Group by day
-    xp_by_day = {}
-    for completion in completions:
-        day = completion.completed_at.date().isoformat()
-        if day not in xp_by_day:
-            xp_by_day[day] = 0
-        xp_by_day[day] += completion.xp_earned
+    xp_by_day = {day.isoformat(): xp for day, xp in rows}
 
     # Fill in missing days with 0
     result = []
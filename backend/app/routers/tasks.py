@@ -1,30 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Response, UploadFile, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime, timedelta
 
+from ..category_cache import category_cache
+from ..completions import (
+    CONCURRENT_COMPLETION, OFFLINE_WINDOW_DAYS, apply_completion, as_utc, claim_completion,
+    completion_state, is_completed_for_period, offline_window_start
+)
 from ..database import get_db
-from ..models import Task, Category, User, TaskCompletion, TaskStatus, FrequencyType
-from ..models import get_xp_for_next_level, get_title_for_level, LEVEL_THRESHOLDS
+from ..idempotency import (
+    IDEMPOTENCY_KEY_MAX_LENGTH, claim_key, request_fingerprint, save_response, stored_response
+)
+from ..importer import ImportFileError, import_format, import_history, parse_import
+from ..journal import completion_journal, pauses_journal
+from ..leaderboard import rank_index
+from ..models import Task, User, TaskStatus, FrequencyType
+from ..pagination import MAX_PAGE_SIZE, paginate
+from ..progression import award_xp
+from ..rollover import reset_lapsed_tasks
+from ..rollups import record_daily_xp
 from ..schemas import (
     TaskCreate, TaskResponse, TaskUpdate,
-    TaskCompletionCreate, TaskCompletionResponse
+    TaskCompletionResponse,
+    TaskBatchCompletionRequest, TaskBatchCompletionResult, TaskBatchCompletionResponse,
+    TaskImportResponse
 )
-from ..auth import get_current_user
+from ..serialization import TASK_COLUMNS, json_response, task_dicts
+from ..user_stats import completion_counters, refresh_streaks
+from ..auth import get_current_user, invalidate_user
 
 router = APIRouter(prefix="/tasks", tags=["Tasks"])
 
+MAX_BATCH_COMPLETIONS = 500
+
 
 @router.get("/", response_model=List[TaskResponse])
 def get_tasks(
+    response: Response,
     frequency: Optional[FrequencyType] = None,
     status: Optional[TaskStatus] = None,
     category_id: Optional[int] = None,
     active_only: bool = True,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    query = db.query(Task).filter(Task.user_id == current_user.id)
+    """List tasks oldest first; pass `limit` to page through them with X-Next-Cursor"""
+    query = db.query(*TASK_COLUMNS).filter(Task.user_id == current_user.id)
 
     if active_only:
         query = query.filter(Task.is_active == True)
@@ -38,37 +62,30 @@ def get_tasks(
     if category_id:
         query = query.filter(Task.category_id == category_id)
 
-    tasks = query.all()
-
-    # Check and reset tasks based on frequency
-    for task in tasks:
-        if should_reset_task(task):
-            task.status = TaskStatus.PENDING
-            db.commit()
+    # Reset tasks based on frequency before reading them
+    reset_lapsed_tasks(db, current_user.id)
 
-    return tasks
+    rows = paginate(query, Task.created_at, Task.id, response, limit, cursor)
+    return json_response(task_dicts(db, rows), response)
 
 
 @router.get("/today", response_model=List[TaskResponse])
 def get_today_tasks(
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get tasks that should be done today"""
-    today = datetime.utcnow().date()
-
-    tasks = db.query(Task).filter(
+    query = db.query(*TASK_COLUMNS).filter(
         Task.user_id == current_user.id,
         Task.is_active == True
-    ).all()
+    )
 
-    today_tasks = []
-    for task in tasks:
-        # Reset if needed
-        if should_reset_task(task):
-            task.status = TaskStatus.PENDING
-            db.commit()
+    # Reset if needed
+    reset_lapsed_tasks(db, current_user.id)
 
+    today_tasks = []
+    for task in query.all():
         # Include daily tasks
         if task.frequency == FrequencyType.DAILY:
             today_tasks.append(task)
@@ -85,7 +102,7 @@ def get_today_tasks(
         elif task.frequency == FrequencyType.ONCE and task.status != TaskStatus.COMPLETED:
             today_tasks.append(task)
 
-    return today_tasks
+    return json_response(task_dicts(db, today_tasks), response)
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
@@ -114,7 +131,7 @@ def create_task(
     current_user: User = Depends(get_current_user)
 ):
     # Verify category exists
-    category = db.query(Category).filter(Category.id == task.category_id).first()
+    category = category_cache.get_category(db, task.category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -141,6 +158,7 @@ def create_task(
 
 
 @router.put("/{task_id}", response_model=TaskResponse)
+@pauses_journal
 def update_task(
     task_id: int,
     task_update: TaskUpdate,
@@ -162,12 +180,18 @@ def update_task(
     for field, value in update_data.items():
         setattr(task, field, value)
 
+    # Only active tasks count towards the user's current streak
+    if "is_active" in update_data:
+        refresh_streaks(db, current_user.id)
     db.commit()
+    if "is_active" in update_data:
+        invalidate_user(current_user.id)
     db.refresh(task)
     return task
 
 
 @router.delete("/{task_id}")
+@pauses_journal
 def delete_task(
     task_id: int,
     db: Session = Depends(get_db),
@@ -185,11 +209,15 @@ def delete_task(
         )
 
     db.delete(task)
+    # The task's completions stay counted; its streaks no longer do
+    refresh_streaks(db, current_user.id)
     db.commit()
+    invalidate_user(current_user.id)
     return {"message": "Task deleted successfully"}
 
 
 @router.post("/{task_id}/start", response_model=TaskResponse)
+@pauses_journal
 def start_task(
     task_id: int,
     db: Session = Depends(get_db),
@@ -213,13 +241,180 @@ def start_task(
     return task
 
 
+@router.post("/import", response_model=TaskImportResponse)
+@pauses_journal
+def import_tasks(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Import tasks and their completion history from a CSV or JSON file"""
+    try:
+        data = parse_import(file.file.read(), import_format(file.filename))
+        return import_history(db, current_user, data)
+    except ImportFileError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.post("/complete-batch", response_model=TaskBatchCompletionResponse)
+@pauses_journal
+def complete_tasks_batch(
+    batch: TaskBatchCompletionRequest,
+    idempotency_key: Optional[str] = Header(None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Complete many tasks at once, e.g. check-ins synced from offline clients"""
+    if len(batch.completions) > MAX_BATCH_COMPLETIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_COMPLETIONS} completions per batch"
+        )
+
+    fingerprint = request_fingerprint("/tasks/complete-batch", batch)
+    replayed = claim_key(db, current_user.id, idempotency_key, fingerprint)
+    if replayed is not None:
+        return replayed
+
+    task_ids = {item.task_id for item in batch.completions}
+    tasks = {
+        task.id: task
+        for task in db.query(Task).filter(
+            Task.user_id == current_user.id,
+            Task.id.in_(task_ids)
+        )
+    }
+    # Completions are replayed on plain copies, written back per task below
+    states = {task_id: completion_state(task) for task_id, task in tasks.items()}
+
+    # Apply completions in chronological order; untimed ones happen now
+    now = datetime.utcnow()
+    items = sorted(
+        enumerate(batch.completions),
+        key=lambda entry: as_utc(entry[1].completed_at) or now
+    )
+
+    window_start = offline_window_start(now)
+    results = [None] * len(batch.completions)
+    completions = []
+    first_completed_at = {}
+    for index, item in items:
+        completed_at = as_utc(item.completed_at) or now
+        task = states.get(item.task_id)
+
+        detail = None
+        if not task:
+            detail = "Task not found"
+        elif completed_at > now:
+            detail = "Completion time is in the future"
+        elif completed_at < window_start:
+            detail = f"Completion is older than the {OFFLINE_WINDOW_DAYS:g}-day offline window"
+        elif task.created_at and completed_at < task.created_at:
+            detail = "Completion is older than the task"
+        elif task.last_completed and completed_at < task.last_completed:
+            detail = "Completion is older than the task's last completion"
+        elif is_completed_for_period(task, completed_at):
+            detail = "Task already completed for this period"
+
+        if detail:
+            results[index] = TaskBatchCompletionResult(
+                task_id=item.task_id, completed=False, detail=detail
+            )
+            continue
+
+        completions.append((index, apply_completion(task, completed_at)))
+        first_completed_at.setdefault(task.id, completed_at)
+
+    # A task another request completed since it was read keeps that
+    # request's state, and loses all of its completions in this batch
+    lost = {
+        task_id for task_id, completed_at in first_completed_at.items()
+        if not claim_completion(db, states[task_id], tasks[task_id].last_completed, completed_at)
+    }
+    for index, completion in completions:
+        if completion.task_id in lost:
+            results[index] = TaskBatchCompletionResult(
+                task_id=completion.task_id, completed=False, detail=CONCURRENT_COMPLETION
+            )
+    completions = [entry for entry in completions if entry[1].task_id not in lost]
+
+    daily_xp = {}
+    for _, completion in completions:
+        day = daily_xp.setdefault(completion.completed_at.date(), [completion.completed_at, 0, 0, 0])
+        day[1] += completion.xp_earned
+        day[2] += completion.streak_bonus
+        day[3] += 1
+
+    # Update user XP, level and counters once for the whole batch
+    total_xp = sum(completion.xp_earned for _, completion in completions)
+    completed_ids = [task_id for task_id in first_completed_at if task_id not in lost]
+    completed_tasks = [states[task_id] for task_id in completed_ids]
+    old_xp, old_level, new_level = award_xp(db, current_user.id, total_xp, completion_counters(
+        len(completions),
+        max((task.best_streak for task in completed_tasks), default=0),
+        max((task.current_streak for task in completed_tasks if task.is_active), default=0),
+        streak_lowered=any(
+            states[task_id].current_streak < tasks[task_id].current_streak for task_id in completed_ids
+        )
+    ))
+
+    db.add_all([completion for _, completion in completions])
+    for completed_at, xp_earned, streak_bonus, count in daily_xp.values():
+        record_daily_xp(db, current_user.id, completed_at, xp_earned, streak_bonus, count)
+    db.flush()
+
+    for index, completion in completions:
+        results[index] = TaskBatchCompletionResult(
+            task_id=completion.task_id,
+            completed=True,
+            completion=TaskCompletionResponse(
+                id=completion.id,
+                task_id=completion.task_id,
+                completed_at=completion.completed_at,
+                xp_earned=completion.xp_earned,
+                streak_bonus=completion.streak_bonus
+            )
+        )
+
+    response = TaskBatchCompletionResponse(
+        results=results,
+        total_xp_earned=total_xp,
+        old_level=old_level,
+        new_level=new_level,
+        level_up=new_level > old_level
+    )
+    save_response(db, current_user.id, idempotency_key, response)
+    db.commit()
+    invalidate_user(current_user.id)
+    rank_index.update(old_xp, old_xp + total_xp)
+    return response
+
+
 @router.post("/{task_id}/complete", response_model=TaskCompletionResponse)
 def complete_task(
     task_id: int,
+    idempotency_key: Optional[str] = Header(None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Complete a task and earn XP"""
+    """Complete a task and earn XP.
+
+    Safe to retry with the same Idempotency-Key header: the first response
+    is replayed instead of awarding XP again.
+    """
+    fingerprint = request_fingerprint(f"/tasks/{task_id}/complete")
+    if completion_journal is not None:
+        # The journal records the key along with the completion
+        replayed = stored_response(db, current_user.id, idempotency_key, fingerprint)
+        direct_writes = completion_journal.direct_writes(current_user.id)
+    else:
+        replayed = claim_key(db, current_user.id, idempotency_key, fingerprint)
+    if replayed is not None:
+        return replayed
+
     task = db.query(Task).filter(
         Task.id == task_id,
         Task.user_id == current_user.id
@@ -231,59 +426,41 @@ def complete_task(
             detail="Task not found"
         )
 
-    if task.status == TaskStatus.COMPLETED and task.frequency != FrequencyType.ONCE:
-        # Check if it should be reset
-        if not should_reset_task(task):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Task already completed for this period"
-            )
+    now = datetime.utcnow()
+    if completion_journal is not None:
+        return completion_journal.complete(
+            task, current_user, now, direct_writes, idempotency_key, fingerprint
+        )
 
-    # Calculate XP with difficulty and streak bonus
-    base_xp = int(task.xp_reward * task.difficulty)
-
-    # Streak bonus (5% per streak day, max 50%)
-    streak_bonus = min(task.current_streak * 5, 50)
-    streak_xp = int(base_xp * streak_bonus / 100)
-
-    total_xp = base_xp + streak_xp
-
-    # Update task
-    task.status = TaskStatus.COMPLETED
-    task.last_completed = datetime.utcnow()
-    task.current_streak += 1
-    if task.current_streak > task.best_streak:
-        task.best_streak = task.current_streak
-
-    # Update user XP
-    old_level = current_user.level
-    current_user.current_xp += total_xp
-    current_user.total_xp += total_xp
-
-    # Check for level up
-    level_up = False
-    new_level = old_level
-
-    xp_for_next = get_xp_for_next_level(current_user.level)
-    while current_user.total_xp >= xp_for_next:
-        current_user.level += 1
-        current_user.title = get_title_for_level(current_user.level)
-        level_up = True
-        new_level = current_user.level
-        xp_for_next = get_xp_for_next_level(current_user.level)
-
-    # Create completion record
-    completion = TaskCompletion(
-        task_id=task.id,
-        user_id=current_user.id,
-        xp_earned=total_xp,
-        streak_bonus=streak_xp
+    if is_completed_for_period(task, now):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Task already completed for this period"
+        )
+
+    state = completion_state(task)
+    completion = apply_completion(state, now)
+    if not claim_completion(db, state, task.last_completed, now):
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=CONCURRENT_COMPLETION
+        )
+
+    # XP, level and counters in one UPDATE of the user row
+    old_xp, old_level, new_level = award_xp(
+        db, current_user.id, completion.xp_earned, completion_counters(
+            1, state.best_streak, state.current_streak if state.is_active else 0,
+            streak_lowered=state.current_streak < task.current_streak
+        )
     )
+
     db.add(completion)
-    db.commit()
-    db.refresh(completion)
+    record_daily_xp(db, current_user.id, now, completion.xp_earned, completion.streak_bonus)
+    db.flush()
 
-    return TaskCompletionResponse(
+    level_up = new_level > old_level
+    response = TaskCompletionResponse(
         id=completion.id,
         task_id=completion.task_id,
         completed_at=completion.completed_at,
@@ -292,32 +469,8 @@ def complete_task(
         new_level=new_level if level_up else None,
         level_up=level_up
     )
-
-
-def should_reset_task(task: Task) -> bool:
-    """Check if a task should be reset based on its frequency"""
-    if task.status != TaskStatus.COMPLETED:
-        return False
-
-    if task.frequency == FrequencyType.ONCE:
-        return False
-
-    if not task.last_completed:
-        return True
-
-    now = datetime.utcnow()
-    last = task.last_completed
-
-    if task.frequency == FrequencyType.DAILY:
-        return now.date() > last.date()
-
-    elif task.frequency == FrequencyType.WEEKLY:
-        # Reset on Monday
-        last_week = last.isocalendar()[1]
-        current_week = now.isocalendar()[1]
-        return current_week > last_week or now.year > last.year
-
-    elif task.frequency == FrequencyType.MONTHLY:
-        return now.month > last.month or now.year > last.year
-
-    return False
+    save_response(db, current_user.id, idempotency_key, response)
+    db.commit()
+    invalidate_user(current_user.id)
+    rank_index.update(old_xp, old_xp + completion.xp_earned)
+    return response
@@ -0,0 +1,120 @@
+"""Versioned schema setup.
+
+create_all and the missing-index pass reflect every table, and N workers
+running them at once race on CREATE TABLE. Instead, the schema_version
+table records which SCHEMA_VERSION the database was last brought up to:
+a current database costs one SELECT at startup. Otherwise one process
+takes a database-wide write lock, re-checks the version and applies
+create_all plus any columns and indexes missing from existing tables,
+then the data UPGRADES of the versions it skipped, while the other
+workers wait for it.
+
+Bump SCHEMA_VERSION whenever models.py gains a table, a column or an
+index. New columns on existing tables need a server_default (or to be
+nullable), and an UPGRADES entry when they must be filled from other
+tables.
+"""
+
+import time
+
+from sqlalchemy import Column, Integer, Table, delete, exc, insert, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateColumn
+
+from . import models  # noqa: F401  (registers the tables on Base.metadata)
+from .database import Base
+from .rollups import rebuild_daily_xp
+from .user_stats import recount_user_stats
+
+SCHEMA_VERSION = 4
+
+# Data fixes applied when a database moves past each version
+UPGRADES = {
+    1: rebuild_daily_xp,  # daily_xp, for databases from before schema versions
+    2: recount_user_stats,  # users.tasks_completed / best_streak / current_streak
+}
+
+# How long a worker waits for another one to finish migrating
+SCHEMA_LOCK_TIMEOUT_SECONDS = 600
+
+# Arbitrary key for PostgreSQL's advisory lock
+SCHEMA_LOCK_ID = 0x4C524750
+
+schema_version = Table(
+    "schema_version",
+    Base.metadata,
+    Column("version", Integer, primary_key=True),
+)
+
+
+def current_version(connection: Connection) -> int:
+    """The recorded schema version, 0 for databases that predate it"""
+    if not connection.dialect.has_table(connection, schema_version.name):
+        return 0
+    return connection.scalar(select(schema_version.c.version)) or 0
+
+
+def ensure_schema(engine: Engine) -> bool:
+    """Bring the database up to SCHEMA_VERSION; True if anything was applied"""
+    with engine.connect() as connection:
+        if current_version(connection) >= SCHEMA_VERSION:
+            return False
+        connection.rollback()
+
+        _lock(connection)
+        version = current_version(connection)
+        if version >= SCHEMA_VERSION:
+            connection.rollback()
+            return False
+
+        Base.metadata.create_all(bind=connection)
+        # create_all skips tables that already exist, including their new
+        # columns and indexes
+        _add_missing_columns(connection)
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
+        for upgrade_version, upgrade in sorted(UPGRADES.items()):
+            if upgrade_version > version:
+                upgrade(connection)
+
+        connection.execute(delete(schema_version))
+        connection.execute(insert(schema_version).values(version=SCHEMA_VERSION))
+        connection.commit()
+        return True
+
+
+def _add_missing_columns(connection: Connection):
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                definition = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {definition}"
+                )
+
+
+def _lock(connection: Connection):
+    """Open a transaction holding a lock that only one migrator can hold"""
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SELECT pg_advisory_xact_lock({SCHEMA_LOCK_ID})")
+        return
+    if connection.dialect.name != "sqlite":
+        return
+
+    # BEGIN IMMEDIATE takes SQLite's write lock up front. busy_timeout bounds
+    # each attempt, and a migration that builds indexes on big tables can
+    # outlast it, so keep retrying.
+    deadline = time.monotonic() + SCHEMA_LOCK_TIMEOUT_SECONDS
+    while True:
+        try:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            return
+        except exc.OperationalError:
+            connection.rollback()
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
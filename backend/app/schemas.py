@@ -123,6 +123,81 @@ class TaskCompletionResponse(BaseModel):
         from_attributes = True
 
 
+class TaskBatchCompletionItem(BaseModel):
+    task_id: int
+    completed_at: Optional[datetime] = None
+
+
+class TaskBatchCompletionRequest(BaseModel):
+    completions: List[TaskBatchCompletionItem]
+
+
+class TaskBatchCompletionResult(BaseModel):
+    task_id: int
+    completed: bool
+    detail: Optional[str] = None
+    completion: Optional[TaskCompletionResponse] = None
+
+
+class TaskBatchCompletionResponse(BaseModel):
+    results: List[TaskBatchCompletionResult]
+    total_xp_earned: int
+    old_level: int
+    new_level: int
+    level_up: bool = False
+
+
+# Leaderboard schemas
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    username: str
+    level: int
+    title: str
+    xp: int  # Total XP, or this week's XP in the category
+
+
+class LeaderboardResponse(BaseModel):
+    category_id: Optional[int] = None
+    players: int
+    top: List[LeaderboardEntry]
+    around_me: List[LeaderboardEntry]
+    me: LeaderboardEntry
+
+
+# Import schemas
+class ImportTask(BaseModel):
+    title: str
+    description: Optional[str] = None
+    category: Optional[str] = None  # Category name, or give category_id
+    category_id: Optional[int] = None
+    frequency: FrequencyType = FrequencyType.DAILY
+    xp_reward: Optional[int] = None
+    difficulty: float = 1.0
+    created_at: Optional[datetime] = None
+    is_active: bool = True
+
+
+class ImportCompletion(BaseModel):
+    task: str  # Title of a task in the same file
+    completed_at: datetime
+
+
+class TaskImportRequest(BaseModel):
+    tasks: List[ImportTask] = []
+    completions: List[ImportCompletion] = []
+
+
+class TaskImportResponse(BaseModel):
+    tasks_created: int
+    completions_imported: int
+    completions_skipped: int
+    total_xp_earned: int
+    old_level: int
+    new_level: int
+    level_up: bool = False
+
+
 # Token schemas
 class Token(BaseModel):
     access_token: str
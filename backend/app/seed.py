@@ -1,8 +1,13 @@
 """Seed data for initial categories"""
 
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from .models import Category
 
+# Dialects with INSERT ... ON CONFLICT DO NOTHING
+INSERT_IGNORE = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
 
 DEFAULT_CATEGORIES = [
     {
@@ -79,14 +84,27 @@ DEFAULT_CATEGORIES = [
 
 
 def seed_categories(db: Session):
-    """Seed default categories if they don't exist"""
-    existing = db.query(Category).count()
-    if existing > 0:
+    """Seed default categories if there are none yet.
+
+    Safe when several workers start at once: rows another worker inserted
+    first are skipped by name instead of failing the unique constraint.
+    """
+    if db.query(Category.id).first():
         return False
 
-    for cat_data in DEFAULT_CATEGORIES:
-        category = Category(**cat_data)
-        db.add(category)
+    insert_ignore = INSERT_IGNORE.get(db.get_bind().dialect.name)
+    if insert_ignore:
+        db.execute(
+            insert_ignore(Category).values(DEFAULT_CATEGORIES)
+            .on_conflict_do_nothing(index_elements=[Category.name])
+        )
+        db.commit()
+        return True
 
-    db.commit()
+    try:
+        db.add_all([Category(**cat_data) for cat_data in DEFAULT_CATEGORIES])
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
     return True
@@ -0,0 +1,107 @@
+"""Per-user completion counters.
+
+users.tasks_completed, best_streak and current_streak mirror COUNT over
+the user's task_completions, MAX(best_streak) over their tasks and
+MAX(current_streak) over their active tasks, so /stats/me and the
+dashboard read them from the user row instead of aggregating history.
+
+A completion raises its task's best streak, and raises its current
+streak unless it lands after a missed period the rollover has not
+caught up with yet: record_streak then restarts the streak at 1. So
+completions update the counters with SQL increments and maxes in the
+same transaction, except current_streak after such a restart, which is
+re-aggregated from the user's tasks. Task edits, deletes and the period
+rollover can lower the maxima too; those re-aggregate the user's tasks
+(not their completions). recount_user_stats rebuilds everything.
+"""
+
+from typing import Iterable, Optional
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .models import Task, TaskCompletion, User
+
+users = User.__table__
+
+
+def _greatest(column, value: int):
+    # GREATEST() is not portable to SQLite, whose two-argument max() is not to PostgreSQL
+    return case((column < value, value), else_=column)
+
+
+def _best_streak():
+    return select(func.coalesce(func.max(Task.best_streak), 0)).where(
+        Task.user_id == users.c.id
+    ).scalar_subquery()
+
+
+def _current_streak():
+    return select(func.coalesce(func.max(Task.current_streak), 0)).where(
+        Task.user_id == users.c.id,
+        Task.is_active == True
+    ).scalar_subquery()
+
+
+def completion_counters(
+    count: int, best_streak: int, current_streak: int, streak_lowered: bool = False
+) -> dict:
+    """Counter updates for `count` new completions whose tasks reached the given streaks.
+
+    SQL expressions, so concurrent requests of the same user add up instead
+    of overwriting each other; pass them to progression.award_xp, which
+    sets them in its UPDATE. Pass current_streak=0 for inactive tasks, and
+    streak_lowered=True when a completion left a task's current streak
+    below the stored one (a lapsed streak restarted): current_streak is
+    then re-aggregated from the tasks, whose UPDATE must come first.
+    """
+    return {
+        User.tasks_completed: User.tasks_completed + count,
+        User.best_streak: _greatest(User.best_streak, best_streak),
+        User.current_streak: (
+            _current_streak() if streak_lowered
+            else _greatest(User.current_streak, current_streak)
+        ),
+    }
+
+
+def refresh_streaks(db: Session, user_id: int):
+    """Recompute one user's streak counters from their tasks (caller commits).
+
+    Flushes first: the aggregates must see the task changes of this session.
+    """
+    db.flush()
+    db.execute(
+        update(users).where(users.c.id == user_id).values(
+            best_streak=_best_streak(),
+            current_streak=_current_streak()
+        )
+    )
+
+
+def refresh_current_streaks(connection: Connection, user_ids: Iterable[int]):
+    """Recompute current_streak for users whose streaks were broken in bulk"""
+    connection.execute(
+        update(users).where(users.c.id.in_(list(user_ids))).values(
+            current_streak=_current_streak()
+        )
+    )
+
+
+def recount_user_stats(connection: Connection, user_id: Optional[int] = None) -> int:
+    """Rebuild the counters of every user (or one) in a single UPDATE.
+
+    Works on a Connection or a Session; the caller commits. Returns the
+    number of users recounted.
+    """
+    statement = update(users).values(
+        tasks_completed=select(func.count(TaskCompletion.id)).where(
+            TaskCompletion.user_id == users.c.id
+        ).scalar_subquery(),
+        best_streak=_best_streak(),
+        current_streak=_current_streak()
+    )
+    if user_id is not None:
+        statement = statement.where(users.c.id == user_id)
+    return connection.execute(statement).rowcount
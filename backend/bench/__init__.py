@@ -0,0 +1,7 @@
+"""Load tests and benchmarks for the API.
+
+Builds a seeded synthetic database, drives every route in-process or
+through a local uvicorn server, reports throughput and p50/p95/p99 latency
+per route and compares the results with a stored baseline. See
+`python -m bench --help`.
+"""
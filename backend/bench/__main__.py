@@ -0,0 +1,433 @@
+"""Benchmark command line.
+
+Usage (from backend/):
+    python -m bench run [--users N] [--mode inprocess|uvicorn] [--baseline FILE] ...
+    python -m bench compare BASELINE CURRENT [--threshold 0.2]
+    python -m bench serialization [--sizes 1000 10000]
+    python -m bench auth [--requests 2000]
+    python -m bench history [--sizes 10 1000 100000 1000000]
+    python -m bench export [--completions 1000000] [--max-growth-mb 32]
+    python -m bench rollover [--tasks 10000000]
+    python -m bench reset [--sizes 50 500]
+    python -m bench engine [--writers 8] [--tasks 100] [--readers 4]
+    python -m bench startup [--workers 8] [--runs 5]
+    python -m bench stress [--clients 100]
+    python -m bench mixed [--writers 0 4 16] [--readers 4]
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import shutil
+import sys
+from datetime import datetime
+
+from . import report
+
+
+def dataset_params(args) -> dict:
+    return {
+        "users": args.users,
+        "tasks_per_user": args.tasks_per_user,
+        "years": args.years,
+        "seed": args.seed,
+    }
+
+
+def prepare_database(args) -> str:
+    """Build the pristine dataset if needed and return a fresh working copy.
+
+    The pristine file is reused while its parameters match (they are kept
+    next to it in <db>.json), so repeated runs skip the generation step and
+    every run starts from identical rows.
+    """
+    params = dataset_params(args)
+    params_path = args.db + ".json"
+    run_path = args.db + ".run"
+
+    stored = None
+    if os.path.exists(args.db) and os.path.exists(params_path):
+        with open(params_path) as f:
+            stored = json.load(f)
+
+    for path in (run_path, run_path + "-wal", run_path + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    # app.database reads the URL at import time, so set it before any app import
+    os.environ["LIFERPG_DATABASE_URL"] = f"sqlite:///{run_path}"
+
+    if args.rebuild or stored != params:
+        from app.generate import generate
+
+        for path in (args.db, args.db + "-wal", args.db + "-shm", params_path):
+            if os.path.exists(path):
+                os.remove(path)
+        print(f"Building {args.db} {params}...", flush=True)
+        counts = generate(f"sqlite:///{args.db}", workers=args.workers, **params)
+        print(f"  {counts['users']} users, {counts['tasks']} tasks, "
+              f"{counts['completions']} completions", flush=True)
+        with open(params_path, "w") as f:
+            json.dump(params, f)
+
+    shutil.copy(args.db, run_path)
+    return run_path
+
+
+def run(args):
+    prepare_database(args)
+
+    from app.main import app
+
+    from .runner import CLIENTS, run_scenario
+    from .scenarios import SCENARIOS, Context, open_sessions
+
+    scenarios = [
+        scenario for scenario in SCENARIOS
+        if not args.routes or any(fnmatch.fnmatch(scenario.route, pattern) for pattern in args.routes)
+    ]
+    covered = {scenario.route for scenario in SCENARIOS}
+    for route in app.routes:
+        for method in sorted(getattr(route, "methods", None) or ()):
+            key = f"{method} {route.path}"
+            if method not in ("HEAD", "OPTIONS") and key not in covered and route.include_in_schema:
+                print(f"warning: no scenario for {key}", file=sys.stderr)
+
+    results = {}
+    with CLIENTS[args.mode](app) as client:
+        sessions = open_sessions(client, min(args.sessions, args.users), category_id=1)
+        context = Context(sessions, category_id=1)
+        for scenario in scenarios:
+            requests = max(1, int(args.requests * scenario.share))
+            print(f"{scenario.route} x{requests}...", flush=True)
+            results[scenario.route] = run_scenario(
+                client, scenario, context, requests, args.concurrency, args.warmup
+            )
+
+    current = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "dataset": dataset_params(args),
+            "mode": args.mode,
+            "async_db": os.getenv("LIFERPG_ASYNC_DB", "0") == "1",
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "routes": results,
+    }
+    print(report.format_table(current))
+    if args.output:
+        report.save(current, args.output)
+        print(f"Wrote {args.output}")
+
+    if args.baseline:
+        return check(report.load(args.baseline), current, args.threshold, args.metric)
+    return 0
+
+
+def compare(args):
+    return check(report.load(args.baseline), report.load(args.current), args.threshold, args.metric)
+
+
+def serialization(args):
+    from .serialization import format_results, run as run_serialization
+
+    results = run_serialization(args.sizes, args.repeat)
+    print(format_results(results))
+    if args.output:
+        report.save({"serialization_ms": results}, args.output)
+    return 0
+
+
+def auth(args):
+    use_scratch_database(args.db)
+
+    from .auth import format_results, run as run_auth
+
+    results = run_auth(args.requests)
+    print(format_results(results))
+    if args.output:
+        report.save({"auth": results}, args.output)
+    return 0
+
+
+def use_scratch_database(path: str):
+    for name in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(name):
+            os.remove(name)
+    # app.database reads the URL at import time, so set it before any app import
+    os.environ["LIFERPG_DATABASE_URL"] = f"sqlite:///{path}"
+
+
+def history(args):
+    use_scratch_database(args.db)
+
+    from .history import format_results, run as run_history
+
+    results = run_history(args.sizes, args.requests)
+    print(format_results(results))
+    if args.output:
+        report.save({"history": results}, args.output)
+    return 0
+
+
+def export(args):
+    use_scratch_database(args.db)
+
+    from .export import format_results, run as run_export
+
+    results = run_export(args.completions, args.formats)
+    print(format_results(results))
+    if args.output:
+        report.save({"export": results}, args.output)
+    failures = [
+        format for format, result in results.items()
+        if result["status"] != 200 or result["rss_growth_mb"] > args.max_growth_mb
+    ]
+    if failures:
+        print(f"FAILED: {', '.join(failures)} over {args.max_growth_mb} MB of peak RSS growth")
+        return 1
+    return 0
+
+
+def rollover(args):
+    use_scratch_database(args.db)
+
+    from .rollover import format_results, run as run_rollover
+
+    results = run_rollover(args.tasks, args.chunk_size)
+    print(format_results(results))
+    if args.output:
+        report.save({"rollover": results}, args.output)
+    return 0
+
+
+def reset(args):
+    use_scratch_database(args.db)
+
+    from .reset import format_results, run as run_reset
+
+    results = run_reset(args.sizes, args.repeat)
+    print(format_results(results))
+    if args.output:
+        report.save({"reset": results}, args.output)
+    return 0
+
+
+def engine(args):
+    from .engine import format_results, run as run_engine
+
+    results = run_engine(args.db, args.writers, args.tasks, args.readers)
+    print(format_results(results))
+    if args.output:
+        report.save({"engine": results}, args.output)
+    return 0
+
+
+def startup(args):
+    use_scratch_database(args.db)
+
+    from .startup import format_results, run as run_startup
+
+    results = run_startup(args.workers, args.runs, args.repeat)
+    print(format_results(results))
+    if args.output:
+        report.save({"startup": results}, args.output)
+    if not all(result["ok"] for result in results["concurrent"]["rounds"]):
+        return 1
+    return 0
+
+
+def stress(args):
+    use_scratch_database(args.db)
+
+    from .stress import StressFailure, format_results, run as run_stress
+
+    try:
+        results = run_stress(args.clients, args.mode)
+    except StressFailure as e:
+        print(f"FAILED: {e}")
+        return 1
+    print(format_results(results))
+    if args.output:
+        report.save({"stress": results}, args.output)
+    return 0
+
+
+def mixed(args):
+    prepare_database(args)
+
+    from app.database import read_engine
+    from app.main import app
+
+    from .mixed import format_results, run as run_mixed
+    from .runner import CLIENTS
+    from .scenarios import Context, open_sessions
+
+    with CLIENTS[args.mode](app) as client:
+        sessions = open_sessions(client, min(args.sessions, args.users), category_id=1)
+        results = run_mixed(client, Context(sessions, category_id=1), args.writers,
+                            args.readers, args.requests)
+    print(f"Reads on {'their own engine' if read_engine is not None else 'the shared engine'}")
+    print(format_results(results))
+    if args.output:
+        report.save({"mixed": results, "read_engine": read_engine is not None}, args.output)
+    return 0
+
+
+def check(baseline, current, threshold, metric) -> int:
+    regressions = report.compare(baseline, current, threshold, metric)
+    if regressions:
+        print(f"{len(regressions)} regressions over {threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"No {metric} regressions over {threshold:.0%}")
+    return 0
+
+
+def add_compare_options(parser):
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed relative slowdown before failing (default 0.2 = 20%%)")
+    parser.add_argument("--metric", choices=report.METRICS, default="p95_ms")
+
+
+def add_dataset_options(parser):
+    parser.add_argument("--db", default="bench.db", help="Pristine dataset file (reused across runs)")
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the dataset")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--tasks-per-user", type=int, default=10)
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1, help="Generator processes")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    runner = commands.add_parser("run", help="Benchmark every API route")
+    add_dataset_options(runner)
+    runner.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    runner.add_argument("--concurrency", type=int, default=4)
+    runner.add_argument("--requests", type=int, default=200, help="Timed requests per route")
+    runner.add_argument("--warmup", type=int, default=5, help="Untimed requests per route")
+    runner.add_argument("--sessions", type=int, default=20, help="Users logged in for the run")
+    runner.add_argument("--routes", nargs="*", help="Only routes matching these patterns, e.g. 'GET /stats/*'")
+    runner.add_argument("--output", help="Write the JSON report here")
+    runner.add_argument("--baseline", help="Fail when slower than this report")
+    add_compare_options(runner)
+    runner.set_defaults(func=run)
+
+    comparer = commands.add_parser("compare", help="Compare two JSON reports")
+    comparer.add_argument("baseline")
+    comparer.add_argument("current")
+    add_compare_options(comparer)
+    comparer.set_defaults(func=compare)
+
+    serializer = commands.add_parser(
+        "serialization", help="Microbenchmark task list serialization paths"
+    )
+    serializer.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    serializer.add_argument("--repeat", type=int, default=5)
+    serializer.add_argument("--output", help="Write the timings as JSON")
+    serializer.set_defaults(func=serialization)
+
+    authenticator = commands.add_parser(
+        "auth", help="get_current_user and GET /auth/me with and without the auth caches"
+    )
+    authenticator.add_argument("--db", default="bench.db.auth", help="Scratch database (recreated)")
+    authenticator.add_argument("--requests", type=int, default=2000, help="Timed calls per case")
+    authenticator.add_argument("--output", help="Write the summaries as JSON")
+    authenticator.set_defaults(func=auth)
+
+    grower = commands.add_parser(
+        "history", help="Stats latency as one user's completion history grows"
+    )
+    grower.add_argument("--db", default="bench.db.history", help="Scratch database (recreated)")
+    grower.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000, 1000000])
+    grower.add_argument("--requests", type=int, default=200, help="Timed requests per step")
+    grower.add_argument("--output", help="Write the summaries as JSON")
+    grower.set_defaults(func=history)
+
+    exporter = commands.add_parser(
+        "export", help="Peak RSS while streaming a long history export; fail over a limit"
+    )
+    exporter.add_argument("--db", default="bench.db.export", help="Scratch database (recreated)")
+    exporter.add_argument("--completions", type=int, default=1000000)
+    exporter.add_argument("--formats", nargs="+", choices=["ndjson", "csv"], default=["ndjson", "csv"])
+    exporter.add_argument("--max-growth-mb", type=float, default=32,
+                          help="Allowed peak RSS growth during one download")
+    exporter.add_argument("--output", help="Write the results as JSON")
+    exporter.set_defaults(func=export)
+
+    roller = commands.add_parser("rollover", help="Period rollover throughput over many tasks")
+    roller.add_argument("--db", default="bench.db.rollover", help="Scratch database (recreated)")
+    roller.add_argument("--tasks", type=int, default=10000000)
+    roller.add_argument("--chunk-size", type=int, default=20000)
+    roller.add_argument("--output", help="Write the results as JSON")
+    roller.set_defaults(func=rollover)
+
+    resetter = commands.add_parser(
+        "reset", help="Read-path rollover of one user's tasks: per-task commits vs one UPDATE"
+    )
+    resetter.add_argument("--db", default="bench.db.reset", help="Scratch database (recreated)")
+    resetter.add_argument("--sizes", type=int, nargs="+", default=[50, 500], help="Stale tasks per user")
+    resetter.add_argument("--repeat", type=int, default=5, help="Timed calls per case")
+    resetter.add_argument("--output", help="Write the results as JSON")
+    resetter.set_defaults(func=reset)
+
+    configurer = commands.add_parser(
+        "engine", help="Concurrent completions with and without the SQLite pragmas and the pool"
+    )
+    configurer.add_argument("--db", default="bench.db.engine",
+                            help="Scratch database prefix, one file per configuration (recreated)")
+    configurer.add_argument("--writers", type=int, default=8)
+    configurer.add_argument("--tasks", type=int, default=100, help="Tasks each writer completes")
+    configurer.add_argument("--readers", type=int, default=4)
+    configurer.add_argument("--output", help="Write the summaries as JSON")
+    configurer.set_defaults(func=engine)
+
+    starter = commands.add_parser(
+        "startup", help="Import and startup time of a worker; fail if concurrent first starts crash"
+    )
+    starter.add_argument("--db", default="bench.db.startup", help="Scratch database (recreated)")
+    starter.add_argument("--workers", type=int, default=8, help="Workers started at once per run")
+    starter.add_argument("--runs", type=int, default=5)
+    starter.add_argument("--repeat", type=int, default=5, help="Timed starts on an existing database")
+    starter.add_argument("--output", help="Write the results as JSON")
+    starter.set_defaults(func=startup)
+
+    stresser = commands.add_parser(
+        "stress", help="Hammer one task's completion from many clients; fail on a double award"
+    )
+    stresser.add_argument("--db", default="bench.db.stress", help="Scratch database (recreated)")
+    stresser.add_argument("--clients", type=int, default=100)
+    stresser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="uvicorn")
+    stresser.add_argument("--output", help="Write the results as JSON")
+    stresser.set_defaults(func=stress)
+
+    mixer = commands.add_parser(
+        "mixed", help="Stats read latency while writers complete tasks; compare read engines"
+    )
+    add_dataset_options(mixer)
+    mixer.add_argument("--mode", choices=["inprocess", "uvicorn"], default="uvicorn")
+    mixer.add_argument("--writers", type=int, nargs="+", default=[0, 4, 16],
+                       help="Writer thread counts, one step each")
+    mixer.add_argument("--readers", type=int, default=4)
+    mixer.add_argument("--requests", type=int, default=600, help="Timed reads per step")
+    mixer.add_argument("--sessions", type=int, default=40,
+                       help="Users logged in for the run, half reading and half writing")
+    mixer.add_argument("--output", help="Write the results as JSON")
+    mixer.set_defaults(func=mixed)
+
+    args = parser.parse_args(argv)
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
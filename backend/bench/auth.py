@@ -0,0 +1,78 @@
+"""Authentication overhead with and without the token and user caches.
+
+Times get_current_user called directly, one session per call like a
+request, for a single token:
+
+- uncached: both caches cleared before every call, so each one decodes
+  the JWT and SELECTs the user (the behaviour before the caches)
+- cached: the caches left warm, so no decode and no SELECT
+
+and GET /auth/me through TestClient the same two ways, to show the share
+of a whole request.
+
+Needs LIFERPG_DATABASE_URL pointing at a scratch database before app is
+imported (the command line takes care of it).
+"""
+
+import time
+from typing import Callable, Dict
+
+from .report import summarize
+
+
+def _time(function: Callable, requests: int, before: Callable = lambda: None) -> Dict:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        before()
+        request_started = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - request_started)
+    return summarize(latencies, 0, time.perf_counter() - started)
+
+
+def run(requests: int = 2000) -> Dict[str, Dict]:
+    """Latency summaries of the dependency and of GET /auth/me, uncached and cached"""
+    from fastapi.testclient import TestClient
+
+    from app.auth import get_current_user, token_cache, user_cache
+    from app.database import SessionLocal
+    from app.main import app
+
+    def clear_caches():
+        token_cache.clear()
+        user_cache.clear()
+
+    results = {}
+    with TestClient(app) as client:
+        account = {"email": "auth@example.com", "username": "auth", "password": "bench"}
+        client.post("/auth/register", json=account)
+        token = client.post("/auth/login", json=account).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def dependency():
+            db = SessionLocal()
+            try:
+                get_current_user(token=token, db=db)
+            finally:
+                db.close()
+
+        def me():
+            client.get("/auth/me", headers=headers)
+
+        for name, function in (("get_current_user", dependency), ("GET /auth/me", me)):
+            function()
+            results[f"{name} uncached"] = _time(function, requests, before=clear_caches)
+            function()
+            results[f"{name} cached"] = _time(function, requests)
+    return results
+
+
+def format_results(results: Dict[str, Dict]) -> str:
+    lines = [f"{'':<26}  {'mean':>10}  {'p50':>10}  {'p99':>10}"]
+    for name, summary in results.items():
+        lines.append(
+            f"{name:<26}  {summary['mean_ms'] * 1000:>7.0f} us  {summary['p50_ms'] * 1000:>7.0f} us"
+            f"  {summary['p99_ms'] * 1000:>7.0f} us"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,145 @@
+"""Write throughput under each engine configuration.
+
+The SQLite pragmas and the pool size are read when app.database is
+imported, so each configuration runs in a child process with its own
+environment and its own scratch database:
+
+- defaults: journal_mode=WAL, synchronous=NORMAL, busy_timeout, page cache
+  and mmap, pool of 5 + 10 overflow
+- no_pragmas: every LIFERPG_SQLITE_* set to empty, so SQLite's defaults
+  (rollback journal, synchronous=FULL, no busy_timeout of ours)
+- one_connection: the default pragmas with a pool of one connection and
+  no overflow, so requests queue for it
+
+The child serves the app with uvicorn, registers `writers` users with
+`tasks` daily tasks each, then every writer completes its tasks in turn,
+all writers at once, while `readers` threads list GET /tasks/today. It
+reports completions per second and the latencies of both.
+
+Each child points LIFERPG_DATABASE_URL at <db>.<config>, recreated for
+the run; this process never imports app.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from .report import summarize
+
+CONFIGS = {
+    "defaults": {},
+    "no_pragmas": {
+        "LIFERPG_SQLITE_JOURNAL_MODE": "",
+        "LIFERPG_SQLITE_SYNCHRONOUS": "",
+        "LIFERPG_SQLITE_BUSY_TIMEOUT_MS": "",
+        "LIFERPG_SQLITE_CACHE_SIZE": "",
+        "LIFERPG_SQLITE_MMAP_SIZE": "",
+    },
+    "one_connection": {"LIFERPG_DB_POOL_SIZE": "1", "LIFERPG_DB_MAX_OVERFLOW": "0"},
+}
+
+CHILD = "import sys; from bench.engine import measure; measure(*map(int, sys.argv[1:]))"
+
+
+def measure(writers: int, tasks: int, readers: int):
+    """Child process: run the workload and print its summaries as JSON"""
+    from app.main import app
+
+    from .runner import UvicornClient
+
+    with UvicornClient(app) as client:
+        users = []
+        for i in range(writers):
+            account = {"email": f"engine{i}@example.com", "username": f"engine{i}", "password": "bench"}
+            client.request("POST", "/auth/register", json=account)
+            _, token = client.request_json("POST", "/auth/login", json=account)
+            headers = {"Authorization": f"Bearer {token['access_token']}"}
+            task_ids = [
+                client.request_json("POST", "/tasks/", headers=headers, json={
+                    "title": f"Bench engine {n}", "category_id": 1, "frequency": "daily"
+                })[1]["id"]
+                for n in range(tasks)
+            ]
+            users.append((headers, task_ids))
+
+        barrier = threading.Barrier(writers + readers)
+        done = threading.Event()
+        reads, read_errors = [], 0
+        lock = threading.Lock()
+
+        def write(user):
+            headers, task_ids = user
+            latencies, errors = [], 0
+            barrier.wait()
+            for task_id in task_ids:
+                started = time.perf_counter()
+                status, _ = client.request("POST", f"/tasks/{task_id}/complete", headers=headers)
+                latencies.append(time.perf_counter() - started)
+                errors += status != 200
+            return latencies, errors
+
+        def read(i: int):
+            nonlocal read_errors
+            headers = users[i % writers][0]
+            barrier.wait()
+            while not done.is_set():
+                started = time.perf_counter()
+                status, _ = client.request("GET", "/tasks/today", headers=headers)
+                with lock:
+                    reads.append(time.perf_counter() - started)
+                    read_errors += status != 200
+
+        with ThreadPoolExecutor(max_workers=writers + readers) as pool:
+            read_futures = [pool.submit(read, i) for i in range(readers)]
+            write_futures = [pool.submit(write, user) for user in users]
+            started = time.perf_counter()
+            results = [future.result() for future in write_futures]
+            elapsed = time.perf_counter() - started
+            done.set()
+            for future in read_futures:
+                future.result()
+
+    latencies = [latency for user_latencies, _ in results for latency in user_latencies]
+    print(json.dumps({
+        "completions": summarize(latencies, sum(errors for _, errors in results), elapsed),
+        "reads": summarize(reads, read_errors, elapsed),
+    }), flush=True)
+
+
+def run(db: str, writers: int, tasks: int, readers: int) -> Dict[str, Dict]:
+    """{config: {"completions": summary, "reads": summary}}"""
+    results = {}
+    for name, overrides in CONFIGS.items():
+        path = f"{db}.{name}"
+        for file in (path, path + "-wal", path + "-shm", path + "-journal"):
+            if os.path.exists(file):
+                os.remove(file)
+        env = {**os.environ, **overrides, "LIFERPG_DATABASE_URL": f"sqlite:///{path}"}
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD, str(writers), str(tasks), str(readers)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        results[name] = json.loads(output.strip().splitlines()[-1])
+        print(f"  {name} done", flush=True)
+    return results
+
+
+def format_results(results: Dict[str, Dict]) -> str:
+    lines = [
+        f"{'config':<16} {'completions/s':>13} {'p50':>9} {'p99':>9} {'errors':>7}"
+        f"   {'reads/s':>8} {'p50':>9} {'p99':>9} {'errors':>7}"
+    ]
+    for name, result in results.items():
+        writes, reads = result["completions"], result["reads"]
+        lines.append(
+            f"{name:<16} {writes['throughput_rps']:>13.1f} {writes['p50_ms']:>6.1f} ms "
+            f"{writes['p99_ms']:>6.1f} ms {writes['errors']:>7}"
+            f"   {reads['throughput_rps']:>8.1f} {reads['p50_ms']:>6.1f} ms "
+            f"{reads['p99_ms']:>6.1f} ms {reads['errors']:>7}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,121 @@
+"""Peak memory of GET /stats/export over a long history.
+
+Fills one user's history with `completions` rows, then downloads the
+export in each format over uvicorn, read chunk by chunk with http.client
+in the same process, and compares the process's peak RSS (VmHWM) before
+and after. A streamed export stays flat; one built in memory grows with
+the history (about 150 MB of NDJSON per million completions).
+
+Each download runs in a child process, so the inserts that build the
+history don't set the peak. SQLite's mmap and page cache are turned off
+there: both count towards RSS, but their size is set by configuration,
+not by the length of the export. resource.getrusage's ru_maxrss is no
+use in the child: exec carries over the parent's peak.
+
+Needs LIFERPG_DATABASE_URL pointing at a scratch database before app is
+imported (the command line takes care of it).
+"""
+
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from .history import add_completions
+
+READ_SIZE = 64 * 1024
+
+CHILD = "import sys; from bench.export import measure; measure(sys.argv[1], sys.argv[2])"
+
+
+def _peak_rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError("VmHWM not in /proc/self/status (Linux only)")
+
+
+def measure(token: str, format: str):
+    """Child process: download one export and print its size, time and peak RSS"""
+    from app.main import app
+
+    from .runner import UvicornClient
+
+    headers = {"Authorization": f"Bearer {token}"}
+    with UvicornClient(app) as client:
+        # Imports and caches the first request warms up count as baseline
+        client.request("GET", "/auth/me", headers=headers)
+        before = _peak_rss_mb()
+
+        connection = http.client.HTTPConnection("127.0.0.1", client.port)
+        started = time.perf_counter()
+        connection.request("GET", f"/stats/export?format={format}", headers=headers)
+        response = connection.getresponse()
+        size = 0
+        while True:
+            chunk = response.read(READ_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+        seconds = time.perf_counter() - started
+        connection.close()
+
+    print(json.dumps({
+        "status": response.status,
+        "mb": size / 1024 / 1024,
+        "seconds": seconds,
+        "rss_before_mb": before,
+        "rss_peak_mb": _peak_rss_mb(),
+    }), flush=True)
+
+
+def run(completions: int, formats: List[str]) -> Dict[str, Dict]:
+    """Download summaries per format for one user with `completions` rows"""
+    from fastapi.testclient import TestClient
+
+    from app.database import SessionLocal
+    from app.main import app
+
+    with TestClient(app) as client:
+        account = {"email": "export@example.com", "username": "export", "password": "bench"}
+        client.post("/auth/register", json=account)
+        token = client.post("/auth/login", json=account).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        user_id = client.get("/auth/me", headers=headers).json()["id"]
+        task_id = client.post("/tasks/", headers=headers, json={
+            "title": "Bench export", "category_id": 1
+        }).json()["id"]
+
+    db = SessionLocal()
+    try:
+        add_completions(db, user_id, task_id, 0, completions)
+        db.commit()
+    finally:
+        db.close()
+    print(f"  {completions} completions added", flush=True)
+
+    env = {**os.environ, "LIFERPG_SQLITE_MMAP_SIZE": "", "LIFERPG_SQLITE_CACHE_SIZE": ""}
+    results = {}
+    for format in formats:
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD, token, format],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result["rss_growth_mb"] = result["rss_peak_mb"] - result["rss_before_mb"]
+        results[format] = result
+    return results
+
+
+def format_results(results: Dict[str, Dict]) -> str:
+    lines = [f"{'format':>8}  {'status':>6}  {'size':>10}  {'time':>8}  {'peak RSS':>10}  {'growth':>9}"]
+    for format, result in results.items():
+        lines.append(
+            f"{format:>8}  {result['status']:>6}  {result['mb']:>7.1f} MB  {result['seconds']:>6.1f} s"
+            f"  {result['rss_peak_mb']:>7.1f} MB  {result['rss_growth_mb']:>6.1f} MB"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,113 @@
+"""Stats latency as one user's history grows.
+
+Grows a single user's completion history through each size in turn and
+times GET /stats/me and GET /stats/dashboard at every step, next to the
+COUNT + MAX aggregates /stats/me used to run before the counters on the
+user row. The routes should stay flat; the aggregates grow with history.
+
+Needs LIFERPG_DATABASE_URL pointing at a scratch database before app is
+imported (the command line takes care of it).
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import func, insert
+
+from .report import summarize
+
+INSERT_BATCH_SIZE = 20000
+ROUTES = ("/stats/me", "/stats/dashboard")
+
+
+def _time(function, requests: int) -> Dict:
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        request_started = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - request_started)
+    return summarize(latencies, 0, time.perf_counter() - started)
+
+
+def _aggregates(db, user_id: int):
+    from app.models import Task, TaskCompletion
+
+    db.query(func.count(TaskCompletion.id)).filter(TaskCompletion.user_id == user_id).scalar()
+    db.query(func.max(Task.best_streak)).filter(Task.user_id == user_id).scalar()
+    db.query(func.max(Task.current_streak)).filter(
+        Task.user_id == user_id, Task.is_active == True
+    ).scalar()
+
+
+def add_completions(db, user_id: int, task_id: int, start: int, stop: int):
+    from app.models import TaskCompletion
+
+    # Backdated one minute apart, so the dashboard's last-7-days window
+    # holds a bounded number of them whatever the size
+    first = datetime.utcnow() - timedelta(minutes=stop)
+    statement = insert(TaskCompletion.__table__)
+    for batch_start in range(start, stop, INSERT_BATCH_SIZE):
+        db.connection().execute(statement, [
+            {
+                "task_id": task_id,
+                "user_id": user_id,
+                "completed_at": first + timedelta(minutes=stop - index),
+                "xp_earned": 10,
+                "streak_bonus": 0,
+            }
+            for index in range(batch_start, min(batch_start + INSERT_BATCH_SIZE, stop))
+        ])
+
+
+def run(sizes: List[int], requests: int = 200) -> Dict[int, Dict[str, Dict]]:
+    """Latency summaries per history size for each route and the old aggregates"""
+    from fastapi.testclient import TestClient
+
+    from app.auth import invalidate_user
+    from app.database import SessionLocal
+    from app.main import app
+    from app.user_stats import recount_user_stats
+
+    results = {}
+    with TestClient(app) as client:
+        account = {"email": "history@example.com", "username": "history", "password": "bench"}
+        user_id = client.post("/auth/register", json=account).json()["id"]
+        token = client.post("/auth/login", json=account).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        task_id = client.post("/tasks/", headers=headers, json={
+            "title": "Bench history", "category_id": 1
+        }).json()["id"]
+
+        have = 0
+        for size in sorted(sizes):
+            db = SessionLocal()
+            try:
+                add_completions(db, user_id, task_id, have, size)
+                # Stands in for the increments the completion endpoints make
+                recount_user_stats(db, user_id=user_id)
+                db.commit()
+                invalidate_user(user_id)
+                have = max(have, size)
+
+                timings = {}
+                for path in ROUTES:
+                    client.get(path, headers=headers)
+                    timings[path] = _time(lambda: client.get(path, headers=headers), requests)
+                timings["aggregates"] = _time(lambda: _aggregates(db, user_id), requests)
+            finally:
+                db.close()
+            results[size] = timings
+            print(f"  {size} completions done", flush=True)
+    return results
+
+
+def format_results(results: Dict[int, Dict[str, Dict]], metric: str = "p50_ms") -> str:
+    names = list(next(iter(results.values())))
+    lines = [f"{'completions':>12}  " + "  ".join(f"{name:>16}" for name in names)]
+    for size, timings in results.items():
+        lines.append(f"{size:>12}  " + "  ".join(
+            f"{timings[name][metric]:>13.3f} ms" for name in names
+        ))
+    return f"{metric}\n" + "\n".join(lines)
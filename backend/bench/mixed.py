@@ -0,0 +1,107 @@
+"""Read latency under write load.
+
+Times the read-only stats routes from `readers` threads while `writers`
+threads keep completing tasks as fast as they can, once for each writer
+count. With the reads on their own engine (LIFERPG_SQLITE_READ_POOL=1 or
+LIFERPG_READ_DATABASE_URL) their latency should stay flat as the writer
+count grows; on the shared engine they queue with the writers for pooled
+connections.
+
+Readers and writers are different users: a user's own completion evicts
+them from the user cache, and reloading them goes through the request's
+main session. Each writer completes the one-off tasks of its own
+sessions, so writers never race each other for a task.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from .report import summarize
+
+READ_ROUTES = ("/stats/dashboard", "/stats/history", "/stats/xp-history")
+
+
+def _write_until(client, sessions, stop: threading.Event, counts: List[int]):
+    ok = errors = 0
+    i = 0
+    while not stop.is_set():
+        session = sessions[i % len(sessions)]
+        status, _ = client.request("POST", f"/tasks/{session.once_task_id}/complete",
+                                   headers=session.headers)
+        ok += status == 200
+        errors += status != 200
+        i += 1
+    counts.extend((ok, errors))
+
+
+def run_step(client, context, writers: int, readers: int, requests: int) -> Dict:
+    """Read latency summary plus the writes completed meanwhile"""
+    half = len(context.sessions) // 2
+    reading, writing = context.sessions[:half], context.sessions[half:]
+    stop = threading.Event()
+    counts: List[List[int]] = [[] for _ in range(writers)]
+    threads = [
+        threading.Thread(
+            target=_write_until,
+            args=(client, writing[w::writers], stop, counts[w]),
+            daemon=True,
+        )
+        for w in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    def read(i: int):
+        path = READ_ROUTES[i % len(READ_ROUTES)]
+        session = reading[i % len(reading)]
+        started = time.perf_counter()
+        status, _ = client.request("GET", path, headers=session.headers)
+        return time.perf_counter() - started, status == 200
+
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=readers) as pool:
+        for latency, ok in pool.map(read, range(requests)):
+            latencies.append(latency)
+            errors += not ok
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    result = summarize(latencies, errors, elapsed)
+    writes = sum(count[0] for count in counts)
+    result["writers"] = writers
+    result["writes"] = writes
+    result["write_errors"] = sum(count[1] for count in counts)
+    result["writes_per_second"] = round(writes / elapsed, 1) if elapsed else 0.0
+    return result
+
+
+def run(client, context, writer_counts: List[int], readers: int, requests: int) -> Dict[str, Dict]:
+    if max(writer_counts) > len(context.sessions) // 2:
+        raise ValueError("every writer needs a session of its own: log in twice as many users")
+    # Warm the caches and connections before the first timed step
+    run_step(client, context, 0, readers, readers * len(READ_ROUTES))
+    results = {}
+    for writers in writer_counts:
+        results[str(writers)] = run_step(client, context, writers, readers, requests)
+        print(f"  {writers} writers done", flush=True)
+    return results
+
+
+def format_results(results: Dict[str, Dict]) -> str:
+    lines = [
+        f"{'writers':>7} {'writes/s':>9} {'reads/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err':>5}"
+    ]
+    for result in results.values():
+        lines.append(
+            f"{result['writers']:>7} {result['writes_per_second']:>9.1f} {result['throughput_rps']:>8.1f} "
+            f"{result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} "
+            f"{result['errors'] + result['write_errors']:>5}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,72 @@
+"""Latency summaries and baseline comparison"""
+
+import json
+import math
+from typing import Dict, List
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "mean_ms")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    """Latencies in seconds; elapsed is the wall time of the timed loop"""
+    values = sorted(latencies)
+    count = len(values)
+    return {
+        "requests": count,
+        "errors": errors,
+        "throughput_rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(values) / count * 1000, 3) if count else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+    }
+
+
+def load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(report: Dict, path: str):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(baseline: Dict, current: Dict, threshold: float, metric: str) -> List[str]:
+    """Routes whose `metric` grew by more than `threshold` (0.2 = 20%) over
+    the baseline, plus routes that failed requests. Routes missing from
+    either report are not compared."""
+    regressions = []
+    for route, stats in sorted(current["routes"].items()):
+        if stats["errors"]:
+            regressions.append(f"{route}: {stats['errors']} failed requests")
+        before = baseline["routes"].get(route)
+        if not before or not before[metric]:
+            continue
+        change = stats[metric] / before[metric] - 1
+        if change > threshold:
+            regressions.append(
+                f"{route}: {metric} {before[metric]:.2f} -> {stats[metric]:.2f} ms (+{change:.0%})"
+            )
+    return regressions
+
+
+def format_table(report: Dict) -> str:
+    lines = [
+        f"{'route':<36} {'req':>6} {'err':>4} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    ]
+    for route, stats in sorted(report["routes"].items()):
+        lines.append(
+            f"{route:<36} {stats['requests']:>6} {stats['errors']:>4} {stats['throughput_rps']:>8.1f} "
+            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        )
+    return "\n".join(lines)
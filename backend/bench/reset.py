@@ -0,0 +1,129 @@
+"""Rollover on the read path: per-task commits against one UPDATE.
+
+For each size, gives one user that many daily tasks completed yesterday
+(their streaks still live, so only the status has to reset) and times the
+reset step of GET /tasks/ and GET /tasks/today two ways:
+
+- per_task: the loop those routes ran before reset_lapsed_tasks, which
+  loaded the tasks, checked each with should_reset_task and committed
+  after every reset (reloading the expired rows it touches next)
+- set_based: app.rollover.reset_lapsed_tasks, the EXISTS checks plus one
+  UPDATE and one commit
+- nothing_stale: reset_lapsed_tasks again once every task is pending,
+  the cost every other read pays
+
+The tasks are marked completed again before each timed call. Each case
+reports its median over `repeat` calls and the statements it ran.
+
+Needs LIFERPG_DATABASE_URL pointing at a scratch database before app is
+imported (the command line takes care of it).
+"""
+
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import event, insert, update
+
+
+def per_task_reset(db, user_id: int, now: datetime):
+    """The read-path reset as it was before reset_lapsed_tasks"""
+    from app.completions import should_reset_task
+    from app.models import Task, TaskStatus
+
+    tasks = db.query(Task).filter(Task.user_id == user_id, Task.is_active == True).all()
+    for task in tasks:
+        if should_reset_task(task, now):
+            task.status = TaskStatus.PENDING
+            db.commit()
+
+
+def run(sizes: List[int], repeat: int) -> Dict[str, Dict]:
+    """{size: {case: {"median_ms", "statements"}}}"""
+    from app.database import SessionLocal, engine
+    from app.models import FrequencyType, Task, TaskStatus, User
+    from app.periods import period_start
+    from app.rollover import reset_lapsed_tasks
+    from app.schema import ensure_schema
+    from app.seed import seed_categories
+
+    ensure_schema(engine)
+    now = datetime.utcnow()
+    yesterday = period_start(FrequencyType.DAILY, now) - timedelta(hours=1)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db = SessionLocal()
+    try:
+        seed_categories(db)
+        results = {}
+        for size in sizes:
+            user = User(email=f"reset{size}@example.com", username=f"reset{size}", hashed_password="")
+            db.add(user)
+            db.flush()
+            db.connection().execute(insert(Task.__table__), [
+                {
+                    "user_id": user.id,
+                    "category_id": 1,
+                    "title": "Bench reset",
+                    "frequency": FrequencyType.DAILY,
+                    "status": TaskStatus.COMPLETED,
+                    "xp_reward": 10,
+                    "difficulty": 1.0,
+                    "current_streak": 1,
+                    "best_streak": 1,
+                    "created_at": yesterday,
+                    "last_completed": yesterday,
+                    "is_active": True,
+                }
+                for _ in range(size)
+            ])
+            db.commit()
+            user_id = user.id
+
+            def make_stale():
+                db.execute(
+                    update(Task).where(Task.user_id == user_id).values(status=TaskStatus.COMPLETED)
+                )
+                db.commit()
+
+            cases = {
+                "per_task": (lambda: per_task_reset(db, user_id, now), make_stale),
+                "set_based": (lambda: reset_lapsed_tasks(db, user_id, now), make_stale),
+                "nothing_stale": (lambda: reset_lapsed_tasks(db, user_id, now), lambda: None),
+            }
+            results[size] = {}
+            for name, (function, before) in cases.items():
+                timings = []
+                for _ in range(repeat):
+                    before()
+                    db.expire_all()
+                    statements.clear()
+                    event.listen(engine, "before_cursor_execute", record)
+                    started = time.perf_counter()
+                    try:
+                        function()
+                    finally:
+                        timings.append(time.perf_counter() - started)
+                        event.remove(engine, "before_cursor_execute", record)
+                results[size][name] = {
+                    "median_ms": round(statistics.median(timings) * 1000, 2),
+                    "statements": len(statements),
+                }
+            print(f"  {size} tasks done", flush=True)
+    finally:
+        db.close()
+    return results
+
+
+def format_results(results: Dict[int, Dict]) -> str:
+    cases = list(next(iter(results.values())))
+    lines = [f"{'tasks':>8}" + "".join(f"  {name:>20}" for name in cases)]
+    for size, row in results.items():
+        lines.append(f"{size:>8}" + "".join(
+            f"  {row[name]['median_ms']:>9.2f} ms {row[name]['statements']:>5} st" for name in cases
+        ))
+    return "\n".join(lines)
@@ -0,0 +1,108 @@
+"""Period rollover throughput.
+
+Fills a scratch database with `tasks` tasks (10 per user) in the state a
+deployment would be in if rollover had never run: every task completed,
+with a live streak, last completed at some point in the past 90 days.
+Then times three runs of app.rollover.roll_over:
+
+- backlog: the first run, which has to reset nearly every task
+- again: a second run at the same time, which should find nothing
+- next_day: the run at the following midnight, the steady-state cost
+
+Needs LIFERPG_DATABASE_URL pointing at the scratch database before app is
+imported (the command line takes care of it).
+"""
+
+import random
+import time
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from typing import Dict
+
+from sqlalchemy import insert
+
+INSERT_BATCH_SIZE = 20000
+TASKS_PER_USER = 10
+HISTORY_DAYS = 90
+
+
+def build(tasks: int, now: datetime, seed: int = 1):
+    from app.database import SessionLocal, engine
+    from app.generate import FREQUENCY_WEIGHTS
+    from app.models import Task, TaskStatus, User
+    from app.schema import ensure_schema
+    from app.seed import seed_categories
+
+    ensure_schema(engine)
+    db = SessionLocal()
+    try:
+        seed_categories(db)
+        rng = random.Random(seed)
+        frequencies = list(FREQUENCY_WEIGHTS)
+        weights = list(FREQUENCY_WEIGHTS.values())
+        users = -(-tasks // TASKS_PER_USER)
+
+        for start in range(0, users, INSERT_BATCH_SIZE):
+            db.connection().execute(insert(User.__table__), [
+                {"email": f"rollover{i}@example.com", "username": f"rollover{i}", "hashed_password": ""}
+                for i in range(start, min(start + INSERT_BATCH_SIZE, users))
+            ])
+        db.commit()
+
+        span = HISTORY_DAYS * 24 * 3600
+        for start in range(0, tasks, INSERT_BATCH_SIZE):
+            rows = []
+            for i in range(start, min(start + INSERT_BATCH_SIZE, tasks)):
+                streak = rng.randint(1, 30)
+                rows.append({
+                    "user_id": i // TASKS_PER_USER + 1,
+                    "category_id": 1,
+                    "title": "Bench rollover",
+                    "frequency": rng.choices(frequencies, weights=weights)[0],
+                    "status": TaskStatus.COMPLETED,
+                    "xp_reward": 10,
+                    "difficulty": 1.0,
+                    "current_streak": streak,
+                    "best_streak": streak,
+                    "created_at": now - timedelta(days=HISTORY_DAYS),
+                    "last_completed": now - timedelta(seconds=rng.randrange(span)),
+                    "is_active": True,
+                })
+            db.connection().execute(insert(Task.__table__), rows)
+            db.commit()
+    finally:
+        db.close()
+
+
+def run(tasks: int, chunk_size: int) -> Dict[str, Dict]:
+    """roll_over results (with tasks_per_second) for each run"""
+    from app.database import SessionLocal
+    from app.rollover import roll_over
+
+    now = datetime(2025, 3, 3, 0, 0, 5)  # A Monday that starts a month: every period rolls
+    started = time.perf_counter()
+    build(tasks, now)
+    print(f"  built {tasks} tasks in {time.perf_counter() - started:.0f}s", flush=True)
+
+    results = {}
+    for name, at in (("backlog", now), ("again", now), ("next_day", now + timedelta(days=1))):
+        db = SessionLocal()
+        try:
+            result = asdict(roll_over(db, now=at, chunk_size=chunk_size))
+        finally:
+            db.close()
+        result["tasks_per_second"] = round(result["tasks"] / result["seconds"]) if result["seconds"] else 0
+        result["seconds"] = round(result["seconds"], 3)
+        results[name] = result
+        print(f"  {name} done", flush=True)
+    return results
+
+
+def format_results(results: Dict[str, Dict]) -> str:
+    lines = [f"{'run':<10} {'tasks':>10} {'streaks':>10} {'users':>9} {'seconds':>9} {'tasks/s':>9}"]
+    for name, result in results.items():
+        lines.append(
+            f"{name:<10} {result['tasks']:>10} {result['streaks_broken']:>10} {result['users']:>9} "
+            f"{result['seconds']:>9.2f} {result['tasks_per_second']:>9}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,137 @@
+"""HTTP clients and the timed request loop"""
+
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .report import summarize
+from .scenarios import Context, Scenario
+
+BENCH_KEEP_ALIVE_SECONDS = 60
+
+
+class InProcessClient:
+    """Calls the ASGI app directly through Starlette's TestClient (needs httpx)"""
+
+    def __init__(self, app):
+        from fastapi.testclient import TestClient
+
+        self._client = TestClient(app)
+
+    def __enter__(self):
+        self._client.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._client.__exit__(*exc)
+
+    def request(
+        self, method: str, path: str, headers: Optional[Dict] = None, json=None,
+        content: Optional[bytes] = None, extra_headers: Optional[Dict] = None
+    ) -> Tuple[int, bytes]:
+        response = self._client.request(
+            method, path, headers={**(headers or {}), **(extra_headers or {})},
+            json=json, content=content
+        )
+        return response.status_code, response.content
+
+    def request_json(self, method: str, path: str, **options):
+        status, body = self.request(method, path, **options)
+        return status, json.loads(body) if body else None
+
+
+class UvicornClient(InProcessClient):
+    """Serves the app with uvicorn on a free local port; one keep-alive
+    connection per worker thread, so the HTTP stack is part of the timing"""
+
+    def __init__(self, app):
+        import uvicorn
+
+        # Under a thousand clients on a few cores, a client can take longer
+        # than uvicorn's default 5 s keep-alive to send its next request and
+        # gets a reset as the server closes the connection under it
+        config = uvicorn.Config(
+            app, host="127.0.0.1", port=0, log_level="warning", access_log=False,
+            timeout_keep_alive=BENCH_KEEP_ALIVE_SECONDS,
+        )
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._local = threading.local()
+        self.port = None
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("uvicorn failed to start")
+            time.sleep(0.01)
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join()
+
+    def request(
+        self, method: str, path: str, headers: Optional[Dict] = None, json=None,
+        content: Optional[bytes] = None, extra_headers: Optional[Dict] = None
+    ) -> Tuple[int, bytes]:
+        headers = {**(headers or {}), **(extra_headers or {})}
+        if json is not None:
+            content = _json_dumps(json)
+            headers["Content-Type"] = "application/json"
+
+        for attempt in (1, 2):
+            connection = getattr(self._local, "connection", None)
+            if connection is None:
+                connection = self._local.connection = http.client.HTTPConnection(
+                    "127.0.0.1", self.port
+                )
+            try:
+                connection.request(method, path, body=content, headers=headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError):
+                # The server closed an idle keep-alive connection; retry once
+                connection.close()
+                self._local.connection = None
+                if attempt == 2:
+                    raise
+
+
+def _json_dumps(value) -> bytes:
+    return json.dumps(value).encode()
+
+
+CLIENTS = {"inprocess": InProcessClient, "uvicorn": UvicornClient}
+
+
+def run_scenario(
+    client, scenario: Scenario, context: Context, requests: int, concurrency: int, warmup: int
+) -> Dict:
+    """Send `warmup` untimed then `requests` timed requests, `concurrency` at a time"""
+    if scenario.prepare:
+        scenario.prepare(client, context, warmup + requests)
+
+    def send(i: int) -> Tuple[float, bool]:
+        path, options = scenario.build(context, i)
+        start = time.perf_counter()
+        status, _ = client.request(scenario.method, path, **options)
+        return time.perf_counter() - start, status == scenario.expect
+
+    for i in range(warmup):
+        send(i)
+
+    latencies: List[float] = []
+    errors = 0
+    start = time.perf_counter()
+    if scenario.max_concurrency:
+        concurrency = min(concurrency, scenario.max_concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, ok in pool.map(send, range(warmup, warmup + requests)):
+            latencies.append(latency)
+            errors += not ok
+    return summarize(latencies, errors, time.perf_counter() - start)
@@ -0,0 +1,171 @@
+"""One scenario per API route.
+
+A scenario turns a request number into (path, request options). Its
+optional `prepare` hook runs once before timing starts and may create
+whatever the timed requests consume, like tasks for DELETE.
+"""
+
+import json
+import uuid
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from app.generate import GENERATED_PASSWORD, generated_email
+
+
+class Session(NamedTuple):
+    """A logged-in benchmark user"""
+    headers: Dict[str, str]
+    task_id: int  # An existing recurring task
+    once_task_id: int  # A one-time task, which can be completed again and again
+
+
+class Scenario(NamedTuple):
+    method: str
+    path: str  # Route template, as labelled in /metrics
+    build: Callable  # (context, i) -> (path, options)
+    expect: int = 200
+    share: float = 1.0  # Fraction of --requests for slow or heavy routes
+    prepare: Optional[Callable] = None  # (client, context, count) -> None
+    max_concurrency: Optional[int] = None
+
+    @property
+    def route(self) -> str:
+        return f"{self.method} {self.path}"
+
+
+class Context:
+    def __init__(self, sessions: List[Session], category_id: int):
+        self.sessions = sessions
+        self.category_id = category_id
+        self.prepared: Dict[str, list] = {}
+
+    def session(self, i: int) -> Session:
+        return self.sessions[i % len(self.sessions)]
+
+
+def open_sessions(client, count: int, category_id: int) -> List[Session]:
+    """Log in the first `count` dataset users (setup, not timed)"""
+    sessions = []
+    for index in range(count):
+        status, body = client.request_json(
+            "POST", "/auth/login",
+            json={"email": generated_email(index), "password": GENERATED_PASSWORD}
+        )
+        if status != 200:
+            raise RuntimeError(f"Could not log in as {generated_email(index)} ({status})")
+        headers = {"Authorization": f"Bearer {body['access_token']}"}
+
+        _, tasks = client.request_json("GET", "/tasks/?limit=1", headers=headers)
+        _, once_task = client.request_json("POST", "/tasks/", headers=headers, json={
+            "title": "Bench one-off", "category_id": category_id, "frequency": "once"
+        })
+        sessions.append(Session(headers, tasks[0]["id"], once_task["id"]))
+    return sessions
+
+
+def _auth(ctx, i, **options):
+    options["headers"] = ctx.session(i).headers
+    return options
+
+
+def _create_tasks(client, ctx, count, key):
+    ids = []
+    for i in range(count):
+        _, task = client.request_json("POST", "/tasks/", headers=ctx.session(i).headers, json={
+            "title": f"Bench {key} {i}", "category_id": ctx.category_id
+        })
+        ids.append(task["id"])
+    ctx.prepared[key] = ids
+
+
+def _unique() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def _multipart(filename: str, content: bytes, content_type: str):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def _import_request(ctx, i):
+    history = {
+        "tasks": [{"title": f"Imported {_unique()}", "category_id": ctx.category_id}],
+        "completions": [],
+    }
+    history["completions"] = [
+        {"task": history["tasks"][0]["title"], "completed_at": f"2024-01-{day:02d}T08:00:00"}
+        for day in range(1, 29)
+    ]
+    body, content_type = _multipart("history.json", json.dumps(history).encode(), "application/json")
+    return "/tasks/import", _auth(ctx, i, content=body, extra_headers={"Content-Type": content_type})
+
+
+SCENARIOS = [
+    Scenario("GET", "/", lambda ctx, i: ("/", {})),
+    Scenario("GET", "/health", lambda ctx, i: ("/health", {})),
+    Scenario("GET", "/metrics", lambda ctx, i: ("/metrics", {})),
+
+    # bcrypt dominates these. They run serially: on small machines the
+    # password hash queue sheds concurrent requests with 503 by design
+    Scenario("POST", "/auth/register", lambda ctx, i: ("/auth/register", {"json": {
+        "email": f"{_unique()}@example.com", "username": _unique(), "password": GENERATED_PASSWORD
+    }}), share=0.1, max_concurrency=1),
+    Scenario("POST", "/auth/login", lambda ctx, i: ("/auth/login", {"json": {
+        "email": generated_email(i % len(ctx.sessions)), "password": GENERATED_PASSWORD
+    }}), share=0.1, max_concurrency=1),
+    Scenario("POST", "/auth/token", lambda ctx, i: ("/auth/token", {
+        "content": f"username={generated_email(i % len(ctx.sessions))}&password={GENERATED_PASSWORD}".encode(),
+        "extra_headers": {"Content-Type": "application/x-www-form-urlencoded"}
+    }), share=0.1, max_concurrency=1),
+    Scenario("GET", "/auth/me", lambda ctx, i: ("/auth/me", _auth(ctx, i))),
+
+    Scenario("GET", "/categories/", lambda ctx, i: ("/categories/", {})),
+    Scenario("GET", "/categories/{category_id}", lambda ctx, i: (
+        f"/categories/{ctx.category_id}", {}
+    )),
+    Scenario("POST", "/categories/", lambda ctx, i: ("/categories/", _auth(ctx, i, json={
+        "name": f"Bench {_unique()}", "description": "", "icon": "star",
+        "color": "#000000", "base_xp": 10
+    })), share=0.1),
+
+    Scenario("GET", "/tasks/", lambda ctx, i: ("/tasks/", _auth(ctx, i))),
+    Scenario("GET", "/tasks/today", lambda ctx, i: ("/tasks/today", _auth(ctx, i))),
+    Scenario("GET", "/tasks/{task_id}", lambda ctx, i: (
+        f"/tasks/{ctx.session(i).task_id}", _auth(ctx, i)
+    )),
+    Scenario("POST", "/tasks/", lambda ctx, i: ("/tasks/", _auth(ctx, i, json={
+        "title": f"Bench new {i}", "category_id": ctx.category_id
+    }))),
+    Scenario("PUT", "/tasks/{task_id}", lambda ctx, i: (
+        f"/tasks/{ctx.session(i).task_id}", _auth(ctx, i, json={"description": f"rev {i}"})
+    )),
+    Scenario(
+        "DELETE", "/tasks/{task_id}",
+        lambda ctx, i: (f"/tasks/{ctx.prepared['delete'][i]}", _auth(ctx, i)),
+        prepare=lambda client, ctx, count: _create_tasks(client, ctx, count, "delete")
+    ),
+    Scenario(
+        "POST", "/tasks/{task_id}/start",
+        lambda ctx, i: (f"/tasks/{ctx.prepared['start'][i]}/start", _auth(ctx, i)),
+        prepare=lambda client, ctx, count: _create_tasks(client, ctx, count, "start")
+    ),
+    Scenario("POST", "/tasks/{task_id}/complete", lambda ctx, i: (
+        f"/tasks/{ctx.session(i).once_task_id}/complete", _auth(ctx, i)
+    )),
+    Scenario("POST", "/tasks/complete-batch", lambda ctx, i: ("/tasks/complete-batch", _auth(
+        ctx, i, json={"completions": [{"task_id": ctx.session(i).once_task_id}] * 5}
+    ))),
+    Scenario("POST", "/tasks/import", _import_request, share=0.1),
+
+    Scenario("GET", "/stats/me", lambda ctx, i: ("/stats/me", _auth(ctx, i))),
+    Scenario("GET", "/stats/dashboard", lambda ctx, i: ("/stats/dashboard", _auth(ctx, i))),
+    Scenario("GET", "/stats/history", lambda ctx, i: ("/stats/history", _auth(ctx, i))),
+    Scenario("GET", "/stats/export", lambda ctx, i: ("/stats/export", _auth(ctx, i)), share=0.1),
+    Scenario("GET", "/stats/leaderboard", lambda ctx, i: ("/stats/leaderboard", _auth(ctx, i))),
+    Scenario("GET", "/stats/xp-history", lambda ctx, i: ("/stats/xp-history", _auth(ctx, i))),
+]
@@ -0,0 +1,99 @@
+"""Serialization microbenchmark for task list responses.
+
+Compares, per list size, the time to turn tasks into response bytes:
+
+- validated: ORM objects through FastAPI's response_model validation
+  (from_attributes) and the stdlib JSONResponse, i.e. the old path
+- projected: rows shaped by app.serialization into dicts and encoded
+  directly, with PlainJSONResponse and with ORJSONResponse
+
+No database is involved; rows and ORM objects are built in memory.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models import Category, FrequencyType, Task, TaskStatus
+from app.schemas import CategoryResponse, TaskResponse
+from app.serialization import TASK_FIELDS, PlainJSONResponse, task_dict
+
+
+def _tasks(count: int, category: Category) -> List[Task]:
+    start = datetime(2025, 1, 1, 8, 30)
+    return [
+        Task(
+            id=i + 1, user_id=1, category_id=category.id, category=category,
+            title=f"Task {i}", description=None if i % 2 else "Something to do",
+            frequency=FrequencyType.DAILY, status=TaskStatus.PENDING,
+            xp_reward=15, difficulty=1.5, current_streak=i % 30, best_streak=30,
+            created_at=start + timedelta(minutes=i), due_date=None,
+            last_completed=start + timedelta(days=1, minutes=i), is_active=True,
+        )
+        for i in range(count)
+    ]
+
+
+def _best(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(sizes=(1000, 10000), repeat: int = 5) -> Dict[int, Dict[str, float]]:
+    """Best-of-`repeat` milliseconds per approach and size"""
+    category = Category(
+        id=1, name="Salud", description="Ejercicio", icon="fitness", color="#4CAF50", base_xp=15
+    )
+    categories = {category.id: CategoryResponse.model_validate(category).model_dump()}
+    field = create_response_field(name="response", type_=List[TaskResponse])
+
+    approaches = {"validated": None, "projected_plain": PlainJSONResponse}
+    try:
+        from fastapi.responses import ORJSONResponse
+        approaches["projected_orjson"] = ORJSONResponse
+    except ImportError:
+        pass
+
+    results = {}
+    for size in sizes:
+        tasks = _tasks(size, category)
+        rows = [tuple(getattr(task, name) for name in TASK_FIELDS) for task in tasks]
+
+        def validated():
+            content = asyncio.run(serialize_response(
+                field=field, response_content=tasks, is_coroutine=False
+            ))
+            return JSONResponse(content).body
+
+        expected = validated()
+        timings = {"validated": _best(validated, repeat)}
+        for name, response_class in approaches.items():
+            if response_class is None:
+                continue
+
+            def projected(response_class=response_class):
+                return response_class([task_dict(row, categories) for row in rows]).body
+
+            if projected() != expected:
+                raise AssertionError(f"{name} output differs from the validated path")
+            timings[name] = _best(projected, repeat)
+        results[size] = {name: round(seconds * 1000, 2) for name, seconds in timings.items()}
+    return results
+
+
+def format_results(results: Dict[int, Dict[str, float]]) -> str:
+    lines = []
+    for size, timings in results.items():
+        baseline = timings["validated"]
+        for name, ms in timings.items():
+            lines.append(f"{size:>6} tasks  {name:<18} {ms:>9.2f} ms  x{baseline / ms:.1f}")
+    return "\n".join(lines)
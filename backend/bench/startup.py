@@ -0,0 +1,158 @@
+"""Worker startup: import time, startup work and concurrent first starts.
+
+Every measurement is a fresh child process, as a worker would be:
+
+- existing: `repeat` children on an already set-up database, each timing
+  `import app.main`, the whole lifespan startup (first connection
+  included), then on the open connection ensure_schema (one version
+  lookup once the schema is current) against the create_all plus index
+  pass every worker used to run at import time
+- concurrent: `runs` rounds of `workers` children released at the same
+  instant on an empty database, each running the lifespan startup. Every
+  child must exit cleanly, and the database must end up with the seeded
+  categories and SCHEMA_VERSION recorded once
+
+Needs LIFERPG_DATABASE_URL pointing at a scratch database before app is
+imported (the command line takes care of it).
+"""
+
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict
+
+from sqlalchemy import create_engine, func, select
+
+CHILD = "import sys; from bench.startup import measure; measure(float(sys.argv[1]))"
+
+# How far ahead concurrent children are told to start, enough for all of
+# them to be spawned and waiting
+START_DELAY_SECONDS = 3.0
+
+
+def measure(start_at: float):
+    """Child process: import and start the app, print the timings as JSON"""
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+
+    started = time.perf_counter()
+    from app.main import app
+    imported = time.perf_counter()
+
+    async def startup():
+        async with app.router.lifespan_context(app):
+            return time.perf_counter()
+
+    ready = asyncio.run(startup())
+
+    from app.database import Base, engine
+    from app.schema import ensure_schema
+
+    # Both on the pooled connection the lifespan opened
+    schema_started = time.perf_counter()
+    ensure_schema(engine)
+    create_all_started = time.perf_counter()
+    Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "startup_ms": (ready - imported) * 1000,
+        "ensure_schema_ms": (create_all_started - schema_started) * 1000,
+        "create_all_ms": (time.perf_counter() - create_all_started) * 1000,
+    }), flush=True)
+
+
+def _check(url: str) -> Dict:
+    from app.models import Category
+    from app.schema import schema_version
+
+    db_engine = create_engine(url)
+    try:
+        with db_engine.connect() as connection:
+            return {
+                "categories": connection.scalar(select(func.count()).select_from(Category.__table__)),
+                "versions": connection.execute(select(schema_version.c.version)).scalars().all(),
+            }
+    finally:
+        db_engine.dispose()
+
+
+def _remove(path: str):
+    for name in (path, path + "-wal", path + "-shm", path + "-journal"):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def run(workers: int, runs: int, repeat: int) -> Dict[str, Dict]:
+    """Median timings on an existing database, and the concurrent rounds"""
+    from app.schema import SCHEMA_VERSION
+    from app.seed import DEFAULT_CATEGORIES
+
+    url = os.environ["LIFERPG_DATABASE_URL"]
+    path = url[len("sqlite:///"):]
+
+    # The first child sets the database up; the timed ones find it current
+    subprocess.run([sys.executable, "-c", CHILD, "0"], capture_output=True, check=True)
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD, "0"], capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(json.loads(output.strip().splitlines()[-1]))
+    existing = {
+        key: round(statistics.median(timing[key] for timing in timings), 2)
+        for key in timings[0]
+    }
+
+    rounds = []
+    for _ in range(runs):
+        _remove(path)
+        start_at = time.time() + START_DELAY_SECONDS
+        children = [
+            subprocess.Popen(
+                [sys.executable, "-c", CHILD, str(start_at)],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            )
+            for _ in range(workers)
+        ]
+        failed = []
+        for child in children:
+            _, stderr = child.communicate()
+            if child.returncode != 0:
+                # The exception line, not the SQL and notes SQLAlchemy prints after it
+                errors = [line for line in stderr.splitlines() if re.match(r"[\w.]+(Error|Exception)\b", line)]
+                failed.append(errors[-1][:200] if errors else f"exit code {child.returncode}")
+        state = _check(url)
+        rounds.append({
+            "failed": failed,
+            "ok": not failed and state["categories"] == len(DEFAULT_CATEGORIES)
+            and state["versions"] == [SCHEMA_VERSION],
+            **state,
+        })
+    return {"existing": existing, "concurrent": {"workers": workers, "rounds": rounds}}
+
+
+def format_results(results: Dict) -> str:
+    existing = results["existing"]
+    lines = [
+        f"existing database (median): import app.main {existing['import_ms']:.0f} ms, "
+        f"lifespan startup {existing['startup_ms']:.1f} ms, "
+        f"ensure_schema {existing['ensure_schema_ms']:.2f} ms "
+        f"(create_all + indexes {existing['create_all_ms']:.2f} ms)",
+        f"{results['concurrent']['workers']} workers at once on an empty database:",
+    ]
+    for number, result in enumerate(results["concurrent"]["rounds"], 1):
+        lines.append(
+            f"  run {number}: {'ok' if result['ok'] else 'FAILED'}, {len(result['failed'])} crashed, "
+            f"{result['categories']} categories, versions {result['versions']}"
+        )
+        lines.extend(f"    {error}" for error in result["failed"])
+    return "\n".join(lines)
@@ -0,0 +1,157 @@
+"""Concurrent completions of one task.
+
+Releases `clients` threads at once, each with its own keep-alive
+connection, at POST /tasks/{id}/complete (and /tasks/complete-batch) of
+the same daily task, then checks the database: every round must award
+exactly one completion's XP, whatever the mix of 200s, 400s and 409s.
+Each round gets a new task, so it starts with the period open. With
+LIFERPG_COMPLETION_JOURNAL set, the journal is drained before checking.
+
+Rounds:
+- plain: no Idempotency-Key; one request wins, the rest are refused
+- same-key: every client sends one key, as a retrying client would;
+  all get the winner's response, 99 of them replayed
+- own-keys: a different key per client; one wins
+- batch: the batch endpoint, no key
+
+Needs LIFERPG_DATABASE_URL pointing at a scratch database before app is
+imported (the command line takes care of it).
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+ROUNDS = ("plain", "same-key", "own-keys", "batch")
+
+
+class StressFailure(AssertionError):
+    pass
+
+
+def _hammer(client, clients: int, build) -> List:
+    """Send build(i) -> (method, path, options) from every client at once"""
+    barrier = threading.Barrier(clients)
+
+    def send(i: int):
+        method, path, options = build(i)
+        barrier.wait()
+        return client.request(method, path, **options)
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        return list(pool.map(send, range(clients)))
+
+
+def _totals(db, user_id: int, task_id: int) -> Dict:
+    from sqlalchemy import func
+
+    from app.models import DailyXP, TaskCompletion, User
+
+    user = db.get(User, user_id)
+    db.refresh(user)
+    completions, xp = db.query(
+        func.count(TaskCompletion.id), func.coalesce(func.sum(TaskCompletion.xp_earned), 0)
+    ).filter(TaskCompletion.task_id == task_id).one()
+    return {
+        "completions": completions,
+        "xp": xp,
+        "total_xp": user.total_xp,
+        "tasks_completed": user.tasks_completed,
+        "daily_xp": db.query(func.coalesce(func.sum(DailyXP.xp_earned), 0)).filter(
+            DailyXP.user_id == user_id
+        ).scalar(),
+    }
+
+
+def _settle():
+    """Wait until write-behind completions have reached the database"""
+    from app.journal import completion_journal
+
+    if completion_journal is not None:
+        with completion_journal.paused():
+            pass
+
+
+def run(clients: int = 100, mode: str = "uvicorn") -> Dict[str, Dict]:
+    """Status counts and timing per round; raises StressFailure on a double award"""
+    from app.database import SessionLocal
+    from app.main import app
+
+    from .runner import CLIENTS
+
+    results = {}
+    with CLIENTS[mode](app) as client:
+        account = {"email": "stress@example.com", "username": "stress", "password": "bench"}
+        _, user = client.request_json("POST", "/auth/register", json=account)
+        _, token = client.request_json("POST", "/auth/login", json=account)
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+
+        same_key = str(uuid.uuid4())
+        requests = {
+            "plain": lambda task_id, i: ("POST", f"/tasks/{task_id}/complete", {"headers": headers}),
+            "same-key": lambda task_id, i: ("POST", f"/tasks/{task_id}/complete", {
+                "headers": {**headers, "Idempotency-Key": same_key}
+            }),
+            "own-keys": lambda task_id, i: ("POST", f"/tasks/{task_id}/complete", {
+                "headers": {**headers, "Idempotency-Key": f"{same_key}-{i}"}
+            }),
+            "batch": lambda task_id, i: ("POST", "/tasks/complete-batch", {
+                "headers": headers, "json": {"completions": [{"task_id": task_id}]}
+            }),
+        }
+
+        db = SessionLocal()
+        try:
+            for name in ROUNDS:
+                _, task = client.request_json("POST", "/tasks/", headers=headers, json={
+                    "title": f"Stress {name}", "category_id": 1, "frequency": "daily"
+                })
+                before = _totals(db, user["id"], task["id"])
+                started = time.perf_counter()
+                responses = _hammer(client, clients, lambda i: requests[name](task["id"], i))
+                seconds = time.perf_counter() - started
+                _settle()
+                after = _totals(db, user["id"], task["id"])
+                results[name] = _check(name, responses, before, after, seconds)
+                print(f"  {name} done", flush=True)
+        finally:
+            db.close()
+    return results
+
+
+def _check(name: str, responses: List, before: Dict, after: Dict, seconds: float) -> Dict:
+    statuses = Counter(status for status, _ in responses)
+    awarded = {key: after[key] - before[key] for key in after}
+    result = {"statuses": dict(statuses), "awarded": awarded, "seconds": round(seconds, 3)}
+
+    if awarded["completions"] != 1 or awarded["tasks_completed"] != 1:
+        raise StressFailure(f"{name}: {awarded['completions']} completions recorded, expected 1")
+    if not awarded["xp"] == awarded["total_xp"] == awarded["daily_xp"]:
+        raise StressFailure(f"{name}: XP out of step {awarded}")
+
+    bodies = [json.loads(body) for status, body in responses if status == 200]
+    if name == "batch":
+        won = sum(body["results"][0]["completed"] for body in bodies)
+        if won != 1:
+            raise StressFailure(f"{name}: {won} batches completed the task, expected 1")
+    elif name == "same-key":
+        if statuses[200] != len(responses) or any(body != bodies[0] for body in bodies):
+            raise StressFailure(f"{name}: expected the same 200 for every retry, got {dict(statuses)}")
+    elif statuses[200] != 1:
+        raise StressFailure(f"{name}: {statuses[200]} requests succeeded, expected 1")
+    return result
+
+
+def format_results(results: Dict[str, Dict]) -> str:
+    lines = [f"{'round':<10} {'200':>5} {'400':>5} {'409':>5} {'awards':>7} {'seconds':>8}"]
+    for name, result in results.items():
+        statuses = result["statuses"]
+        lines.append(
+            f"{name:<10} {statuses.get(200, 0):>5} {statuses.get(400, 0):>5} "
+            f"{statuses.get(409, 0):>5} {result['awarded']['completions']:>7} {result['seconds']:>8.2f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,90 @@
+"""Shared fixtures: the app on a throwaway SQLite file.
+
+The app reads its configuration from the environment at import time, so
+the variables are set here, before any test module imports it.
+"""
+
+import itertools
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+DB_DIR = tempfile.mkdtemp(prefix="liferpg-tests-")
+os.environ["LIFERPG_DATABASE_URL"] = f"sqlite:///{DB_DIR}/liferpg.db"
+os.environ["LIFERPG_BCRYPT_ROUNDS"] = "4"
+os.environ["LIFERPG_ROLLOVER_SCHEDULER"] = "0"
+os.environ.pop("LIFERPG_COMPLETION_JOURNAL", None)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.database import async_engine, async_read_engine, engine, read_engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+_user_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def new_user(client):
+    """Register and log in a fresh user; returns (user id, auth headers)"""
+
+    def create():
+        number = next(_user_numbers)
+        account = {"email": f"user{number}@example.com", "username": f"user{number}", "password": "secret123"}
+        user_id = client.post("/auth/register", json=account).json()["id"]
+        token = client.post("/auth/login", json=account).json()["access_token"]
+        return user_id, {"Authorization": f"Bearer {token}"}
+
+    return create
+
+
+@pytest.fixture
+def add_tasks(client):
+    """Create `count` daily tasks through the API; returns their ids"""
+
+    def create(headers, count, **fields):
+        return [
+            client.post(
+                "/tasks/", headers=headers, json={"title": f"task {i}", "category_id": 1, **fields}
+            ).json()["id"]
+            for i in range(count)
+        ]
+
+    return create
+
+
+@pytest.fixture
+def count_statements():
+    """Context manager yielding a list that collects the SQL run inside it"""
+
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        # The async engines run their statements through their sync_engine
+        engines = [engine, read_engine] + [
+            async_db_engine.sync_engine
+            for async_db_engine in (async_engine, async_read_engine)
+            if async_db_engine is not None
+        ]
+        engines = [db_engine for db_engine in engines if db_engine is not None]
+        for db_engine in engines:
+            event.listen(db_engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            for db_engine in engines:
+                event.remove(db_engine, "before_cursor_execute", record)
+
+    return counting
@@ -0,0 +1,27 @@
+"""The whole suite again with LIFERPG_ASYNC_DB=1.
+
+The mode is read at import time, so it runs in a child pytest.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.database import ASYNC_MODE
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.skipif(ASYNC_MODE, reason="already running in async mode")
+def test_suite_passes_in_async_mode():
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", "tests"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "LIFERPG_ASYNC_DB": "1"},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stdout[-4000:]
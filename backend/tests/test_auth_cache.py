@@ -0,0 +1,28 @@
+"""Token and user caches behind get_current_user"""
+
+from app.progression import level_for_xp
+
+
+def test_me_is_served_from_the_caches(client, new_user, count_statements):
+    _, headers = new_user()
+    client.get("/auth/me", headers=headers)
+
+    with count_statements() as statements:
+        response = client.get("/auth/me", headers=headers)
+
+    assert response.status_code == 200
+    assert statements == []
+
+
+def test_completion_invalidates_the_cached_user(client, new_user, add_tasks):
+    _, headers = new_user()
+    task_id, = add_tasks(headers, 1, xp_reward=150)
+    before = client.get("/auth/me", headers=headers).json()
+    assert (before["total_xp"], before["level"]) == (0, 1)
+
+    completion = client.post(f"/tasks/{task_id}/complete", headers=headers).json()
+    after = client.get("/auth/me", headers=headers).json()
+
+    assert completion["level_up"] and level_for_xp(150) == 2
+    assert after["total_xp"] == 150
+    assert after["level"] == completion["new_level"] == 2
@@ -0,0 +1,83 @@
+"""Category cache lookups by id"""
+
+from sqlalchemy import event
+
+from app.category_cache import category_cache
+from app.database import SessionLocal, engine
+from app.models import Category
+
+
+def test_unknown_ids_reload_the_table_at_most_once_per_interval(client, count_statements, monkeypatch):
+    monkeypatch.setattr(category_cache, "miss_refresh_interval", 3600)
+    client.get("/categories/")
+
+    with count_statements() as statements:
+        for category_id in range(100_000, 100_050):
+            assert client.get(f"/categories/{category_id}").status_code == 404
+
+    assert len(statements) <= 1
+
+
+def test_category_from_another_worker_shows_up_after_the_interval(client, monkeypatch):
+    monkeypatch.setattr(category_cache, "miss_refresh_interval", 0)
+    client.get("/categories/")
+    db = SessionLocal()
+    try:
+        # Bypasses this worker's invalidate(), like a write by another worker
+        category = Category(
+            name="Written elsewhere", description="", icon="x", color="#000000", base_xp=10
+        )
+        db.add(category)
+        db.commit()
+        category_id = category.id
+    finally:
+        db.close()
+
+    response = client.get(f"/categories/{category_id}")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Written elsewhere"
+
+
+def test_created_category_is_visible_at_once(client, new_user, monkeypatch):
+    monkeypatch.setattr(category_cache, "miss_refresh_interval", 3600)
+    _, headers = new_user()
+    category = {"name": "Created here", "description": "", "icon": "y", "color": "#111111", "base_xp": 10}
+    created = client.post("/categories/", headers=headers, json=category).json()
+
+    assert client.get(f"/categories/{created['id']}").json()["name"] == "Created here"
+
+
+def test_load_racing_an_invalidation_is_not_cached(client):
+    client.get("/categories/")
+    category_cache.invalidate()
+    written = []
+
+    def write_during_load(conn, cursor, statement, parameters, context, executemany):
+        # Another request writes a category and invalidates while this load's
+        # SELECT is running
+        if written or "FROM categories" not in statement:
+            return
+        written.append(True)
+        db = SessionLocal()
+        try:
+            db.add(Category(name="Raced", description="", icon="z", color="#222222", base_xp=10))
+            db.commit()
+        finally:
+            db.close()
+        category_cache.invalidate()
+
+    db = SessionLocal()
+    event.listen(engine, "after_cursor_execute", write_during_load)
+    try:
+        stale = category_cache.get(db)
+    finally:
+        event.remove(engine, "after_cursor_execute", write_during_load)
+        db.close()
+
+    assert written
+    assert "Raced" not in [category.name for category in stale.categories]
+    db = SessionLocal()
+    try:
+        assert "Raced" in [category.name for category in category_cache.get(db).categories]
+    finally:
+        db.close()
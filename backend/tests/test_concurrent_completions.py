@@ -0,0 +1,77 @@
+"""Concurrent completions of one task, with and without Idempotency-Key"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.models import TaskCompletion, User
+
+CLIENTS = 8
+
+
+def stored_progress(user_id):
+    db = SessionLocal()
+    try:
+        total_xp = db.get(User, user_id).total_xp
+        completions = db.scalar(
+            select(func.count()).select_from(TaskCompletion).where(TaskCompletion.user_id == user_id)
+        )
+        return total_xp, completions
+    finally:
+        db.close()
+
+
+def complete_at_once(client, task_id, headers_for_client):
+    """POST the completion from CLIENTS threads released together"""
+    barrier = threading.Barrier(CLIENTS)
+
+    def complete(number):
+        barrier.wait()
+        return client.post(f"/tasks/{task_id}/complete", headers=headers_for_client(number))
+
+    with ThreadPoolExecutor(CLIENTS) as pool:
+        return list(pool.map(complete, range(CLIENTS)))
+
+
+def test_concurrent_completions_award_once(client, new_user, add_tasks):
+    user_id, headers = new_user()
+    task_id, = add_tasks(headers, 1)
+    xp_before, completions_before = stored_progress(user_id)
+
+    responses = complete_at_once(client, task_id, lambda number: headers)
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses.count(200) == 1
+    assert set(statuses[1:]) <= {400, 409}
+    xp_earned, = [response.json()["xp_earned"] for response in responses if response.status_code == 200]
+    assert stored_progress(user_id) == (xp_before + xp_earned, completions_before + 1)
+
+
+def test_concurrent_retries_with_one_key_replay_the_first_response(client, new_user, add_tasks):
+    user_id, headers = new_user()
+    task_id, = add_tasks(headers, 1)
+    keyed = {**headers, "Idempotency-Key": "complete-once"}
+
+    responses = complete_at_once(client, task_id, lambda number: keyed)
+
+    assert [response.status_code for response in responses] == [200] * CLIENTS
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert sum(response.headers.get("Idempotent-Replayed") == "true" for response in responses) == CLIENTS - 1
+    assert stored_progress(user_id) == (responses[0].json()["xp_earned"], 1)
+
+    replayed = client.post(f"/tasks/{task_id}/complete", headers=keyed)
+    assert replayed.status_code == 200
+    assert replayed.headers["Idempotent-Replayed"] == "true"
+    assert replayed.json() == responses[0].json()
+
+
+def test_key_reused_for_another_request_is_rejected(client, new_user, add_tasks):
+    user_id, headers = new_user()
+    first_id, second_id = add_tasks(headers, 2)
+    keyed = {**headers, "Idempotency-Key": "reused"}
+
+    assert client.post(f"/tasks/{first_id}/complete", headers=keyed).status_code == 200
+    assert client.post(f"/tasks/{second_id}/complete", headers=keyed).status_code == 422
+    assert stored_progress(user_id)[1] == 1
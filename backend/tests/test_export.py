@@ -0,0 +1,24 @@
+"""GET /stats/export"""
+
+import csv
+import io
+import json
+
+
+def test_export_keeps_completions_of_deleted_tasks(client, new_user, add_tasks):
+    _, headers = new_user()
+    kept, deleted = add_tasks(headers, 2)
+    for task_id in (kept, deleted):
+        assert client.post(f"/tasks/{task_id}/complete", headers=headers).status_code == 200
+    client.delete(f"/tasks/{deleted}", headers=headers)
+
+    response = client.get("/stats/export", params={"format": "ndjson"}, headers=headers)
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["task_title"] is None for record in records] == [False, True]
+    assert all(record["xp_earned"] > 0 for record in records)
+
+    response = client.get("/stats/export", params={"format": "csv"}, headers=headers)
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 2
+    assert rows[1]["task_title"] == "" and rows[1]["category"] == ""
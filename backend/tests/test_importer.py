@@ -0,0 +1,91 @@
+"""POST /tasks/import from CSV and JSON files"""
+
+import json
+from datetime import datetime
+
+
+def import_file(client, headers, filename, content):
+    return client.post("/tasks/import", headers=headers, files={"file": (filename, content)})
+
+
+def tasks_by_title(client, headers):
+    return {task["title"]: task for task in client.get("/tasks/", headers=headers).json()}
+
+
+def test_csv_import_replays_history_and_skips_duplicate_periods(client, new_user):
+    _, headers = new_user()
+    content = "\n".join([
+        "task,completed_at,category,xp_reward",
+        "Read,2024-03-02T21:00:00,Aprendizaje,20",
+        "Read,2024-03-01T21:00:00,,",
+        "Run,2024-03-01T07:00:00,Salud,10",
+        # Same day as the one above: a second check-in of a daily task
+        "Run,2024-03-01T19:00:00,,",
+        "Run,2024-03-03T07:00:00+02:00,,",
+    ])
+
+    response = import_file(client, headers, "history.csv", content)
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["tasks_created"] == 2
+    assert result["completions_imported"] == 4
+    assert result["completions_skipped"] == 1
+    # Read: 20, then 20 + 5% streak bonus; Run: 10, then a lapsed day
+    assert result["total_xp_earned"] == 20 + 21 + 10 + 10
+
+    tasks = tasks_by_title(client, headers)
+    assert tasks["Read"]["xp_reward"] == 20
+    assert tasks["Read"]["best_streak"] == 2
+    assert tasks["Run"]["best_streak"] == 1
+    assert tasks["Run"]["last_completed"] == "2024-03-03T05:00:00"
+
+
+def test_imported_tasks_date_from_their_first_completion(client, new_user):
+    _, headers = new_user()
+    data = {
+        "tasks": [
+            {"title": "Stretch", "category": "Salud"},
+            {"title": "Journal", "category": "Salud", "created_at": "2023-12-25T09:00:00"},
+            {"title": "Meditate", "category": "Salud"},
+        ],
+        "completions": [
+            {"task": "Stretch", "completed_at": "2024-02-10T08:00:00"},
+            {"task": "Stretch", "completed_at": "2024-01-15T08:00:00"},
+            {"task": "Journal", "completed_at": "2024-01-01T22:00:00"},
+        ],
+    }
+    before = datetime.utcnow()
+
+    response = import_file(client, headers, "history.json", json.dumps(data))
+
+    assert response.status_code == 200
+    tasks = tasks_by_title(client, headers)
+    assert tasks["Stretch"]["created_at"] == "2024-01-15T08:00:00"
+    assert tasks["Journal"]["created_at"] == "2023-12-25T09:00:00"
+    # No history to date it from
+    assert datetime.fromisoformat(tasks["Meditate"]["created_at"]) >= before.replace(microsecond=0)
+
+
+def test_import_rejects_unknown_categories_and_tasks(client, new_user):
+    _, headers = new_user()
+
+    unknown_category = {"tasks": [{"title": "Swim", "category": "Nope"}]}
+    response = import_file(client, headers, "history.json", json.dumps(unknown_category))
+    assert response.status_code == 400
+    assert "Unknown category" in response.json()["detail"]
+
+    unknown_task = {
+        "tasks": [{"title": "Swim", "category": "Salud"}],
+        "completions": [{"task": "Cycle", "completed_at": "2024-01-01T08:00:00"}],
+    }
+    response = import_file(client, headers, "history.json", json.dumps(unknown_task))
+    assert response.status_code == 400
+    assert "unknown task 'Cycle'" in response.json()["detail"]
+
+    response = import_file(client, headers, "history.csv", "title,date\nSwim,2024-01-01\n")
+    assert response.status_code == 400
+    assert "'task' and 'completed_at'" in response.json()["detail"]
+
+    # Nothing was written by the refused files
+    assert client.get("/tasks/", headers=headers).json() == []
@@ -0,0 +1,212 @@
+"""Write-behind completion journal (LIFERPG_COMPLETION_JOURNAL).
+
+The suite runs without it, so most tests start a journal of their own and
+point the complete endpoint at it. Endpoints that pause the journal are
+wrapped at import time, so those run in a child process with it enabled.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, select
+
+from app.database import SQLALCHEMY_DATABASE_URL, SessionLocal
+from app.journal import CompletionJournal
+from app.models import Task, TaskCompletion, User
+from app.progression import level_for_xp
+from app.routers import tasks as tasks_router
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Long enough that nothing is applied before the test says so
+NEVER_MS = 100_000_000
+
+CHILD = """
+import json
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+mode, headers, task_ids = sys.argv[1], json.loads(sys.argv[2]), json.loads(sys.argv[3])
+with TestClient(app) as client:
+    if mode == "crash":
+        results = [
+            client.post(f"/tasks/{task_id}/complete", headers=headers).status_code
+            for task_id in task_ids
+        ]
+        print(json.dumps(results), flush=True)
+        os._exit(0)
+
+    first, second, third = task_ids
+    writes = [
+        (first, lambda: client.put(f"/tasks/{first}", headers=headers, json={"is_active": False})),
+        (second, lambda: client.post(f"/tasks/{second}/start", headers=headers)),
+        (third, lambda: client.delete(f"/tasks/{third}", headers=headers)),
+    ]
+    results = []
+    for task_id, write in writes:
+        completed = client.post(f"/tasks/{task_id}/complete", headers=headers).status_code
+        written = write().status_code
+        # The write drained the journal before it ran
+        pending = client.get("/health").json()["completion_journal"]["pending"]
+        results.append([completed, written, pending])
+    results.append(client.get(f"/tasks/{second}", headers=headers).json()["status"])
+print(json.dumps(results))
+"""
+
+
+@pytest.fixture
+def journal(monkeypatch, tmp_path):
+    """Start a journal on the test database and route completions to it"""
+    started = []
+
+    def start(flush_ms):
+        completion_journal = CompletionJournal(str(tmp_path / "journal.log"), flush_ms=flush_ms)
+        completion_journal.start(SQLALCHEMY_DATABASE_URL)
+        started.append(completion_journal)
+        monkeypatch.setattr(tasks_router, "completion_journal", completion_journal)
+        return completion_journal
+
+    yield start
+    for completion_journal in started:
+        completion_journal.stop()
+
+
+def run_child(mode, headers, task_ids, journal_path):
+    env = {
+        **os.environ,
+        "LIFERPG_COMPLETION_JOURNAL": journal_path,
+        "LIFERPG_JOURNAL_FLUSH_MS": str(NEVER_MS),
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD, mode, json.dumps(headers), json.dumps(task_ids)],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-4000:]
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def wait_applied(completion_journal):
+    # Not paused(): the end of a pause resets what the journal knows
+    while completion_journal.stats()["pending"]:
+        time.sleep(0.01)
+
+
+def stored_progress(user_id):
+    db = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        completions = db.scalar(
+            select(func.count()).select_from(TaskCompletion).where(TaskCompletion.user_id == user_id)
+        )
+        return user.total_xp, user.level, completions
+    finally:
+        db.close()
+
+
+def test_completions_are_applied_in_one_group(client, new_user, add_tasks, journal):
+    completion_journal = journal(flush_ms=2000)
+    user_id, headers = new_user()
+    task_ids = add_tasks(headers, 20)
+
+    responses = [client.post(f"/tasks/{task_id}/complete", headers=headers) for task_id in task_ids]
+    assert [response.status_code for response in responses] == [200] * 20
+    with completion_journal.paused():
+        pass
+
+    assert completion_journal.groups == 1
+    assert completion_journal.applied == 20
+    xp = sum(response.json()["xp_earned"] for response in responses)
+    assert stored_progress(user_id) == (xp, level_for_xp(xp), 20)
+
+
+def test_completions_get_503_while_paused(client, new_user, add_tasks, journal):
+    completion_journal = journal(flush_ms=1)
+    user_id, headers = new_user()
+    task_id, = add_tasks(headers, 1)
+
+    with completion_journal.paused(user_id):
+        response = client.post(f"/tasks/{task_id}/complete", headers=headers)
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+    assert client.post(f"/tasks/{task_id}/complete", headers=headers).status_code == 200
+
+
+def test_level_up_matches_the_level_written(new_user, add_tasks, journal):
+    completion_journal = journal(flush_ms=1)
+    user_id, headers = new_user()
+    first_id, second_id = add_tasks(headers, 2, xp_reward=60)
+    assert level_for_xp(60) == 1 and level_for_xp(120) == 2
+
+    db = SessionLocal()
+    try:
+        # Read before the first completion is applied, like a request racing the flush
+        user = db.get(User, user_id)
+        first, second = db.get(Task, first_id), db.get(Task, second_id)
+        db.expunge_all()
+    finally:
+        db.close()
+
+    first_response = completion_journal.complete(
+        first, user, datetime.utcnow(), completion_journal.direct_writes(user_id)
+    )
+    wait_applied(completion_journal)
+    assert stored_progress(user_id) == (60, 1, 1)
+
+    second_response = completion_journal.complete(
+        second, user, datetime.utcnow(), completion_journal.direct_writes(user_id)
+    )
+    wait_applied(completion_journal)
+
+    assert not first_response.level_up
+    assert second_response.level_up and second_response.new_level == 2
+    assert stored_progress(user_id) == (120, 2, 2)
+
+
+def test_acknowledged_completions_are_replayed_after_a_crash(new_user, add_tasks, tmp_path, journal):
+    user_id, headers = new_user()
+    task_ids = add_tasks(headers, 3)
+    journal_path = str(tmp_path / "journal.log")
+
+    assert run_child("crash", headers, task_ids, journal_path) == [200, 200, 200]
+    assert stored_progress(user_id)[2] == 0
+    with open(journal_path, "a", encoding="utf-8") as f:
+        # A line the crash cut short; it was never acknowledged
+        f.write('{"id": ')
+
+    journal(flush_ms=1)
+    xp, _, completions = stored_progress(user_id)
+    assert completions == 3 and xp > 0
+    assert os.path.getsize(journal_path) == 0
+    assert not os.path.exists(journal_path + ".applying")
+
+
+def test_task_writes_pause_the_journal(new_user, add_tasks, tmp_path):
+    user_id, headers = new_user()
+    task_ids = add_tasks(headers, 3)
+
+    results = run_child("edit", headers, task_ids, str(tmp_path / "journal.log"))
+
+    assert results[:3] == [[200, 200, 0]] * 3
+    # Started after its completion was journaled, so it stays in progress
+    assert results[3] == "in_progress"
+    assert stored_progress(user_id)[2] == 3
+
+
+def test_journal_refuses_other_databases():
+    with pytest.raises(RuntimeError, match="SQLite"):
+        CompletionJournal(None).start("postgresql://liferpg@localhost/liferpg")
@@ -0,0 +1,101 @@
+"""GET /stats/leaderboard and the in-memory rank index"""
+
+from sqlalchemy import func, select
+
+from app.category_cache import category_cache
+from app.database import SessionLocal
+from app.leaderboard import rank_index
+from app.models import Category, User
+
+
+def expected_rank(user_id):
+    """1 + the users with more XP, counted in SQL"""
+    db = SessionLocal()
+    try:
+        xp = db.get(User, user_id).total_xp
+        return 1 + db.scalar(select(func.count()).select_from(User).where(User.total_xp > xp))
+    finally:
+        db.close()
+
+
+def user_count():
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).select_from(User))
+    finally:
+        db.close()
+
+
+def test_rank_index_follows_awards_without_reloading(
+    client, new_user, add_tasks, count_statements, monkeypatch
+):
+    monkeypatch.setattr(rank_index, "ttl", 3600)
+    rank_index.invalidate()
+    first_id, first = new_user()
+    second_id, second = new_user()
+    client.get("/stats/leaderboard", headers=first)
+
+    for task_id in add_tasks(first, 2):
+        client.post(f"/tasks/{task_id}/complete", headers=first)
+    task_id, = add_tasks(second, 1, xp_reward=500)
+    client.post(f"/tasks/{task_id}/complete", headers=second)
+    third_id, third = new_user()
+
+    with count_statements() as statements:
+        boards = {
+            user_id: client.get("/stats/leaderboard", headers=headers).json()
+            for user_id, headers in ((first_id, first), (second_id, second), (third_id, third))
+        }
+
+    # Served from the index as updated in place: no reload of every XP value
+    assert not any("GROUP BY users.total_xp" in statement for statement in statements)
+    for user_id, board in boards.items():
+        assert board["me"]["rank"] == expected_rank(user_id)
+        assert board["players"] == user_count()
+
+
+def test_leaderboard_orders_top_and_neighbours(client, new_user):
+    _, headers = new_user()
+    new_user()
+
+    board = client.get("/stats/leaderboard", headers=headers, params={"limit": 5, "around": 1}).json()
+
+    xps = [entry["xp"] for entry in board["top"]]
+    assert xps == sorted(xps, reverse=True)
+    for above, below in zip(board["top"], board["top"][1:]):
+        assert below["rank"] == above["rank"] if below["xp"] == above["xp"] else below["rank"] > above["rank"]
+    around = board["around_me"]
+    assert board["me"] in around
+    assert [entry["xp"] for entry in around] == sorted((entry["xp"] for entry in around), reverse=True)
+    assert len(around) <= 3
+
+
+def test_category_leaderboard_ranks_this_weeks_xp(client, new_user, add_tasks):
+    db = SessionLocal()
+    try:
+        category = Category(name="Leaderboard test", description="", icon="x", color="#000000", base_xp=10)
+        db.add(category)
+        db.commit()
+        category_id = category.id
+    finally:
+        db.close()
+    category_cache.invalidate()
+
+    players = [new_user() for _ in range(3)]
+    for (_, headers), xp in zip(players, (30, 30, 10)):
+        task_id, = add_tasks(headers, 1, category_id=category_id, xp_reward=xp)
+        assert client.post(f"/tasks/{task_id}/complete", headers=headers).status_code == 200
+    newcomer_id, newcomer = new_user()
+
+    response = client.get("/stats/leaderboard", headers=newcomer, params={"category_id": category_id})
+
+    assert response.status_code == 200
+    board = response.json()
+    assert board["category_id"] == category_id
+    assert board["players"] == 3
+    assert [(entry["xp"], entry["rank"]) for entry in board["top"]] == [(30, 1), (30, 1), (10, 3)]
+    # No XP in the category yet: last, tied with everyone at zero
+    assert board["me"] == {**board["me"], "user_id": newcomer_id, "xp": 0, "rank": 4}
+
+    missing = client.get("/stats/leaderboard", headers=newcomer, params={"category_id": 10**9})
+    assert missing.status_code == 404
@@ -0,0 +1,59 @@
+"""Keyset pagination of GET /tasks/ and GET /stats/history"""
+
+import pytest
+
+
+def pages(client, path, headers, limit):
+    """Follow X-Next-Cursor to the end; returns the pages' ids"""
+    result = []
+    params = {"limit": limit}
+    while True:
+        response = client.get(path, headers=headers, params=params)
+        assert response.status_code == 200
+        result.append([item["id"] for item in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return result
+        params = {"limit": limit, "cursor": cursor}
+
+
+def test_task_pages_cover_every_task_once(client, new_user, add_tasks):
+    _, headers = new_user()
+    task_ids = add_tasks(headers, 5)
+
+    assert pages(client, "/tasks/", headers, 2) == [task_ids[0:2], task_ids[2:4], task_ids[4:5]]
+    # Without a limit, one unpaged response as before
+    response = client.get("/tasks/", headers=headers)
+    assert [task["id"] for task in response.json()] == task_ids
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_history_pages_newest_first(client, new_user, add_tasks):
+    _, headers = new_user()
+    completion_ids = []
+    for task_id in add_tasks(headers, 5):
+        completion_ids.append(client.post(f"/tasks/{task_id}/complete", headers=headers).json()["id"])
+
+    result = pages(client, "/stats/history", headers, 2)
+
+    newest_first = completion_ids[::-1]
+    assert result == [newest_first[0:2], newest_first[2:4], newest_first[4:5]]
+
+
+def test_an_exact_last_page_has_no_cursor(client, new_user, add_tasks):
+    _, headers = new_user()
+    task_ids = add_tasks(headers, 4)
+
+    # The extra row fetched past the limit says there is no third page
+    assert pages(client, "/tasks/", headers, 2) == [task_ids[0:2], task_ids[2:4]]
+
+
+@pytest.mark.parametrize("path", ["/tasks/", "/stats/history"])
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WzFd", "bnVsbA"])
+def test_bad_cursor_is_a_400(client, new_user, path, cursor):
+    _, headers = new_user()
+
+    response = client.get(path, headers=headers, params={"limit": 2, "cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,66 @@
+"""Admission control and threading of the bcrypt pool"""
+
+import threading
+import time
+
+import anyio.to_thread
+
+from app import auth
+
+
+def test_full_pool_answers_503_before_any_query(client, count_statements, monkeypatch):
+    monkeypatch.setattr(auth, "password_slots", threading.BoundedSemaphore(1))
+    auth.password_slots.acquire()
+
+    with count_statements() as statements:
+        response = client.post("/auth/login", json={"email": "anyone@example.com", "password": "x"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    assert statements == []
+
+
+def test_logins_waiting_for_bcrypt_leave_the_threadpool_free(client, new_user, monkeypatch):
+    _, headers = new_user()
+    email = client.get("/auth/me", headers=headers).json()["email"]
+    release = threading.Event()
+    checking = []
+
+    def slow_checkpw(password, hashed):
+        checking.append(True)
+        release.wait(10)
+        return True
+
+    monkeypatch.setattr(auth.bcrypt, "checkpw", slow_checkpw)
+    limiter = client.portal.call(anyio.to_thread.current_default_thread_limiter)
+    tokens = limiter.total_tokens
+    client.portal.call(setattr, limiter, "total_tokens", 2)
+    try:
+        statuses = []
+        logins = [
+            threading.Thread(target=lambda: statuses.append(
+                client.post("/auth/login", json={"email": email, "password": "x"}).status_code
+            ))
+            for _ in range(3)
+        ]
+        for login in logins:
+            login.start()
+        deadline = time.monotonic() + 5
+        while auth.password_slots._value > auth.PASSWORD_HASH_WORKERS + auth.PASSWORD_HASH_QUEUE - 3:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+        # More logins wait for bcrypt than the limiter has threads, yet a
+        # sync route still gets one
+        categories = []
+        reader = threading.Thread(target=lambda: categories.append(client.get("/categories/").status_code))
+        reader.start()
+        reader.join(5)
+        assert categories == [200]
+        assert client.get("/health").status_code == 200
+    finally:
+        release.set()
+        for login in logins:
+            login.join(10)
+        client.portal.call(setattr, limiter, "total_tokens", tokens)
+    assert statuses == [200, 200, 200]
@@ -0,0 +1,35 @@
+"""The progression tables against the level loop and title scan they replaced"""
+
+from app.models import get_title_for_level, get_xp_for_next_level
+from app.progression import level_for_xp, levels_for_xp, title_for_level
+
+MAX_XP = 300_000
+
+
+def loop_levels(max_xp):
+    """Level per total XP from 0 to max_xp, climbing like the old loop did"""
+    level = 1
+    xp_for_next = get_xp_for_next_level(level)
+    levels = []
+    for total_xp in range(max_xp + 1):
+        while total_xp >= xp_for_next:
+            level += 1
+            xp_for_next = get_xp_for_next_level(level)
+        levels.append(level)
+    return levels
+
+
+def test_level_for_xp_matches_loop():
+    expected = loop_levels(MAX_XP)
+    mismatches = [xp for xp in range(MAX_XP + 1) if level_for_xp(xp) != expected[xp]]
+    assert mismatches == []
+
+
+def test_levels_for_xp_matches_level_for_xp():
+    total_xps = list(range(0, MAX_XP, 997))
+    assert levels_for_xp(total_xps) == [level_for_xp(xp) for xp in total_xps]
+
+
+def test_title_for_level_matches_scan():
+    for level in range(0, 100):
+        assert title_for_level(level) == get_title_for_level(level)
@@ -0,0 +1,111 @@
+"""Stats reads on their own query_only engine (LIFERPG_SQLITE_READ_POOL=1).
+
+The engines are built at import time, so the routing tests only run in a
+child pytest with the read pool turned on.
+"""
+
+import os
+import subprocess
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from app import database
+from app.database import SQLALCHEMY_DATABASE_URL, async_read_engine, create_db_engine, read_engine
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+needs_read_engine = pytest.mark.skipif(read_engine is None, reason="reads share the main engine")
+
+
+@contextmanager
+def read_statements():
+    """Collect the SQL the read engine runs inside the block"""
+    # Async mode reads through the async engine's sync_engine
+    db_engine = async_read_engine.sync_engine if async_read_engine is not None else read_engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(db_engine, "before_cursor_execute", record)
+
+
+def test_read_only_connections_refuse_writes(client):
+    read_only = create_db_engine(SQLALCHEMY_DATABASE_URL, read_only=True)
+    try:
+        with read_only.connect() as connection:
+            assert connection.execute(text("SELECT count(*) FROM users")).scalar() >= 0
+            with pytest.raises(OperationalError, match="readonly"):
+                connection.execute(text("UPDATE users SET total_xp = total_xp"))
+    finally:
+        read_only.dispose()
+
+
+def test_read_database_url(monkeypatch):
+    file_url = "sqlite:////tmp/liferpg.db"
+    monkeypatch.setattr(database, "READ_DATABASE_URL", "")
+    monkeypatch.setattr(database, "SQLITE_READ_POOL", False)
+    assert database.read_database_url(file_url) is None
+
+    monkeypatch.setattr(database, "SQLITE_READ_POOL", True)
+    assert database.read_database_url(file_url) == file_url
+    # One connection holds an in-memory database: no second pool for it
+    assert database.read_database_url("sqlite://") is None
+
+    monkeypatch.setattr(database, "READ_DATABASE_URL", "postgresql://replica/liferpg")
+    assert database.read_database_url(file_url) == "postgresql://replica/liferpg"
+
+
+@needs_read_engine
+def test_stats_reads_use_the_read_engine_and_see_fresh_writes(client, new_user, add_tasks):
+    _, headers = new_user()
+    task_id, = add_tasks(headers, 1)
+
+    with read_statements() as statements:
+        completion = client.post(f"/tasks/{task_id}/complete", headers=headers).json()
+        assert statements == []
+
+        history = client.get("/stats/history", headers=headers).json()
+        leaderboard = client.get("/stats/leaderboard", headers=headers)
+
+    # WAL: the read pool sees the commit right away
+    assert [item["id"] for item in history] == [completion["id"]]
+    assert leaderboard.status_code == 200
+    assert any("task_completions" in statement for statement in statements)
+    assert not any(statement.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE"))
+                   for statement in statements)
+
+
+@needs_read_engine
+def test_task_list_stays_on_the_main_engine(client, new_user, add_tasks):
+    _, headers = new_user()
+    add_tasks(headers, 1)
+
+    with read_statements() as statements:
+        # It resets lapsed periods as it reads
+        assert client.get("/tasks/", headers=headers).status_code == 200
+
+    assert statements == []
+
+
+@pytest.mark.skipif(read_engine is not None, reason="already running with a read engine")
+def test_read_engine_tests_pass_with_a_read_pool():
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-rs", "-p", "no:cacheprovider",
+         "tests/test_read_engine.py", "tests/test_leaderboard.py", "tests/test_pagination.py"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "LIFERPG_SQLITE_READ_POOL": "1"},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stdout[-4000:]
+    assert "reads share the main engine" not in result.stdout
@@ -0,0 +1,52 @@
+"""Bulk period rollover (app.rollover.roll_over)"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.database import SessionLocal
+from app.models import Task, TaskStatus, User
+from app.rollover import roll_over
+
+
+def set_tasks(rows):
+    db = SessionLocal()
+    try:
+        for task_id, values in rows.items():
+            db.execute(update(Task).where(Task.id == task_id).values(**values))
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_rollover_counts_only_streaks_it_broke(client, new_user, add_tasks):
+    user_id, headers = new_user()
+    completed_streak, completed_no_streak, pending_streak, yesterday = add_tasks(headers, 4)
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        # Leave other tests' tasks out of the counts below
+        roll_over(db, now=now)
+
+        lapsed = now - timedelta(days=3)
+        set_tasks({
+            completed_streak: dict(status=TaskStatus.COMPLETED, current_streak=4, last_completed=lapsed),
+            # An imported history can end completed with its streak already broken
+            completed_no_streak: dict(status=TaskStatus.COMPLETED, current_streak=0, last_completed=lapsed),
+            pending_streak: dict(status=TaskStatus.PENDING, current_streak=2, last_completed=lapsed),
+            yesterday: dict(
+                status=TaskStatus.COMPLETED, current_streak=5, last_completed=now - timedelta(days=1)
+            ),
+        })
+
+        result = roll_over(db, now=now, chunk_size=2)
+
+        assert result.tasks == 4
+        assert result.streaks_broken == 2
+        assert result.users == 1
+        tasks = {task.id: task for task in db.query(Task).filter(Task.user_id == user_id)}
+        assert all(task.status == TaskStatus.PENDING for task in tasks.values())
+        assert [tasks[task_id].current_streak for task_id in sorted(tasks)] == [0, 0, 0, 5]
+        assert db.get(User, user_id).current_streak == 5
+    finally:
+        db.close()
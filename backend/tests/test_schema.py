@@ -0,0 +1,39 @@
+"""ensure_schema on databases left behind by older versions"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app.database import create_db_engine
+from app.models import DailyXP, Task, TaskCompletion, User
+from app.schema import SCHEMA_VERSION, current_version, ensure_schema, schema_version
+
+
+def test_unversioned_database_gets_daily_xp_backfilled(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'unversioned.db'}")
+    ensure_schema(engine)
+    started = datetime(2024, 5, 1, 8)
+    with engine.begin() as connection:
+        connection.execute(insert(User).values(
+            id=1, email="old@example.com", username="old", hashed_password="x"
+        ))
+        connection.execute(insert(Task).values(id=1, user_id=1, title="old"))
+        connection.execute(insert(TaskCompletion), [
+            {"task_id": 1, "user_id": 1, "completed_at": started + timedelta(hours=hours),
+             "xp_earned": 10, "streak_bonus": 1}
+            for hours in (0, 2, 24)
+        ])
+        # As the database looked before schema versions and the rollup
+        DailyXP.__table__.drop(connection)
+        schema_version.drop(connection)
+
+    assert ensure_schema(engine)
+
+    with engine.connect() as connection:
+        assert current_version(connection) == SCHEMA_VERSION
+        days = connection.execute(
+            select(DailyXP.day, DailyXP.xp_earned, DailyXP.completions, DailyXP.streak_bonus)
+            .order_by(DailyXP.day)
+        ).all()
+        assert [tuple(day)[1:] for day in days] == [(20, 2, 2), (10, 1, 1)]
+    engine.dispose()
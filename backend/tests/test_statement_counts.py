@@ -0,0 +1,94 @@
+"""Per-request SQL statement counts must not grow with the number of tasks"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app.database import SessionLocal
+from app.models import Task, TaskStatus
+
+TASK_COUNTS = [1, 50]
+
+
+def lapse(task_ids):
+    """Leave the tasks completed, with a streak, three days ago"""
+    db = SessionLocal()
+    try:
+        db.execute(update(Task).where(Task.id.in_(task_ids)).values(
+            status=TaskStatus.COMPLETED,
+            current_streak=3,
+            best_streak=3,
+            last_completed=datetime.utcnow() - timedelta(days=3),
+        ))
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("task_count", TASK_COUNTS)
+@pytest.mark.parametrize("path", ["/tasks/", "/tasks/today"])
+def test_task_lists(client, new_user, add_tasks, count_statements, path, task_count):
+    _, headers = new_user()
+    add_tasks(headers, task_count)
+    client.get(path, headers=headers)  # user and categories cached
+
+    with count_statements() as statements:
+        response = client.get(path, headers=headers)
+
+    assert response.status_code == 200
+    assert len(response.json()) == task_count
+    # Rollover check, then the tasks with their categories from the cache
+    assert len(statements) == 2
+
+
+@pytest.mark.parametrize("task_count", TASK_COUNTS)
+def test_dashboard(client, new_user, add_tasks, count_statements, task_count):
+    _, headers = new_user()
+    task_ids = add_tasks(headers, task_count)
+    for task_id in task_ids[:5]:
+        client.post(f"/tasks/{task_id}/complete", headers=headers)
+    client.get("/stats/dashboard", headers=headers)
+
+    with count_statements() as statements:
+        response = client.get("/stats/dashboard", headers=headers)
+
+    assert response.status_code == 200
+    dashboard = response.json()
+    assert len(dashboard["today_tasks"]) == task_count
+    assert len(dashboard["recent_completions"]) == min(task_count, 5)
+    # Active tasks, recent completions; counters come from the user row
+    assert len(statements) == 2
+
+
+@pytest.mark.parametrize("task_count", TASK_COUNTS)
+def test_rollover(client, new_user, add_tasks, count_statements, task_count):
+    _, headers = new_user()
+    task_ids = add_tasks(headers, task_count)
+    client.get("/tasks/today", headers=headers)
+    lapse(task_ids)
+
+    with count_statements() as statements:
+        response = client.get("/tasks/today", headers=headers)
+
+    assert response.status_code == 200
+    assert all(task["status"] == "pending" and task["current_streak"] == 0 for task in response.json())
+    # Anything lapsed? Any streak broken? One UPDATE for every task, one
+    # to recount the user's streaks, then the list
+    assert len(statements) == 5
+
+
+def test_dashboard_leaves_inactive_tasks_in_the_database(client, new_user, add_tasks, count_statements):
+    _, headers = new_user()
+    active = add_tasks(headers, 3)
+    for task_id in add_tasks(headers, 4):
+        client.put(f"/tasks/{task_id}", headers=headers, json={"is_active": False})
+    client.get("/stats/dashboard", headers=headers)
+
+    with count_statements() as statements:
+        response = client.get("/stats/dashboard", headers=headers)
+
+    assert sorted(task["id"] for task in response.json()["today_tasks"]) == active
+    tasks_query = statements[0]
+    assert "FROM tasks" in tasks_query
+    assert "is_active" in tasks_query.split("WHERE", 1)[1]